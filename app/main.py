@@ -1,43 +1,135 @@
-from fastapi import FastAPI
-from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
-from starlette.responses import Response
-from src.recruiter import find_top_applicants_with_filters
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.encoders import jsonable_encoder
+from prometheus_client import generate_latest, multiprocess, CONTENT_TYPE_LATEST
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from src.recruiter import iter_top_applicants_batch
+import json
 import os
+import threading
 import yaml
 import sys
 from pathlib import Path
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import time
 
 
 sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
 
 # Import or define the missing variables
-from src.recruiter import RecruiterBot  # Assuming Bot is defined in src.bot
 from src.indexer import FAISSIndexer  # Assuming FaissIndexer is defined in src.indexer
 from src.embedding_manager import EmbeddingManager  # Assuming EmbeddingManager is defined in src.embeddings
+from src.reranker import CrossEncoderReranker
+from src.applicant_store import get_applicant_store
+from src.batching import MicroBatcher
 
 # Import métricas melhoradas
 from src.metrics import (
-    REQUESTS_TOTAL, REQUEST_DURATION, CANDIDATES_FOUND, CANDIDATE_SCORES,
-    SEARCHES_BY_AREA, FAISS_SEARCH_DURATION, ACTIVE_CANDIDATES_COUNT,
-    COMPONENT_HEALTH, APPLICATION_INFO, update_system_metrics,
-    classify_job_area, extract_experience_level, track_endpoint_metrics
+    CANDIDATES_FOUND, CANDIDATE_SCORES, SEARCHES_BY_AREA, COMPONENT_HEALTH, APPLICATION_INFO, SystemMetricsSampler, update_system_metrics,
+    classify_job_area, extract_experience_level, track_endpoint_metrics,
+    format_server_timing, stage_trace, track_stage, metrics_registry, metrics_summary
 )
 
-# Initialize the missing variables
 with open(os.path.join( "src", "config", "index_config.yaml")) as f:
     index_cfg = yaml.safe_load(f)
-indexer = FAISSIndexer( index_cfg)
-emb_mgr = EmbeddingManager('src/models_config.yaml')
-bot = RecruiterBot(emb_mgr, indexer)
+applicants_cfg = index_cfg.get("applicants", {})
+with open(os.path.join("src", "models_config.yaml")) as f:
+    reranker_cfg = yaml.safe_load(f).get("reranker") or {}
+
+
+class ServiceState:
+    """
+    Artefatos da API (índice FAISS, modelo de embeddings, tabela de candidatos),
+    carregados em threads de background para que o servidor suba imediatamente.
+    Cada componente fica em "loading", "healthy" ou "failed: <erro>". O cross-encoder
+    de rerank só é carregado (e exigido) com reranker.enabled no models_config.yaml.
+    """
+    def __init__(self):
+        self.indexer: Optional[FAISSIndexer] = None
+        self.emb_mgr: Optional[EmbeddingManager] = None
+        self.applicant_store = None
+        self.reranker: Optional[CrossEncoderReranker] = None
+        self.status: Dict[str, str] = {"faiss": "loading", "embeddings": "loading", "database": "loading"}
+        if reranker_cfg.get("enabled", False):
+            self.status["reranker"] = "loading"
+        self._threads: List[threading.Thread] = []
+
+    def _load_component(self, component: str, attr: str, factory: Callable[[], Any]):
+        started = time.time()
+        try:
+            setattr(self, attr, factory())
+        except Exception as exc:
+            self.status[component] = f"failed: {exc}"
+            COMPONENT_HEALTH.labels(component=component).set(0)
+            print(f"Failed to load {component}: {exc}")
+            return
+        self.status[component] = "healthy"
+        COMPONENT_HEALTH.labels(component=component).set(1)
+        print(f"Loaded {component} in {time.time() - started:.1f}s")
+        if self.ready:
+            APPLICATION_INFO.info({
+                'version': '1.0.0',
+                'faiss_index_type': self.indexer.index_type,
+                'embedding_model': self.emb_mgr.model.model_name,
+                'database_type': 'parquet'
+            })
+
+    def start_loading(self):
+        components = [
+            ("faiss", "indexer", lambda: FAISSIndexer(index_cfg)),
+            ("embeddings", "emb_mgr", lambda: EmbeddingManager('src/models_config.yaml')),
+            ("database", "applicant_store", lambda: get_applicant_store(
+                applicants_cfg.get("path", "data/processed/applicants.parquet"),
+                columns=applicants_cfg.get("columns"),
+                use_mmap=applicants_cfg.get("mmap", False),
+                check_interval=applicants_cfg.get("check_interval", 5.0),
+            )),
+        ]
+        if "reranker" in self.status:
+            components.append(("reranker", "reranker", lambda: CrossEncoderReranker('src/models_config.yaml')))
+        for component, attr, factory in components:
+            COMPONENT_HEALTH.labels(component=component).set(0)
+            thread = threading.Thread(target=self._load_component, args=(component, attr, factory),
+                                      name=f"load-{component}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def wait(self, timeout: Optional[float] = None):
+        for thread in self._threads:
+            thread.join(timeout)
+
+    @property
+    def ready(self) -> bool:
+        return all(status == "healthy" for status in self.status.values())
+
+    def require_ready(self):
+        if not self.ready:
+            raise HTTPException(status_code=503, detail={"status": "starting", "components": self.status})
+
+
+state = ServiceState()
+# memória e candidatos ativos amostrados em background (não a cada scrape do /metrics)
+system_sampler = SystemMetricsSampler(
+    lambda: update_system_metrics(state.indexer, state.emb_mgr),
+    interval=index_cfg.get("serving", {}).get("metrics_interval", 15),
+)
 
 app = FastAPI(title="Job Matching API", version="1.0.0")
 
-# Configurar métricas de saúde dos componentes na inicialização
-COMPONENT_HEALTH.labels(component="faiss").set(1)
-COMPONENT_HEALTH.labels(component="embeddings").set(1)
-COMPONENT_HEALTH.labels(component="database").set(1)
+
+@app.on_event("startup")
+def load_artifacts():
+    # não bloqueia: o servidor aceita conexões (e responde /health) enquanto carrega
+    state.start_loading()
+    system_sampler.start()
+
+
+@app.on_event("shutdown")
+def stop_system_sampler():
+    system_sampler.stop()
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        # remove as séries "live" deste worker da agregação multiprocesso
+        multiprocess.mark_process_dead(os.getpid())
 
 @app.get("/")
 def home():
@@ -45,61 +137,34 @@ def home():
 
 @app.get("/health")
 def health_check():
-    """Endpoint de health check para monitoramento"""
-    return {
-        "status": "healthy",
-        "timestamp": time.time(),
-        "components": {
-            "faiss": "healthy",
-            "embeddings": "healthy", 
-            "database": "healthy"
-        }
-    }
+    """
+    Endpoint de health check para monitoramento: prontidão por componente.
+    Retorna 503 enquanto algum componente está carregando ou falhou.
+    """
+    if state.ready:
+        status = "healthy"
+    elif any(s.startswith("failed") for s in state.status.values()):
+        status = "unhealthy"
+    else:
+        status = "starting"
+    return JSONResponse(
+        status_code=200 if state.ready else 503,
+        content={
+            "status": status,
+            "timestamp": time.time(),
+            "components": dict(state.status),
+        },
+    )
 
 @app.get("/metrics")
 def metrics():
-    """Endpoint de métricas para Prometheus/Grafana com métricas melhoradas"""
-    print("Metrics endpoint called")
-    
-    # Atualizar métricas de sistema antes de retornar
-    update_system_metrics()
-    
-    # Log das métricas principais para debug
-    metrics_output = generate_latest().decode('utf-8')
-    print("=== MÉTRICAS PRINCIPAIS ===")
-    for line in metrics_output.split('\n'):
-        if 'job_matching' in line and not line.startswith('#'):
-            print(line)
-    
-    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    """Endpoint de métricas para Prometheus/Grafana: a exposição é serializada uma única vez por scrape"""
+    return Response(generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
 
 @app.get("/metrics/summary")
-def metrics_summary():
-    """Endpoint para visualizar resumo das métricas de forma amigável"""
-    metrics_text = generate_latest().decode('utf-8')
-    
-    summary = {
-        "timestamp": time.time(),
-        "application": {
-            "status": "running",
-            "version": "1.0.0"
-        },
-        "requests": {},
-        "performance": {},
-        "business": {}
-    }
-    
-    # Parsear métricas básicas do output
-    for line in metrics_text.split('\n'):
-        if line and not line.startswith('#'):
-            if 'job_matching_requests_total' in line:
-                summary["requests"]["total_requests"] = line.split()[-1]
-            elif 'job_matching_candidates_found' in line:
-                summary["business"]["candidates_found"] = line.split()[-1]
-            elif 'job_matching_request_duration' in line:
-                summary["performance"]["avg_duration_seconds"] = line.split()[-1]
-    
-    return summary
+def metrics_summary_endpoint():
+    """Endpoint para visualizar resumo das métricas de forma amigável (calculado dos coletores, cache de alguns segundos)"""
+    return metrics_summary(ttl_seconds=serving_cfg.get("summary_ttl_seconds", 5))
 
 
 class PredictRequest(BaseModel):
@@ -107,11 +172,50 @@ class PredictRequest(BaseModel):
     top_n: int = 10
     search_k: int = 100
 
+
+def predict_many(reqs: List[PredictRequest]) -> List[Tuple[List[Dict], Dict[str, float]]]:
+    """
+    Atende um lote de /predict com um único encode e uma única busca FAISS multi-query.
+    Retorna, por requisição, os candidatos e o trace das etapas do lote ({etapa: segundos}).
+    """
+    with stage_trace() as trace:
+        results = list(iter_top_applicants_batch(
+            job_descriptions=[r.job_description for r in reqs],
+            faiss_indexer=state.indexer,
+            emb_mgr=state.emb_mgr,
+            top_n=[r.top_n for r in reqs],
+            search_k=max(r.search_k for r in reqs),
+            applicant_store=state.applicant_store,
+            chunk_size=len(reqs),
+            reranker=state.reranker,
+        ))
+    return [(candidates, trace) for candidates in results]
+
+
+serving_cfg = index_cfg.get("serving", {})
+predict_batcher = MicroBatcher(
+    predict_many,
+    max_batch_size=serving_cfg.get("max_batch_size", 32),
+    max_wait_ms=serving_cfg.get("max_wait_ms", 5),
+)
+
+
+@app.on_event("shutdown")
+async def stop_predict_batcher():
+    await predict_batcher.stop()
+
+
 @app.post("/predict")
 @track_endpoint_metrics("predict")
-def predict_post(req: PredictRequest):
-    """Endpoint para predição de candidatos com métricas melhoradas"""
-    start_time = time.time()
+async def predict_post(req: PredictRequest, x_debug_trace: Optional[str] = Header(None)):
+    """
+    Endpoint para predição de candidatos com métricas melhoradas.
+    Requisições concorrentes são agrupadas pelo predict_batcher (micro-batching).
+    Com o header X-Debug-Trace: 1, a resposta traz o tempo de cada etapa no header
+    Server-Timing (as etapas de busca são as do lote em que a requisição foi atendida).
+    """
+    state.require_ready()
+    start_time = time.perf_counter()
     
     # Classificar área e nível de experiência para métricas
     job_area = classify_job_area(req.job_description)
@@ -124,14 +228,7 @@ def predict_post(req: PredictRequest):
     ).inc()
     
     # Buscar candidatos
-    result = find_top_applicants_with_filters(
-        job_description=req.job_description,
-        faiss_indexer=indexer,
-        emb_mgr=emb_mgr,
-        filters=bot.filters if getattr(bot, "filters", None) else None,
-        top_n=req.top_n,
-        search_k=req.search_k,
-    )
+    result, batch_trace = await predict_batcher.submit(req)
     
     # Registrar métricas de resultado
     if result:
@@ -143,9 +240,62 @@ def predict_post(req: PredictRequest):
                 score = candidate['score']
                 CANDIDATE_SCORES.labels(score_range="all").observe(score)
     
-    # Registrar tempo total de processamento
-    total_duration = time.time() - start_time
-    REQUEST_DURATION.labels(endpoint="predict", method="POST").observe(total_duration)
-    
-    return result
+    # Serializar a resposta (o tempo total da requisição é registrado pelo decorator)
+    with stage_trace() as trace, track_stage("serialization"):
+        response = JSONResponse(content=jsonable_encoder(result))
+
+    if (x_debug_trace or "").lower() in ("1", "true"):
+        trace = {**batch_trace, **trace, "total": time.perf_counter() - start_time}
+        response.headers["Server-Timing"] = format_server_timing(trace)
+    return response
+
+
+
+class BatchPredictItem(BaseModel):
+    job_description: str
+    top_n: int = 10
+    search_k: int = 100
+    # filtros de metadados ({"Senior": 1, "São Paulo": 1}); None = extraídos do texto
+    filters: Optional[Dict[str, int]] = None
+
+
+class BatchPredictRequest(BaseModel):
+    # lista vazia é rejeitada (422) em vez de responder um corpo NDJSON vazio
+    items: List[BatchPredictItem] = Field(..., min_length=1)
+
+
+@app.post("/predict/batch")
+@track_endpoint_metrics("predict_batch")
+def predict_batch(req: BatchPredictRequest):
+    """
+    Predição em lote: um encode e uma busca FAISS multi-query por bloco de vagas.
+    A resposta é NDJSON (uma linha {"index", "candidates"} por vaga, na ordem do pedido),
+    enviada em streaming à medida que cada bloco fica pronto.
+    """
+    state.require_ready()
+    items = req.items
+    for item in items:
+        SEARCHES_BY_AREA.labels(
+            job_area=classify_job_area(item.job_description),
+            experience_level=extract_experience_level(item.job_description)
+        ).inc()
+
+    results = iter_top_applicants_batch(
+        job_descriptions=[item.job_description for item in items],
+        faiss_indexer=state.indexer,
+        emb_mgr=state.emb_mgr,
+        top_n=[item.top_n for item in items],
+        filters=[item.filters for item in items],
+        search_k=max((item.search_k for item in items), default=100),
+        applicant_store=state.applicant_store,
+        reranker=state.reranker,
+    )
+
+    def ndjson_lines():
+        for i, candidates in enumerate(results):
+            CANDIDATES_FOUND.labels(search_type="batch").observe(len(candidates))
+            with track_stage("serialization"):
+                line = json.dumps({"index": i, "candidates": jsonable_encoder(candidates)}, ensure_ascii=False)
+            yield line + "\n"
 
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
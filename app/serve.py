@@ -0,0 +1,53 @@
+"""
+Ponto de entrada multi-worker da API.
+
+Uso:
+    python -m app.serve --workers 4 --port 8000
+
+Cada worker é um processo uvicorn que importa app.main e carrega os artefatos.
+Com index.mmap (e applicants.mmap) habilitados em src/config/index_config.yaml,
+o índice FAISS, os metadados e a tabela de candidatos são mapeados em memória
+somente leitura: todos os workers compartilham as mesmas páginas físicas, então
+a RAM não cresce com o número de workers (só o modelo de embeddings é por processo).
+
+Com mais de um worker as métricas Prometheus ficam em PROMETHEUS_MULTIPROC_DIR
+(um diretório temporário, se não for definido) e o /metrics de qualquer worker
+agrega os valores de todos.
+"""
+import argparse
+import os
+import tempfile
+
+import uvicorn
+
+
+def prepare_multiprocess_metrics():
+    """Define (e esvazia) PROMETHEUS_MULTIPROC_DIR antes de os workers importarem o prometheus_client."""
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not path:
+        path = tempfile.mkdtemp(prefix="prometheus_multiproc_")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+    os.makedirs(path, exist_ok=True)
+    # arquivos de uma execução anterior misturariam contadores de processos que já não existem
+    for name in os.listdir(path):
+        if name.endswith(".db"):
+            os.remove(os.path.join(path, name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sobe a API com vários workers uvicorn.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)),
+                        help="número de processos (padrão: $WEB_CONCURRENCY ou o número de CPUs)")
+    args = parser.parse_args()
+    # divide os núcleos entre os workers para as threads de torch/FAISS não competirem
+    os.environ.setdefault("OMP_NUM_THREADS", str(max(1, (os.cpu_count() or 1) // args.workers)))
+    if args.workers > 1:
+        prepare_multiprocess_metrics()
+    # com workers > 1 o uvicorn exige a aplicação como string de importação
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""
+Speed benchmarks for the matching hot path on synthetic applicant corpora.
+
+Each corpus size gets a fresh index in a temporary directory, filled with random
+unit vectors and synthetic metadata, and queried with job descriptions encoded by
+a deterministic hashing encoder instead of the SentenceTransformer model, so runs
+are reproducible offline and only measure this repository's code. Timed:
+
+  encode     EmbeddingManager.generate_embedding throughput (batched, no cache)
+  ingest     FAISSIndexer.add_embeddings under bulk_ingest, including the flushes,
+             then reloading the saved index (as the API does at startup)
+  query      query_embedding latency without filters and with metadata filters
+             (hybrid BM25 + dense scoring when the lexical section is enabled)
+  recruiter  find_top_applicants_with_filters end to end
+  predict    POST /predict through an in-process FastAPI test client
+
+Usage:
+    python -m benchmarks.bench_matching --sizes 10000 100000 1000000 --output bench.json
+    python -m benchmarks.bench_matching --sizes 10000 --compare bench.json
+    python -m benchmarks.bench_matching --sizes 100000 --lexical on --output bench_hybrid.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from src.applicant_store import ApplicantStore
+from src.embedding_manager import EmbeddingManager, EmbeddingModel
+from src.indexer import FAISSIndexer
+from src.recruiter import find_top_applicants_with_filters
+
+BENCHMARKS = ("encode", "ingest", "query", "recruiter", "predict")
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+# vectors (and metadata rows) generated and added per add_embeddings call
+INGEST_CHUNK = 50_000
+
+LEVELS = ["Junior", "Pleno", "Senior"]
+DEGREES = ["Ensino Médio", "Graduação", "Pós-Graduação", "Mestrado", "Doutorado"]
+CITIES = ["São Paulo", "Rio de Janeiro", "Belo Horizonte", "Curitiba", "Recife", "Manaus"]
+SKILLS = ["python", "java", "sql", "sap", "aws", "azure", "react", "node", "docker", "kubernetes",
+          "spark", "excel", "scrum", "linux", "oracle", "power bi", "golang", "c#", "php", "testes"]
+# --lexical: keep lexical.enabled from the config or force it on/off
+LEXICAL_MODES = {"config": None, "on": True, "off": False}
+# query filter sets: none, one broad attribute, and a narrower conjunction
+QUERY_FILTERS = {
+    "unfiltered": None,
+    "filter_level": {"Senior": 1},
+    "filter_level_city_english": {"Senior": 1, "São Paulo": 1, "nivel_ingles": 1},
+}
+
+
+class HashingEncoder:
+    """Bag-of-words feature hashing with the SentenceTransformer.encode signature."""
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    def encode(self, texts, batch_size: int = 32, normalize_embeddings: bool = True, **kwargs):
+        vecs = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in text.lower().split():
+                h = zlib.crc32(token.encode("utf-8"))
+                vecs[row, h % self.dim] += 1.0 if h & 1 else -1.0
+        if normalize_embeddings:
+            vecs /= np.clip(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12, None)
+        return vecs
+
+
+class FakeEmbeddingModel(EmbeddingModel):
+    """EmbeddingModel backed by HashingEncoder; loads no weights."""
+    def __init__(self, dim: int = 384, batch_size: int = 32, chunk_size: int = 1024):
+        self.config = {}
+        self.model_name = f"hashing-{dim}"
+        self.device = "cpu"
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.num_workers = 1
+        self.model = HashingEncoder(dim)
+        self._pool = None
+
+
+def fake_embedding_manager(dim: int = 384) -> EmbeddingManager:
+    return EmbeddingManager(model=FakeEmbeddingModel(dim))
+
+
+def latency_stats(seconds: Sequence[float]) -> Dict[str, float]:
+    ms = np.asarray(seconds) * 1000.0
+    return {
+        "calls": len(ms),
+        "mean_ms": round(float(ms.mean()), 4),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+    }
+
+
+def time_calls(fn: Callable[[Any], Any], args: Sequence[Any], warmup: int = 3) -> Dict[str, float]:
+    """Latency of fn(arg) for every arg, after `warmup` untimed calls."""
+    for arg in args[:warmup]:
+        fn(arg)
+    seconds = []
+    for arg in args:
+        start = time.perf_counter()
+        fn(arg)
+        seconds.append(time.perf_counter() - start)
+    return latency_stats(seconds)
+
+
+def synthetic_texts(n: int, seed: int = 0, words: int = 60) -> List[str]:
+    """CV-like texts: a level, a city and `words` skill tokens each."""
+    rng = np.random.default_rng(seed)
+    levels = rng.choice(LEVELS, n)
+    cities = rng.choice(CITIES, n)
+    skills = rng.choice(SKILLS, (n, words))
+    return [f"Profissional {level} em {city} " + " ".join(row) for level, city, row in zip(levels, cities, skills)]
+
+
+def job_descriptions(n: int, seed: int = 1) -> List[str]:
+    rng = np.random.default_rng(seed)
+    return [
+        f"Desenvolvedor {rng.choice(LEVELS)} em {rng.choice(CITIES)} com ingles, "
+        + " ".join(rng.choice(SKILLS, 8))
+        for _ in range(n)
+    ]
+
+
+def synthetic_chunk(start: int, n: int, dim: int, seed: int):
+    """Random unit vectors plus the metadata rows (with a CV-like text) add_entity_embeddings_to_faiss would store."""
+    rng = np.random.default_rng(seed + start)
+    vecs = rng.normal(size=(n, dim)).astype(np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    levels = rng.choice(LEVELS, n)
+    degrees = rng.choice(DEGREES, n)
+    cities = rng.choice(CITIES, n)
+    english = rng.random(n) < 0.4
+    texts = synthetic_texts(n, seed=seed + start, words=20)
+    metadatas = [
+        {"source": "applicants", "idx": i, "applicants_id": str(i), "nivel_profissional": level,
+         "nivel_academico": degree, "local": city, "nivel_ingles": "Avançado" if has_english else "", "text": text}
+        for i, level, degree, city, has_english, text in zip(range(start, start + n), levels, degrees, cities,
+                                                              english, texts)
+    ]
+    return vecs, metadatas
+
+
+def index_config(base_cfg: Dict[str, Any], workdir: str, index_type: Optional[str],
+                 lexical: Optional[bool] = None) -> Dict[str, Any]:
+    """The index and lexical sections of the config, with artifacts in `workdir` and optional overrides."""
+    cfg = {"index": dict(base_cfg.get("index", {})), "lexical": dict(base_cfg.get("lexical") or {}), "paths": {
+        "index_path": os.path.join(workdir, "faiss.index"),
+        "meta_path": os.path.join(workdir, "faiss_meta.arrow"),
+        "bm25_path": os.path.join(workdir, "bm25.npz"),
+    }}
+    if index_type:
+        cfg["index"]["index_type"] = index_type
+    if lexical is not None:
+        cfg["lexical"]["enabled"] = lexical
+    return cfg
+
+
+def bench_encode(emb_mgr: EmbeddingManager, n_texts: int) -> Dict[str, Any]:
+    texts = synthetic_texts(n_texts)
+    start = time.perf_counter()
+    for vecs in emb_mgr.iter_embeddings(texts):
+        pass
+    elapsed = time.perf_counter() - start
+    return {"texts": n_texts, "seconds": round(elapsed, 4), "texts_per_s": round(n_texts / elapsed, 1)}
+
+
+def bench_ingest(cfg: Dict[str, Any], size: int, dim: int, seed: int) -> Dict[str, Any]:
+    indexer = FAISSIndexer(cfg)
+    elapsed = 0.0
+    with indexer.bulk_ingest():
+        for start in range(0, size, INGEST_CHUNK):
+            vecs, metadatas = synthetic_chunk(start, min(INGEST_CHUNK, size - start), dim, seed)
+            t0 = time.perf_counter()
+            indexer.add_embeddings(vecs, metadatas)
+            elapsed += time.perf_counter() - t0
+        t0 = time.perf_counter()
+    elapsed += time.perf_counter() - t0  # final flush when the block exits
+
+    t0 = time.perf_counter()
+    FAISSIndexer(cfg)
+    load_seconds = time.perf_counter() - t0
+    stats = {"vectors": size, "seconds": round(elapsed, 4), "vectors_per_s": round(size / elapsed, 1),
+             "load_seconds": round(load_seconds, 4),
+             "index_bytes": os.path.getsize(cfg["paths"]["index_path"]),
+             "meta_bytes": os.path.getsize(cfg["paths"]["meta_path"])}
+    if os.path.exists(cfg["paths"]["bm25_path"]):
+        stats["bm25_bytes"] = os.path.getsize(cfg["paths"]["bm25_path"])
+    return stats
+
+
+def bench_query(indexer: FAISSIndexer, query_vecs: np.ndarray, k: int,
+                jobs: Sequence[str]) -> Dict[str, Dict[str, float]]:
+    """Each query also passes its job text, as /predict does (hybrid scoring when lexical is enabled)."""
+    queries = list(zip(query_vecs, jobs))
+    return {
+        name: time_calls(lambda q: indexer.query_embedding(q[0], k=k, filters=filters, text=q[1]), queries)
+        for name, filters in QUERY_FILTERS.items()
+    }
+
+
+def bench_recruiter(indexer: FAISSIndexer, emb_mgr: EmbeddingManager, store: ApplicantStore,
+                    jobs: List[str], k: int) -> Dict[str, float]:
+    return time_calls(lambda job: find_top_applicants_with_filters(
+        job, indexer, emb_mgr, top_n=k, applicant_store=store), jobs)
+
+
+def bench_predict(indexer: FAISSIndexer, emb_mgr: EmbeddingManager, store: ApplicantStore,
+                  jobs: List[str], k: int) -> Dict[str, float]:
+    from fastapi.testclient import TestClient
+    from app import main
+
+    # serve the benchmark artifacts instead of loading the configured ones at startup
+    main.state.start_loading = lambda: None
+    main.state.indexer, main.state.emb_mgr, main.state.applicant_store = indexer, emb_mgr, store
+    main.state.status = {component: "healthy" for component in main.state.status}
+    with TestClient(main.app) as client:
+        def post(job):
+            response = client.post("/predict", json={"job_description": job, "top_n": k})
+            response.raise_for_status()
+        return time_calls(post, jobs)
+
+
+def run_size(size: int, base_cfg: Dict[str, Any], args, emb_mgr: EmbeddingManager) -> List[Dict[str, Any]]:
+    results = []
+
+    def record(benchmark: str, case: Optional[str], stats: Dict[str, Any]):
+        results.append({"size": size, "benchmark": benchmark, "case": case, **stats})
+        print(json.dumps(results[-1]), file=sys.stderr, flush=True)
+
+    if "encode" in args.benchmarks:
+        record("encode", None, bench_encode(emb_mgr, min(size, args.encode_texts)))
+    if not set(args.benchmarks) & {"ingest", "query", "recruiter", "predict"}:
+        return results
+
+    with tempfile.TemporaryDirectory(prefix="bench_") as workdir:
+        cfg = index_config(base_cfg, workdir, args.index_type, LEXICAL_MODES[args.lexical])
+        ingest = bench_ingest(cfg, size, args.dim, args.seed)
+        if "ingest" in args.benchmarks:
+            record("ingest", cfg["index"].get("index_type", "flat"), ingest)
+
+        indexer = FAISSIndexer(cfg)
+        jobs = job_descriptions(args.queries)
+        if "query" in args.benchmarks:
+            query_vecs = emb_mgr.generate_embedding(jobs, use_cache=False)
+            for case, stats in bench_query(indexer, query_vecs, args.k, jobs).items():
+                record("query", case, stats)
+
+        if set(args.benchmarks) & {"recruiter", "predict"}:
+            applicants_path = os.path.join(workdir, "applicants.parquet")
+            pd.DataFrame({"applicants_id": [str(i) for i in range(size)],
+                          "nome": [f"Pessoa {i}" for i in range(size)]}).to_parquet(applicants_path, index=False)
+            store = ApplicantStore(applicants_path)
+            if "recruiter" in args.benchmarks:
+                record("recruiter", None, bench_recruiter(indexer, emb_mgr, store, jobs, args.k))
+            if "predict" in args.benchmarks:
+                record("predict", None, bench_predict(indexer, emb_mgr, store, jobs, args.k))
+    return results
+
+
+def environment() -> Dict[str, Any]:
+    """Where the numbers come from, so reports from different commits/machines can be told apart."""
+    import faiss
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "faiss": faiss.__version__,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Relative change of every timing/throughput field present in both reports (+ = slower for *_ms/seconds)."""
+    def key(row):
+        return row["size"], row["benchmark"], row["case"]
+
+    old = {key(row): row for row in baseline.get("results", [])}
+    changes = []
+    for row in report["results"]:
+        before = old.get(key(row))
+        if before is None:
+            continue
+        for field, value in row.items():
+            if (field.endswith(("_ms", "_per_s")) or field == "seconds") and before.get(field):
+                changes.append({"size": row["size"], "benchmark": row["benchmark"], "case": row["case"],
+                                "field": field, "before": before[field], "after": value,
+                                "change": round(value / before[field] - 1.0, 4)})
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark encoding, ingest, search and /predict on synthetic corpora.")
+    parser.add_argument("--config", default=os.path.join("src", "config", "index_config.yaml"))
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="corpus sizes (vectors)")
+    parser.add_argument("--benchmarks", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument("--index-type", default=None, help="override index.index_type from the config")
+    parser.add_argument("--lexical", choices=sorted(LEXICAL_MODES), default="config",
+                        help="hybrid BM25 scoring: as in the config's lexical section, or forced on/off")
+    parser.add_argument("--dim", type=int, default=384, help="embedding dimension (all-MiniLM-L6-v2: 384)")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200, help="timed calls per latency benchmark")
+    parser.add_argument("--encode-texts", type=int, default=10_000, help="texts encoded per size (capped at the size)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="write the JSON report here (default: stdout)")
+    parser.add_argument("--compare", default=None, help="baseline JSON report to compare against")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        base_cfg = yaml.safe_load(f)
+    emb_mgr = fake_embedding_manager(args.dim)
+
+    report = {"environment": environment(), "settings": vars(args), "results": []}
+    for size in args.sizes:
+        report["results"].extend(run_size(size, base_cfg, args, emb_mgr))
+
+    if args.compare:
+        with open(args.compare) as f:
+            report["comparison"] = compare(report, json.load(f))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
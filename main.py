@@ -21,4 +21,9 @@ from src.faiss_artifact_creator import orchestrate_faiss_creation
 
 
 if __name__ == "__main__":
-    orchestrate_faiss_creation()
+    import argparse
+    parser = argparse.ArgumentParser(description="Build or refresh the FAISS artifacts.")
+    parser.add_argument("--full", action="store_true",
+                        help="rebuild the index from scratch instead of embedding only new/changed applicants")
+    args = parser.parse_args()
+    orchestrate_faiss_creation(incremental=not args.full)
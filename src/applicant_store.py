@@ -0,0 +1,157 @@
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+DEFAULT_APPLICANTS_PATH = "data/processed/applicants.parquet"
+# columns the /predict response needs from the applicants table
+DEFAULT_COLUMNS = ["applicants_id", "nome"]
+
+
+class ApplicantStore:
+    """
+    Read-only, in-memory view of the applicants table used to build responses.
+
+    The parquet file is read once (only `columns`) and rows are looked up in O(1)
+    by position, i.e. the `idx` stored in the FAISS metadata, or by applicants_id.
+    The file is re-read automatically when its modification time changes (checked
+    at most every `check_interval` seconds).
+
+    With use_mmap=True the selected columns are cached as an uncompressed Arrow IPC
+    file next to the parquet and memory-mapped, so several uvicorn workers share the
+    same physical pages instead of each holding a private copy.
+    """
+    def __init__(self, path: str = DEFAULT_APPLICANTS_PATH, columns: Optional[List[str]] = None,
+                 use_mmap: bool = False, check_interval: float = 5.0):
+        self.path = path
+        self.columns = columns or DEFAULT_COLUMNS
+        self.use_mmap = use_mmap
+        self.check_interval = check_interval
+
+        self._columns: Dict[str, Any] = {}
+        self._length = 0
+        self._positions: Optional[Dict[Any, int]] = None  # row label -> position, None = RangeIndex
+        self._by_id: Optional[Dict[Any, int]] = None
+        self._mtime: Optional[int] = None
+        self._last_check = 0.0
+        self._load()
+
+    def _file_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self):
+        self._mtime = self._file_mtime()
+        self._last_check = time.monotonic()
+        self._by_id = None
+        if self.use_mmap and self._mtime is not None:
+            self._load_mmap()
+            return
+        df = pd.read_parquet(self.path, columns=self._available_columns())
+        if df is None:
+            df = pd.DataFrame()
+        self._columns = {col: df[col].to_numpy() for col in self.columns if col in df.columns}
+        self._length = len(df)
+        self._positions = _label_positions(df.index)
+
+    def _available_columns(self) -> Optional[List[str]]:
+        if self._mtime is None:
+            return self.columns
+        import pyarrow.parquet as pq
+        names = set(pq.read_schema(self.path).names)
+        return [col for col in self.columns if col in names]
+
+    def _load_mmap(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        cache_path = f"{self.path}.arrow"
+        if not os.path.exists(cache_path) or os.stat(cache_path).st_mtime_ns < self._mtime:
+            # keeps the pandas index columns and metadata, so row labels survive the cache
+            table = pq.read_table(self.path, columns=self._available_columns(), use_pandas_metadata=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp_path, cache_path)
+        table = pa.ipc.open_file(pa.memory_map(cache_path, "r")).read_all()
+        self._columns = {col: table.column(col) for col in table.column_names if col in self.columns}
+        self._length = table.num_rows
+        self._positions = _label_positions(_table_index(table))
+
+    def refresh(self):
+        """Reload the table if the parquet file changed since it was loaded."""
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        mtime = self._file_mtime()
+        if mtime is not None and mtime != self._mtime:
+            self._load()
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _row(self, pos: int) -> Dict[str, Any]:
+        row = {}
+        for col, values in self._columns.items():
+            value = values[pos]
+            row[col] = value.as_py() if hasattr(value, "as_py") else value
+        return row
+
+    def get(self, idx: Any) -> Optional[Dict[str, Any]]:
+        """Row at `idx` (row label of the parquet, i.e. its position for a default index), or None."""
+        pos = self._positions.get(idx) if self._positions is not None else idx
+        try:
+            pos = int(pos)
+        except (TypeError, ValueError):
+            return None
+        if not 0 <= pos < self._length:
+            return None
+        return self._row(pos)
+
+    def get_by_id(self, applicant_id: Any) -> Optional[Dict[str, Any]]:
+        """Row whose applicants_id equals `applicant_id`, or None."""
+        if self._by_id is None:
+            ids = self._columns.get("applicants_id", [])
+            ids = ids.to_pylist() if hasattr(ids, "to_pylist") else list(ids)
+            self._by_id = {applicant_id: pos for pos, applicant_id in enumerate(ids)}
+        pos = self._by_id.get(applicant_id)
+        return None if pos is None else self._row(pos)
+
+
+def _label_positions(index: pd.Index) -> Optional[Dict[Any, int]]:
+    """Row label -> position, or None when labels already are positions (default RangeIndex)."""
+    if isinstance(index, pd.RangeIndex) and index.start == 0 and index.step == 1:
+        return None
+    return {label: pos for pos, label in enumerate(index)}
+
+
+def _table_index(table) -> pd.Index:
+    """The pandas index recorded in an Arrow table's pandas metadata (RangeIndex when absent)."""
+    index_columns = (table.schema.pandas_metadata or {}).get("index_columns", [])
+    if not index_columns:
+        return pd.RangeIndex(table.num_rows)
+    if len(index_columns) == 1 and isinstance(index_columns[0], dict):
+        spec = index_columns[0]
+        return pd.RangeIndex(spec.get("start", 0), spec.get("stop", table.num_rows), spec.get("step", 1))
+    arrays = [table.column(name).to_pylist() for name in index_columns if isinstance(name, str)]
+    return pd.MultiIndex.from_arrays(arrays) if len(arrays) > 1 else pd.Index(arrays[0])
+
+
+_stores: Dict[str, ApplicantStore] = {}
+
+
+def get_applicant_store(path: str = DEFAULT_APPLICANTS_PATH, **kwargs) -> ApplicantStore:
+    """Process-wide ApplicantStore for `path`, created on first use."""
+    store = _stores.get(path)
+    if store is None:
+        store = _stores[path] = ApplicantStore(path, **kwargs)
+    return store
+
+
+def clear_applicant_stores():
+    """Drop the shared stores (e.g. between tests)."""
+    _stores.clear()
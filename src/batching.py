@@ -0,0 +1,82 @@
+import asyncio
+from typing import Any, Callable, Generic, List, Optional, Tuple, TypeVar
+
+from src.metrics import BATCH_QUEUE_DEPTH, BATCH_SIZE
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Coalesces concurrent requests into batches.
+
+    Callers `await submit(item)`. A background task takes the first queued item,
+    keeps collecting for up to `max_wait_ms` (or until `max_batch_size` items),
+    then runs `process_batch(items)` once in a worker thread and resolves every
+    caller with its own result. `process_batch` must return one result per item,
+    in order; if it raises, every caller in that batch gets the exception.
+
+    Queue depth and batch sizes are exported as BATCH_QUEUE_DEPTH / BATCH_SIZE.
+    """
+    def __init__(self, process_batch: Callable[[List[T]], List[R]], max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0, name: str = "predict"):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def _ensure_started(self):
+        # the queue and task must belong to the running event loop, so start lazily
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, item: T) -> R:
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        BATCH_QUEUE_DEPTH.labels(batcher=self.name).set(self._queue.qsize())
+        return await future
+
+    async def _collect(self) -> List[Tuple[T, "asyncio.Future"]]:
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            BATCH_QUEUE_DEPTH.labels(batcher=self.name).set(self._queue.qsize())
+            BATCH_SIZE.labels(batcher=self.name).observe(len(batch))
+            items = [item for item, _ in batch]
+            try:
+                results: List[Any] = await loop.run_in_executor(None, self.process_batch, items)
+            except Exception as exc:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
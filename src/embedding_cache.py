@@ -0,0 +1,159 @@
+import hashlib
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+from src.metrics import CACHE_OPERATIONS
+
+
+def normalize_text(text: str) -> str:
+    """Unicode NFC + collapsed whitespace, so trivially different copies of a text share a key."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class EmbeddingCache:
+    """
+    Bounded cache of text embeddings with LRU and TTL eviction.
+
+    Keys are a SHA-256 of the model name plus the normalized text, so switching
+    models never serves stale vectors. With `disk_path` set, entries are also
+    written as .npy files there and reloaded on a memory miss, which lets the
+    cache survive restarts. The disk tier is an LRU too, bounded by
+    `disk_max_entries` (default: max_entries); after a restart its files start in
+    write order (the mtime, which also drives the TTL). Operations are counted in
+    CACHE_OPERATIONS (hit, miss, update, evict).
+    """
+    def __init__(self, model_name: str, max_entries: int = 1024, ttl_seconds: Optional[float] = 3600,
+                 disk_path: Optional[str] = None, disk_max_entries: Optional[int] = None):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_path = disk_path
+        self.disk_max_entries = max_entries if disk_max_entries is None else disk_max_entries
+        self._entries: "OrderedDict[str, Tuple[float, np.ndarray]]" = OrderedDict()
+        self._disk_entries: "OrderedDict[str, None]" = OrderedDict()  # keys on disk, least recent first
+        self._lock = threading.Lock()
+        if disk_path:
+            os.makedirs(disk_path, exist_ok=True)
+            self._scan_disk()
+
+    def _scan_disk(self):
+        """Rebuild the disk LRU from the files already there (oldest mtime first), trimming it to the cap."""
+        files = []
+        for root, _, names in os.walk(self.disk_path):
+            for name in names:
+                if name.endswith(".npy"):
+                    try:
+                        files.append((os.path.getmtime(os.path.join(root, name)), name[:-len(".npy")]))
+                    except OSError:
+                        pass
+        for _, key in sorted(files):
+            self._disk_entries[key] = None
+        self._evict_disk()
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created > self.ttl_seconds
+
+    def _disk_file(self, key: str) -> str:
+        return os.path.join(self.disk_path, key[:2], f"{key}.npy")
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """Cached embedding of `text`, or None on a miss."""
+        key = self.key(text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0]):
+                del self._entries[key]
+                CACHE_OPERATIONS.labels(operation="evict").inc()
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                CACHE_OPERATIONS.labels(operation="hit").inc()
+                return entry[1]
+
+        entry = self._get_from_disk(key)
+        if entry is None:
+            CACHE_OPERATIONS.labels(operation="miss").inc()
+            return None
+        CACHE_OPERATIONS.labels(operation="hit").inc()
+        created, vec = entry
+        self._put_memory(key, vec, created)
+        return vec
+
+    def _get_from_disk(self, key: str) -> Optional[Tuple[float, np.ndarray]]:
+        """(write time, vector) of the .npy of `key`; None if missing, expired or gone mid-read."""
+        if not self.disk_path:
+            return None
+        path = self._disk_file(key)
+        try:
+            created = os.path.getmtime(path)
+            if self._expired(created):
+                os.remove(path)
+                with self._lock:
+                    self._disk_entries.pop(key, None)
+                return None
+            vec = np.load(path)
+        except (OSError, ValueError):
+            # e.g. evicted by another worker sharing disk_path between the stat and the read
+            return None
+        with self._lock:
+            self._disk_entries[key] = None
+            self._disk_entries.move_to_end(key)
+        vec.setflags(write=False)
+        return created, vec
+
+    def put(self, text: str, vec: np.ndarray):
+        key = self.key(text)
+        vec = np.array(vec, dtype=np.float32)
+        vec.setflags(write=False)
+        self._put_memory(key, vec, time.time())
+        CACHE_OPERATIONS.labels(operation="update").inc()
+        if self.disk_path:
+            path = self._disk_file(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, vec)
+            os.replace(tmp_path, path)
+            with self._lock:
+                self._disk_entries[key] = None
+                self._disk_entries.move_to_end(key)
+            self._evict_disk()
+
+    def _evict_disk(self):
+        """Delete the least recently used .npy files beyond disk_max_entries."""
+        with self._lock:
+            evicted = []
+            while len(self._disk_entries) > self.disk_max_entries:
+                evicted.append(self._disk_entries.popitem(last=False)[0])
+        for key in evicted:
+            try:
+                os.remove(self._disk_file(key))
+            except OSError:
+                pass  # already removed (e.g. by another worker sharing the directory)
+            CACHE_OPERATIONS.labels(operation="evict").inc()
+
+    def _put_memory(self, key: str, vec: np.ndarray, created: float):
+        with self._lock:
+            self._entries[key] = (created, vec)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                CACHE_OPERATIONS.labels(operation="evict").inc()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the in-memory vectors."""
+        with self._lock:
+            return sum(vec.nbytes for _, vec in self._entries.values())
@@ -1,27 +1,96 @@
-from typing import List, Union
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Union
 import numpy as np
-from sentence_transformers import SentenceTransformer
 import yaml
-from sklearn.metrics.pairwise import cosine_similarity
+from src.embedding_cache import EmbeddingCache
 
 
 class EmbeddingManager:
     """
     Thin wrapper around EmbeddingModel in src/feature_engineering.py.
     Returns numpy arrays (1D for single text, 2D for list).
+    When the `cache` section of models_config.yaml is enabled, query embeddings
+    are served from an EmbeddingCache before running the model.
+    `model` replaces the SentenceTransformer-backed EmbeddingModel (e.g. a fake
+    encoder for benchmarks); it needs the same attributes and encode().
     """
-    def __init__(self, config_path: str = "src/models_config.yaml"):
-        self.model = EmbeddingModel(config_path)
+    def __init__(self, config_path: str = "src/models_config.yaml", model: Optional["EmbeddingModel"] = None):
+        self.model = model or EmbeddingModel(config_path)
+        self.chunk_size = self.model.chunk_size
+        self.num_workers = self.model.num_workers
+        cache_cfg = self.model.config.get('cache') or {}
+        self.cache: Optional[EmbeddingCache] = None
+        if cache_cfg.get('enabled', False):
+            self.cache = EmbeddingCache(
+                self.model.model_name,
+                max_entries=cache_cfg.get('max_entries', 1024),
+                ttl_seconds=cache_cfg.get('ttl_seconds', 3600),
+                disk_path=cache_cfg.get('disk_path'),
+                disk_max_entries=cache_cfg.get('disk_max_entries'),
+            )
 
-    def generate_embedding(self, text: Union[str, List[str]]):
+    def generate_embedding(self, text: Union[str, List[str]], use_cache: bool = True):
+        """
+        use_cache: look texts up in (and add them to) the embedding cache, if enabled.
+        Bulk indexing passes False so corpus texts do not evict recruiter queries.
+        """
+        cache = self.cache if use_cache else None
         if isinstance(text, str):
-            vec = self.model.encode([text], normalize_embeddings=True)[0]
-            return np.asarray(vec, dtype=np.float32)
+            if cache is not None:
+                vec = cache.get(text)
+                if vec is not None:
+                    return vec
+            vec = np.asarray(self.model.encode([text], normalize_embeddings=True)[0], dtype=np.float32)
+            if cache is not None:
+                cache.put(text, vec)
+            return vec
         elif isinstance(text, list):
+            if cache is not None:
+                return self._generate_cached(text, cache)
             vecs = self.model.encode(text, normalize_embeddings=True)
             return np.asarray(vecs, dtype=np.float32)
         else:
             raise TypeError("text must be str or list[str]")
+
+    def _generate_cached(self, texts: List[str], cache: EmbeddingCache) -> np.ndarray:
+        """Serve cached rows and encode only the misses, in one model call."""
+        cached = [cache.get(t) for t in texts]
+        missing = [i for i, vec in enumerate(cached) if vec is None]
+        if missing:
+            vecs = np.asarray(self.model.encode([texts[i] for i in missing], normalize_embeddings=True),
+                              dtype=np.float32)
+            for i, vec in zip(missing, vecs):
+                cache.put(texts[i], vec)
+                cached[i] = vec
+        if not cached:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack(cached)
+
+    def iter_embeddings(self, texts: List[str], chunk_size: Optional[int] = None) -> Iterator[np.ndarray]:
+        """
+        Encode `texts` chunk by chunk, yielding one (len(chunk), dim) array per chunk.
+        Each chunk is encoded with the configured batch_size (and the worker pool,
+        if one is open), so callers can index a chunk while holding only that chunk.
+        """
+        chunk_size = chunk_size or self.chunk_size
+        for start in range(0, len(texts), chunk_size):
+            yield self.generate_embedding(list(texts[start:start + chunk_size]), use_cache=False)
+
+    @contextmanager
+    def worker_pool(self, num_workers: Optional[int] = None):
+        """
+        Spread encoding across `num_workers` local CPU processes for the duration
+        of the block (defaults to embedding_model.num_workers; 1 = no pool).
+        """
+        num_workers = num_workers or self.num_workers
+        if num_workers <= 1:
+            yield self
+            return
+        self.model.start_pool(num_workers)
+        try:
+            yield self
+        finally:
+            self.model.stop_pool()
         
 
 class EmbeddingModel:
@@ -43,19 +112,68 @@ class EmbeddingModel:
 
         with open(config_path, 'r') as file:
             config = yaml.safe_load(file)
-        self.model_name = config['embedding_model']['name']
-        self.model = SentenceTransformer(self.model_name)
+        self.config = config
+        model_config = config['embedding_model']
+        self.model_name = model_config['name']
+        self.device = model_config.get('device', 'cpu')
+        self.batch_size = model_config.get('batch_size', 32)
+        self.chunk_size = model_config.get('chunk_size', 1024)
+        self.num_workers = model_config.get('num_workers', 1)
+        # imported here: sentence_transformers pulls in torch, which is slow to import
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(self.model_name, device=self.device)
+        self._pool = None
+
+    def start_pool(self, num_workers):
+        self._pool = self.model.start_multi_process_pool(target_devices=[self.device] * num_workers)
+
+    def stop_pool(self):
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
 
     def encode(self, texts, normalize_embeddings=True):
-        return self.model.encode(texts, normalize_embeddings=normalize_embeddings)
+        if self._pool is not None and len(texts) > self.batch_size:
+            vecs = self.model.encode_multi_process(texts, self._pool, batch_size=self.batch_size)
+            if normalize_embeddings:
+                vecs = vecs / np.clip(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12, None)
+            return vecs
+        return self.model.encode(texts, batch_size=self.batch_size, normalize_embeddings=normalize_embeddings)
+
+
+_shared_managers: Dict[str, EmbeddingManager] = {}
+
+
+def get_embedding_manager(config_path: str = "src/models_config.yaml") -> EmbeddingManager:
+    """Process-wide EmbeddingManager for `config_path`, so the model is loaded only once."""
+    manager = _shared_managers.get(config_path)
+    if manager is None:
+        manager = _shared_managers[config_path] = EmbeddingManager(config_path)
+    return manager
+
+
+def calculate_pairwise_similarity(texts_a: Sequence[str], texts_b: Sequence[str],
+                                  emb_mgr: Optional[EmbeddingManager] = None) -> np.ndarray:
+    """
+    Cosine similarity between texts_a[i] and texts_b[i] for every i.
+    Each distinct text is encoded once (in batches), and the similarities are the
+    row-wise dot products of the normalized embeddings.
+    """
+    if len(texts_a) != len(texts_b):
+        raise ValueError(f"texts_a and texts_b must be aligned, got {len(texts_a)} and {len(texts_b)}")
+    if len(texts_a) == 0:
+        return np.zeros(0, dtype=np.float32)
+    emb_mgr = emb_mgr or get_embedding_manager()
+
+    positions: Dict[str, int] = {}
+    codes_a = np.array([positions.setdefault(t, len(positions)) for t in texts_a], dtype=np.int64)
+    codes_b = np.array([positions.setdefault(t, len(positions)) for t in texts_b], dtype=np.int64)
+    vecs = np.vstack(list(emb_mgr.iter_embeddings(list(positions))))
+    return np.einsum("ij,ij->i", vecs[codes_a], vecs[codes_b])
 
 
 def calculate_similarity(text1: str, text2: str) -> float:
     """
     Calculate the cosine similarity between two texts.
     """
-    manager = EmbeddingManager()
-    embedding1 = manager.generate_embedding(text1)
-    embedding2 = manager.generate_embedding(text2)
-    similarity = cosine_similarity([embedding1], [embedding2])[0][0]
-    return similarity
\ No newline at end of file
+    return float(calculate_pairwise_similarity([text1], [text2])[0])
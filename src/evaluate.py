@@ -1,12 +1,38 @@
+"""
+Offline evaluation of the recruiter retrieval against the prospects table.
+
+Every job is encoded in one batched pass and searched with a single matrix query,
+restricted like /predict by the filters extract_filters_from_text finds in its text;
+recall@k, MRR and nDCG@k are then computed with NumPy against the prospects that
+were marked relevant / hired for that job, over the full dataset.
+
+Usage:
+    python -m src.evaluate --k 5 10 20
+"""
+import argparse
 import os
-import sys
-import yaml
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
 import pandas as pd
-from src.feature_engineering import combine_columns
-from src.recruiter import find_top_applicants_with_filters
-from src.embedding_manager import calculate_similarity, EmbeddingManager
+import yaml
+from src.feature_engineering import combine_columns, extract_filters_from_text
+from src.embedding_manager import calculate_pairwise_similarity, EmbeddingManager
 from src.indexer import FAISSIndexer
-from src.recruiter import RecruiterBot
+
+# cut-offs of recall@k and nDCG@k (MRR uses the whole retrieved ranking)
+DEFAULT_KS = (5, 10, 20)
+# prospects columns used as binary relevance labels
+LABELS = ("relevant", "hired")
+
+RELEVANT_KEYWORDS = [
+    'Encaminhado ao Requisitante', 'Contratado pela Decision', 'Documentação PJ', 'Aprovado',
+    'Entrevista Técnica', 'Em avaliação pelo RH', 'Contratado como Hunting', 'Entrevista com Cliente',
+    'Documentação CLT', 'Documentação Cooperado', 'Encaminhar Proposta', 'Proposta Aceita'
+]
+HIRED_KEYWORDS = [
+    'Contratado pela Decision', 'Aprovado', 'Contratado como Hunting', 'Encaminhar Proposta', 'Proposta Aceita'
+]
 
 
 def load_data():
@@ -23,18 +49,8 @@ def preprocess_prospects(df):
     df['situacao_candidato'] = df['prospects'].apply(lambda x: [item['situacao_candidado'] for item in x])
     df = df.explode(['codigo_list', 'situacao_candidato'])
     df = df.rename(columns={'codigo_list': 'applicant_id'})
-
-    relevant_keywords = [
-        'Encaminhado ao Requisitante', 'Contratado pela Decision', 'Documentação PJ', 'Aprovado',
-        'Entrevista Técnica', 'Em avaliação pelo RH', 'Contratado como Hunting', 'Entrevista com Cliente',
-        'Documentação CLT', 'Documentação Cooperado', 'Encaminhar Proposta', 'Proposta Aceita'
-    ]
-    hired_keywords = [
-        'Contratado pela Decision', 'Aprovado', 'Contratado como Hunting', 'Encaminhar Proposta', 'Proposta Aceita'
-    ]
-
-    df['relevant'] = df['situacao_candidato'].apply(lambda x: 1 if x in relevant_keywords else 0)
-    df['hired'] = df['situacao_candidato'].apply(lambda x: 1 if x in hired_keywords else 0)
+    df['relevant'] = df['situacao_candidato'].isin(RELEVANT_KEYWORDS).astype(int)
+    df['hired'] = df['situacao_candidato'].isin(HIRED_KEYWORDS).astype(int)
     return df
 
 
@@ -62,11 +78,12 @@ def preprocess_jobs(df):
     return df
 
 
-def calculate_similarities(df):
+def calculate_similarities(df, emb_mgr=None):
     """Calculate text similarities."""
     df['applicants_text'] = df['applicants_text'].fillna('')
     df['text'] = df['text'].fillna('')
-    df['similarity'] = df.apply(lambda row: calculate_similarity(row['text'], row['applicants_text']), axis=1)
+    df['similarity'] = calculate_pairwise_similarity(df['text'].tolist(), df['applicants_text'].tolist(),
+                                                     emb_mgr=emb_mgr)
     return df
 
 
@@ -82,34 +99,119 @@ def group_data(df):
     ).reset_index()
 
 
-def initialize_recruiter_bot():
-    """Initialize the RecruiterBot."""
+def initialize_retrieval():
+    """Load the embedding model and the FAISS index."""
     with open(os.path.join("src", "config", "index_config.yaml")) as f:
         index_cfg = yaml.safe_load(f)
     emb_mgr = EmbeddingManager(config_path=os.path.join("src/models_config.yaml"))
     indexer = FAISSIndexer(index_cfg)
-    bot = RecruiterBot(emb_mgr, indexer)
-    return bot, emb_mgr, indexer
-
-
-def find_top_applicants(df, bot, emb_mgr, indexer):
-    """Find top applicants for each job."""
-    df['top_applicants'] = df.apply(
-        lambda row: find_top_applicants_with_filters(
-            job_description=row['text'],
-            faiss_indexer=indexer,
-            emb_mgr=emb_mgr,
-            filters={},
-            top_n=row['num_applicants']
-        ),
-        axis=1
-    )
-    df['top_applicants_ids'] = df['top_applicants'].apply(
-        lambda x: [item['applicant_id'] for item in x if 'metadata' in item and 'jobs_id' in item['metadata']]
-    )
-    df['top_applicants_scores'] = df['top_applicants'].apply(
-        lambda x: [item['score'] for item in x if 'score' in item]
-    )
+    return emb_mgr, indexer
+
+
+def _as_id(value):
+    return None if value is None else str(value)
+
+
+def encode_texts(texts: Sequence[str], emb_mgr: EmbeddingManager, chunk_size=None) -> np.ndarray:
+    """Encode every text, chunk by chunk, into one (n, dim) matrix."""
+    chunks = list(emb_mgr.iter_embeddings(list(texts), chunk_size))
+    return np.vstack(chunks) if chunks else np.zeros((0, 0), dtype=np.float32)
+
+
+def retrieve_rankings(texts: Sequence[str], emb_mgr: EmbeddingManager, indexer: FAISSIndexer,
+                      k, id_key: str = "applicants_id") -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k applicants of every text from one batched encode and one matrix search,
+    each text restricted by its extract_filters_from_text filters as in /predict
+    (texts with the same filters share one index.search). k is one value or one per text. Returns (ids, scores) of shape (n, max k):
+    ids are strings (None past the last hit of a row) and scores NaN there.
+    """
+    ks = [int(k)] * len(texts) if np.isscalar(k) else [int(row_k) for row_k in k]
+    depth = max(ks, default=0)
+    ids = np.full((len(texts), depth), None, dtype=object)
+    scores = np.full((len(texts), depth), np.nan, dtype=np.float32)
+    if not len(texts) or depth == 0:
+        return ids, scores
+    filters = [extract_filters_from_text(text) for text in texts]
+    results = indexer.query_embeddings(encode_texts(texts, emb_mgr), k=ks, filters=filters, texts=list(texts))
+    for row, hits in enumerate(results):
+        ids[row, :len(hits)] = [_as_id(hit["metadata"].get(id_key)) for hit in hits]
+        scores[row, :len(hits)] = [hit["score"] for hit in hits]
+    return ids, scores
+
+
+def relevance_matrix(ranked_ids: np.ndarray, job_ids: Sequence, labels: pd.DataFrame,
+                     label: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Boolean matrix shaped like ranked_ids, True where ranked_ids[j, r] is a prospect
+    of job_ids[j] with labels[label] == 1, plus the number of such prospects per job.
+    labels has one row per (prospects_id, applicant_id), as from preprocess_prospects.
+    """
+    positives = labels.loc[labels[label] == 1, ['prospects_id', 'applicant_id']].dropna()
+    job_pos = pd.Index(job_ids).get_indexer(positives['prospects_id'])
+    known = job_pos >= 0
+    positive_ids = positives['applicant_id'].to_numpy(dtype=object)[known].astype(str)
+
+    # one integer code per applicant id on both sides, so (job, applicant) pairs become int64 keys
+    codes, uniques = pd.factorize(np.concatenate([positive_ids, ranked_ids.ravel()]))
+    n_codes = max(len(uniques), 1)
+    positive_keys = np.unique(job_pos[known] * n_codes + codes[:len(positive_ids)])
+    ranked_codes = codes[len(positive_ids):].reshape(ranked_ids.shape)
+    ranked_keys = np.arange(ranked_ids.shape[0])[:, None] * n_codes + ranked_codes
+    rel = np.isin(ranked_keys, positive_keys) & (ranked_codes >= 0)
+    n_relevant = np.bincount(positive_keys // n_codes, minlength=ranked_ids.shape[0])
+    return rel, n_relevant
+
+
+def ranking_metrics(rel: np.ndarray, n_relevant: np.ndarray,
+                    ks: Sequence[int] = DEFAULT_KS) -> Dict[str, np.ndarray]:
+    """
+    Per-job recall@k, nDCG@k (binary gains) and reciprocal rank from a relevance
+    matrix whose columns are ranks. Jobs without any positive get NaN.
+    """
+    n_jobs, depth = rel.shape
+    width = max(depth, *ks)
+    rel = np.pad(rel.astype(bool), ((0, 0), (0, width - depth)))
+    n = np.maximum(n_relevant, 1)
+    discounts = 1.0 / np.log2(np.arange(2, width + 2))
+    hits = np.cumsum(rel, axis=1)
+    dcg = np.cumsum(rel * discounts, axis=1)
+    ideal_dcg = np.cumsum(discounts)
+
+    metrics = {}
+    for k in ks:
+        metrics[f"recall@{k}"] = hits[:, k - 1] / n
+        metrics[f"ndcg@{k}"] = dcg[:, k - 1] / ideal_dcg[np.minimum(n, k) - 1]
+    metrics["mrr"] = np.where(rel.any(axis=1), 1.0 / (rel.argmax(axis=1) + 1), 0.0)
+    return {name: np.where(n_relevant > 0, values, np.nan) for name, values in metrics.items()}
+
+
+def ranking_metric_columns(ks: Sequence[int] = DEFAULT_KS) -> List[str]:
+    """Names of the per-job columns added by calculate_ranking_metrics."""
+    names = [f"recall@{k}" for k in ks] + [f"ndcg@{k}" for k in ks] + ["mrr"]
+    return [f"{label}_{name}" for label in LABELS for name in names]
+
+
+def find_top_applicants(df, emb_mgr, indexer, ks: Sequence[int] = DEFAULT_KS):
+    """
+    Retrieve applicants for every job at once: as many as were prospected for it
+    (top_applicants_ids / top_applicants_scores) and at least max(ks) for the metrics.
+    Returns the dataframe and the full (n_jobs, depth) matrix of ranked applicant ids.
+    """
+    num_applicants = df['num_applicants'].to_numpy()
+    ranked_ids, ranked_scores = retrieve_rankings(df['text'].fillna('').tolist(), emb_mgr, indexer,
+                                                  np.maximum(num_applicants, max(ks)))
+    df['top_applicants_ids'] = [[i for i in row[:n] if i is not None] for row, n in zip(ranked_ids, num_applicants)]
+    df['top_applicants_scores'] = [row[:n][~np.isnan(row[:n])].tolist() for row, n in zip(ranked_scores, num_applicants)]
+    return df, ranked_ids
+
+
+def calculate_ranking_metrics(df, ranked_ids: np.ndarray, labels: pd.DataFrame, ks: Sequence[int] = DEFAULT_KS):
+    """Add recall@k, nDCG@k and MRR columns per job for every label in LABELS."""
+    for label in LABELS:
+        rel, n_relevant = relevance_matrix(ranked_ids, df['prospects_id'], labels, label)
+        for name, values in ranking_metrics(rel, n_relevant, ks).items():
+            df[f"{label}_{name}"] = values
     return df
 
 
@@ -130,22 +232,30 @@ def calculate_validation_metrics(df):
     return df
 
 
-def save_validation_data(df):
+def save_validation_data(df, ks: Sequence[int] = DEFAULT_KS):
     """Save validation data to a file."""
     df = df[['prospects_id', 'applicant_id', 'top_applicants_ids', 'mean_prospects_similarity',
-             'mean_top_applicants_score', 'mean_hired_similarity', 'mean_relevant_similarity']]
+             'mean_top_applicants_score', 'mean_hired_similarity', 'mean_relevant_similarity',
+             *ranking_metric_columns(ks)]]
     df.to_parquet('data/processed/validation.parquet', index=False)
 
 
-def print_summary(df):
+def print_summary(df, ks: Sequence[int] = DEFAULT_KS):
     """Print summary metrics."""
     print(f"Mean hired similarity: {df['mean_hired_similarity'].mean():.4f}")
     print(f"Mean relevant similarity: {df['mean_relevant_similarity'].mean():.4f}")
     print(f"Mean prospects similarity: {df['mean_prospects_similarity'].mean():.4f}")
     print(f"Mean top applicants score: {df['mean_top_applicants_score'].mean():.4f}")
+    for column in ranking_metric_columns(ks):
+        # jobs without positives for the label are NaN and left out of the mean
+        print(f"{column}: {df[column].mean():.4f} ({df[column].notna().sum()} jobs)")
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Evaluate the recruiter retrieval against the prospects labels.")
+    parser.add_argument("--k", type=int, nargs="+", default=list(DEFAULT_KS), help="cut-offs for recall@k and nDCG@k")
+    args = parser.parse_args()
+
     df_prospects, df_applicants, df_jobs = load_data()
 
     df_prospects = preprocess_prospects(df_prospects)
@@ -154,18 +264,18 @@ def main():
 
     df_merged = df_prospects.merge(df_applicants[['applicant_id', 'text']], on='applicant_id', how='left').rename(columns={'text': 'applicants_text'})
     df_merged = df_merged.merge(df_jobs, left_on='prospects_id', right_on='jobs_id', how='left').dropna(subset=['applicant_id'])
-    df_merged = df_merged.sample(frac=0.1, random_state=42)
-    df_merged = calculate_similarities(df_merged)
 
+    emb_mgr, indexer = initialize_retrieval()
+    df_merged = calculate_similarities(df_merged, emb_mgr)
     df_grouped = group_data(df_merged)
 
-    bot, emb_mgr, indexer = initialize_recruiter_bot()
-    df_grouped = find_top_applicants(df_grouped, bot, emb_mgr, indexer)
+    df_grouped, ranked_ids = find_top_applicants(df_grouped, emb_mgr, indexer, args.k)
+    df_grouped = calculate_ranking_metrics(df_grouped, ranked_ids, df_merged, args.k)
 
     df_validation = calculate_validation_metrics(df_grouped)
-    save_validation_data(df_validation)
-    print_summary(df_validation)
+    save_validation_data(df_validation, args.k)
+    print_summary(df_validation, args.k)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -13,7 +13,7 @@ workspace_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "
 sys.path.insert(0, workspace_root)
 from src.embedding_manager import EmbeddingManager
 
-from src.indexer import FAISSIndexer, add_entity_embeddings_to_faiss
+from src.indexer import FAISSIndexer, add_entity_embeddings_to_faiss, sync_entity_embeddings
 
 
 def load_config(config_path: str) -> Dict[str, Any]:
@@ -43,12 +43,36 @@ def initialize_components(index_config_path: str, models_config_path: str) -> (E
 def add_applicants_to_faiss(df_applicants: Any, emb_mgr: EmbeddingManager, indexer: FAISSIndexer) -> None:
     """Add applicants embeddings to the FAISS index."""
     print("Starting to add applicants embeddings to FAISS index...")
-    add_entity_embeddings_to_faiss(df_applicants, emb_mgr, indexer)
-    print("Finished adding applicants embeddings to FAISS index.")
-
-
-def orchestrate_faiss_creation() -> None:
-    """Orchestrate the FAISS artifact creation process."""
+    throughput = add_entity_embeddings_to_faiss(df_applicants, emb_mgr, indexer)
+    print(f"Finished adding applicants embeddings to FAISS index ({throughput:.1f} texts/s).")
+
+
+def sync_applicants_to_faiss(df_applicants: Any, emb_mgr: EmbeddingManager, indexer: FAISSIndexer) -> None:
+    """Embed only new or changed applicants and drop the removed ones from the FAISS index."""
+    print("Syncing applicants embeddings with the FAISS index...")
+    stats = sync_entity_embeddings(df_applicants, emb_mgr, indexer, id_column="applicants_id")
+    print(f"Finished syncing applicants: {stats}.")
+
+
+def report_precision(indexer: FAISSIndexer) -> None:
+    """Print the memory saved and the recall change of a float16/int8 index against float32."""
+    report = indexer.precision_report()
+    if report is None:
+        return
+    k_recall = next(key for key in report if key.startswith("recall@"))
+    print(f"Vector precision {report['precision']}: {report['vector_bytes'] / 2**20:.1f} MiB instead of "
+          f"{report['float32_vector_bytes'] / 2**20:.1f} MiB in float32 "
+          f"({report['memory_saved_bytes'] / 2**20:.1f} MiB saved, {report['compression']}x smaller); "
+          f"{k_recall} {report[k_recall]} vs {report['float32_' + k_recall]} "
+          f"({report['recall_change']:+.4f}) on {report['sample_vectors']} sampled vectors.")
+
+
+def orchestrate_faiss_creation(incremental: bool = True) -> None:
+    """
+    Orchestrate the FAISS artifact creation process.
+    By default only the delta against the existing index is embedded (see
+    sync_entity_embeddings); incremental=False rebuilds the index from scratch.
+    """
     # Define file paths and columns
     applicants_file_path = "data/processed/applicants.parquet"
     applicants_columns_to_combine = [
@@ -71,5 +95,10 @@ def orchestrate_faiss_creation() -> None:
     emb_mgr, indexer = initialize_components(index_config_path, models_config_path)
 
     # Add embeddings to FAISS index
-    add_applicants_to_faiss(df_applicants, emb_mgr, indexer)
+    if incremental:
+        sync_applicants_to_faiss(df_applicants, emb_mgr, indexer)
+    else:
+        indexer.reset()
+        add_applicants_to_faiss(df_applicants, emb_mgr, indexer)
+    report_precision(indexer)
 
@@ -1,18 +1,55 @@
 from src.utils import load_parquet
+from typing import Iterator, Optional, Union
 import numpy as np
 import pandas as pd
 
 
-def combine_columns(df, columns_to_combine):
-    """Combine specified columns into a single text column."""
-    df['text'] = df[columns_to_combine].apply(
-        lambda row: ' '.join([
-            f"{col}: {row[col]}" for col in columns_to_combine if pd.notnull(row[col])
-        ]),
-        axis=1
-    )
+def _combined_text(df, columns_to_combine) -> pd.Series:
+    """
+    "col: value" for every non-null cell, joined with spaces, built column by column
+    with masked, vectorized string concatenation. Cells are cast to the common dtype
+    of the selection (the dtype of its rows, e.g. ints upcast to float next to a float
+    column) and boxed, so they format exactly as in df[columns].apply(axis=1);
+    text cells are used as-is, anything else goes through str().
+    """
+    frame = df[columns_to_combine]
+    row_dtype = frame.iloc[0].dtype if len(frame) else object
+    text = np.full(len(df), "", dtype=object)
+    has_text = np.zeros(len(df), dtype=bool)
+    for j, col in enumerate(columns_to_combine):
+        cells = frame.iloc[:, j].astype(row_dtype).to_numpy(dtype=object)
+        present = pd.notnull(cells)
+        cells = cells[present]
+        if pd.api.types.infer_dtype(cells, skipna=False) not in ("string", "empty"):
+            cells = np.array([str(v) for v in cells], dtype=object)
+        part = f"{col}: " + cells
+        # rows that already have text get a separator, the others start here
+        joined = has_text[present]
+        rows = np.flatnonzero(present)
+        text[rows[joined]] = text[rows[joined]] + " " + part[joined]
+        text[rows[~joined]] = part[~joined]
+        has_text |= present
+    return pd.Series(text, index=df.index)
+
+
+def combine_columns(df, columns_to_combine, chunk_size: Optional[int] = None) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+    """
+    Combine specified columns into a single text column.
+    With chunk_size, returns a generator of row chunks (copies, each with its own
+    'text' column) instead, so the text can be streamed into the embedder.
+    """
+    if chunk_size:
+        return _iter_combined_chunks(df, columns_to_combine, chunk_size)
+    df['text'] = _combined_text(df, columns_to_combine)
     return df
 
+
+def _iter_combined_chunks(df, columns_to_combine, chunk_size) -> Iterator[pd.DataFrame]:
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size].copy()
+        chunk['text'] = _combined_text(chunk, columns_to_combine)
+        yield chunk
+
 def filter_columns(df, columns_to_keep):
     """Filter the dataframe to keep only the specified columns."""
     return df[columns_to_keep]
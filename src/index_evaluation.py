@@ -0,0 +1,202 @@
+"""
+Recall-vs-latency report for the FAISS backends supported by FAISSIndexer
+(flat, ivf_flat, ivf_pq, hnsw) and vector precisions (float32, float16, int8),
+measured against exact float32 search on the applicant vectors stored in the
+current index.
+
+Usage:
+    python -m src.index_evaluation --queries 500 --k 10 --output data/faiss/ann_report.json
+"""
+import argparse
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import faiss
+import numpy as np
+import yaml
+
+from src.indexer import build_index, needs_training
+from src.metadata_store import MetadataStore
+
+# backends evaluated by default: one dict each of index settings (index_type, precision)
+# and query-time settings (nprobe, ef_search), merged over the config's index section
+DEFAULT_BACKENDS: List[Dict[str, Any]] = [
+    {"index_type": "flat"},
+    {"index_type": "flat", "precision": "float16"},
+    {"index_type": "flat", "precision": "int8"},
+    {"index_type": "ivf_flat", "nprobe": 1},
+    {"index_type": "ivf_flat", "nprobe": 8},
+    {"index_type": "ivf_flat", "nprobe": 32},
+    {"index_type": "ivf_pq", "nprobe": 8},
+    {"index_type": "ivf_pq", "nprobe": 32},
+    {"index_type": "hnsw", "ef_search": 16},
+    {"index_type": "hnsw", "ef_search": 64},
+    {"index_type": "hnsw", "ef_search": 128},
+    {"index_type": "hnsw", "ef_search": 64, "precision": "int8"},
+]
+
+
+def load_index_vectors(index_path: str, meta_path: Optional[str] = None,
+                       source: Optional[str] = "applicants") -> np.ndarray:
+    """
+    Read the stored vectors back from a saved FAISS index (must support reconstruct).
+    With `meta_path`, only the ids whose metadata is still stored with the given
+    `source` (None = any) are kept, so tombstones of removed rows are skipped.
+    A float16/int8 index returns its decoded, i.e. already approximated, vectors.
+    """
+    # keep the wrapper referenced: the base index is owned by it
+    wrapper = faiss.read_index(index_path)
+    if isinstance(wrapper, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        base = faiss.downcast_index(wrapper.index)
+        ids = faiss.vector_to_array(wrapper.id_map)
+    else:
+        base = wrapper
+        ids = np.arange(wrapper.ntotal, dtype=np.int64)
+    vectors = base.reconstruct_n(0, base.ntotal)
+    if meta_path is None:
+        return vectors
+    stored_ids, columns = MetadataStore(meta_path).columns(["source"])
+    if source is not None:
+        stored_ids = stored_ids[np.array([value == source for value in columns["source"]], dtype=bool)]
+    return vectors[np.isin(ids, stored_ids)]
+
+
+def recall_at_k(approx_ids: np.ndarray, exact_ids: np.ndarray) -> float:
+    """Fraction of the exact top-k neighbours that the approximate search also returned."""
+    k = exact_ids.shape[1]
+    hits = sum(len(np.intersect1d(a[a >= 0], e[e >= 0])) for a, e in zip(approx_ids, exact_ids))
+    return hits / float(exact_ids.shape[0] * k)
+
+
+def split_queries(vectors: np.ndarray, n_queries: int, seed: int = 42):
+    """(queries, base): hold the query vectors out of the base so no query trivially finds itself."""
+    order = np.random.default_rng(seed).permutation(len(vectors))
+    return vectors[order[:n_queries]], vectors[order[n_queries:]]
+
+
+def _search_params(index: faiss.Index, backend: Dict[str, Any], k: int) -> Optional[faiss.SearchParameters]:
+    base = faiss.downcast_index(index.index)
+    if isinstance(base, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(nprobe=backend.get("nprobe", 16))
+    if isinstance(base, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(efSearch=max(backend.get("ef_search", 64), k))
+    return None
+
+
+def evaluate_backends(vectors: np.ndarray, queries: np.ndarray, backends: List[Dict[str, Any]],
+                      k: int = 10, index_cfg: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Build each backend over `vectors`, run `queries` one at a time (as /predict does)
+    and report build time, serialized size, recall@k against exact float32 search
+    and per-query latency. `index_cfg` supplies defaults (nlist, pq_m, hnsw_m, ...)
+    for every backend; backends store float32 vectors unless they set a precision.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    exact = faiss.IndexFlatIP(vectors.shape[1])
+    exact.add(vectors)
+    _, exact_ids = exact.search(queries, k)
+
+    ids = np.arange(len(vectors), dtype=np.int64)
+    built: Dict[Any, Any] = {}
+    report = []
+    for backend in backends:
+        cfg = {**(index_cfg or {}), "precision": "float32", **backend}
+        build_key = tuple(sorted((key, v) for key, v in cfg.items() if key not in ("nprobe", "ef_search")))
+        if build_key not in built:
+            start = time.perf_counter()
+            train = vectors if needs_training(cfg) else None
+            if train is not None and len(train) > cfg.get("train_sample_size", 50000):
+                rng = np.random.default_rng(0)
+                train = train[rng.choice(len(train), cfg.get("train_sample_size", 50000), replace=False)]
+            index = build_index(cfg, vectors.shape[1], train)
+            index.add_with_ids(vectors, ids)
+            built[build_key] = (index, time.perf_counter() - start)
+        index, build_seconds = built[build_key]
+
+        params = _search_params(index, cfg, k)
+        latencies = []
+        approx_ids = np.empty((len(queries), k), dtype=np.int64)
+        for row, query in enumerate(queries):
+            start = time.perf_counter()
+            _, I = index.search(query.reshape(1, -1), k, params=params)
+            latencies.append(time.perf_counter() - start)
+            approx_ids[row] = I[0]
+
+        latencies_ms = np.array(latencies) * 1000.0
+        report.append({
+            "index_type": cfg["index_type"],
+            "precision": cfg["precision"],
+            "nprobe": backend.get("nprobe"),
+            "ef_search": backend.get("ef_search"),
+            "build_seconds": round(build_seconds, 3),
+            "index_bytes": int(faiss.serialize_index(index).nbytes),
+            f"recall@{k}": round(recall_at_k(approx_ids, exact_ids), 4),
+            "latency_mean_ms": round(float(latencies_ms.mean()), 4),
+            "latency_p95_ms": round(float(np.percentile(latencies_ms, 95)), 4),
+        })
+    return report
+
+
+def precision_report(vectors: np.ndarray, index_cfg: Dict[str, Any], k: int = 10,
+                     n_queries: int = 200) -> Optional[Dict[str, Any]]:
+    """
+    Compare the backend of `index_cfg` at its configured precision with the same
+    backend in float32, on `vectors` (float32, with n_queries of them held out as
+    queries): size ratio, recall@k of both and the recall change. None when there
+    are too few vectors to hold queries out.
+    """
+    n_queries = min(n_queries, len(vectors) // 5)
+    if n_queries == 0:
+        return None
+    queries, base = split_queries(np.ascontiguousarray(vectors, dtype=np.float32), n_queries)
+    precision = index_cfg.get("precision", "float32")
+    full, reduced = evaluate_backends(base, queries, [{"precision": "float32"}, {"precision": precision}],
+                                      k=k, index_cfg=index_cfg)
+    recall = f"recall@{k}"
+    return {
+        "precision": precision,
+        "sample_vectors": len(base),
+        "sample_index_bytes": reduced["index_bytes"],
+        "sample_float32_index_bytes": full["index_bytes"],
+        recall: reduced[recall],
+        f"float32_{recall}": full[recall],
+        "recall_change": round(reduced[recall] - full[recall], 4),
+        "latency_mean_ms": reduced["latency_mean_ms"],
+        "float32_latency_mean_ms": full["latency_mean_ms"],
+    }
+
+
+def print_report(report: List[Dict[str, Any]]) -> None:
+    """Print the report as an aligned table."""
+    columns = list(dict.fromkeys(key for row in report for key in row))
+    widths = {c: max(len(c), *(len(str(row.get(c))) for row in report)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for row in report:
+        print("  ".join(("" if row.get(c) is None else str(row[c])).ljust(widths[c]) for c in columns))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Recall vs latency of FAISS backends against exact search.")
+    parser.add_argument("--config", default=os.path.join("src", "config", "index_config.yaml"))
+    parser.add_argument("--queries", type=int, default=500, help="held-out applicant vectors used as queries")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--output", default=None, help="optional path for a JSON copy of the report")
+    args = parser.parse_args(argv)
+
+    with open(args.config) as f:
+        config = yaml.safe_load(f)
+    vectors = load_index_vectors(config["paths"]["index_path"], config["paths"].get("meta_path"))
+    queries, base = split_queries(vectors, args.queries)
+
+    report = evaluate_backends(base, queries, DEFAULT_BACKENDS, k=args.k, index_cfg=config.get("index", {}))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,161 +1,847 @@
+import hashlib
+import json
 import os
-import pickle
-from typing import Any, Dict, List, Optional
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Union
 import numpy as np
 
+from src.lexical_index import BM25Index, fuse_scores
+from src.metadata_store import MetadataStore
+from src.metrics import track_faiss_search, track_stage
+from src.utils import lazy_import
+
 # FAISS: install with `pip install faiss-cpu` on macOS/linux (or conda install -c pytorch faiss-cpu)
-import faiss
+# imported on first use so that importing this module stays cheap
+faiss = lazy_import("faiss")
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# Filterable attributes, mirroring transform_metadata / extract_filters_from_text:
+# categorical columns become one dummy key per known value, the language
+# columns become a single "has a value" flag.
+CATEGORICAL_FILTERS = {
+    "nivel_profissional": ["Junior", "Pleno", "Senior"],
+    "nivel_academico": ["Ensino Médio", "Graduação", "Pós-Graduação", "Mestrado", "Doutorado"],
+    "cidade": ["São Paulo", "Rio de Janeiro", "Belo Horizonte", "Curitiba", "Porto Alegre",
+               "Salvador", "Brasília", "Fortaleza", "Recife", "Manaus"],
+}
+PRESENCE_FILTERS = ("nivel_ingles", "nivel_espanhol")
+# metadata columns read to build the source/filter bitmaps ("local" backs "cidade")
+FILTER_COLUMNS = ("source", *CATEGORICAL_FILTERS, "local", *PRESENCE_FILTERS)
+TRAINED_INDEX_TYPES = ("ivf_flat", "ivf_pq")
+# Storage precision of the vectors (index.precision): float16 and int8 go through a
+# faiss ScalarQuantizer, int8 with a per-dimension range learned from training vectors.
+# ivf_pq already stores compressed codes and ignores it.
+PRECISIONS = {"float32": None, "float16": "QT_fp16", "int8": "QT_8bit"}
+
+
+def needs_training(index_cfg: Dict[str, Any]) -> bool:
+    """True if the index described by `index_cfg` must be trained before the first add."""
+    return (index_cfg.get("index_type", "flat") in TRAINED_INDEX_TYPES
+            or index_cfg.get("precision", "float32") == "int8")
+
+
+def min_train_size(index_cfg: Dict[str, Any]) -> int:
+    """
+    Vectors FAISSIndexer buffers before it trains the index on its own: ~39 per IVF
+    list (the FAISS k-means minimum, at most train_sample_size) and, for ivf_pq, one
+    per PQ centroid. Scalar quantizers (int8) can train on any number.
+    """
+    index_type = index_cfg.get("index_type", "flat")
+    if index_type not in TRAINED_INDEX_TYPES:
+        return 1
+    n = min(39 * index_cfg.get("nlist", 1024), index_cfg.get("train_sample_size", 50000))
+    if index_type == "ivf_pq":
+        n = max(n, 2 ** index_cfg.get("pq_nbits", 8))
+    return n
+
+
+def build_index(index_cfg: Dict[str, Any], dim: int, train_vectors: Optional[np.ndarray] = None) -> "faiss.Index":
+    """
+    Build the (empty) FAISS index described by the `index` section of index_config.yaml,
+    wrapped in IndexIDMap2 so every backend accepts explicit ids and reconstruct().
+    All backends use inner product, so embeddings should be normalized.
+
+    index.precision picks how flat, ivf_flat and hnsw store the vectors (see
+    PRECISIONS). Trained indexes (IVF, int8) are trained on `train_vectors`; nlist
+    is capped so every list gets at least ~39 training points (the FAISS k-means minimum).
+    """
+    index_type = index_cfg.get("index_type", "flat")
+    precision = index_cfg.get("precision", "float32")
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}', expected one of {tuple(PRECISIONS)}")
+    qtype = getattr(faiss.ScalarQuantizer, PRECISIONS[precision]) if PRECISIONS[precision] else None
+    if needs_training(index_cfg) and (train_vectors is None or len(train_vectors) == 0):
+        raise ValueError(f"index_type '{index_type}' with precision '{precision}' needs training vectors")
+    if index_type == "ivf_pq" and len(train_vectors) < 2 ** index_cfg.get("pq_nbits", 8):
+        raise ValueError(f"index_type 'ivf_pq' needs at least {2 ** index_cfg.get('pq_nbits', 8)} "
+                         f"training vectors, got {len(train_vectors)}")
+
+    if index_type == "flat":
+        base = faiss.IndexFlatIP(dim) if qtype is None else faiss.IndexScalarQuantizer(
+            dim, qtype, faiss.METRIC_INNER_PRODUCT)
+    elif index_type == "hnsw":
+        if qtype is None:
+            base = faiss.IndexHNSWFlat(dim, index_cfg.get("hnsw_m", 32), faiss.METRIC_INNER_PRODUCT)
+        else:
+            base = faiss.IndexHNSWSQ(dim, qtype, index_cfg.get("hnsw_m", 32), faiss.METRIC_INNER_PRODUCT)
+        base.hnsw.efConstruction = index_cfg.get("ef_construction", 200)
+    elif index_type in TRAINED_INDEX_TYPES:
+        nlist = max(1, min(index_cfg.get("nlist", 1024), len(train_vectors) // 39))
+        quantizer = faiss.IndexFlatIP(dim)
+        if index_type == "ivf_pq":
+            base = faiss.IndexIVFPQ(quantizer, dim, nlist, index_cfg.get("pq_m", 16),
+                                    index_cfg.get("pq_nbits", 8), faiss.METRIC_INNER_PRODUCT)
+        elif qtype is None:
+            base = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            base = faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, qtype, faiss.METRIC_INNER_PRODUCT)
+    else:
+        raise ValueError(f"Unknown index_type '{index_type}', expected one of {INDEX_TYPES}")
+    if needs_training(index_cfg):
+        base.train(np.ascontiguousarray(train_vectors, dtype=np.float32))
+    return faiss.IndexIDMap2(base)
+
 
 class FAISSIndexer:
     """
-    Simple FAISS indexer using IndexFlatIP (inner product) for cosine search.
+    FAISS indexer using inner product for cosine search.
     Embeddings should already be normalized (so IP ~= cosine similarity).
-    Stores metadata mapping (int id -> metadata) in a pickle.
+    The backend (flat, ivf_flat, ivf_pq, hnsw) is chosen by index.index_type.
+    Stores metadata (int id -> metadata dict) in a memory-mapped columnar
+    MetadataStore next to the index.
+
+    With lexical.enabled, the applicant texts are also kept in a BM25Index saved
+    next to the index, and queries that pass their texts get the dense and BM25
+    scores fused (see query_embeddings).
     """
     def __init__(self, config: Dict[str, Any]):
         self.index_path = config.get("paths", {}).get("index_path", "src/data/faiss.index")
-        self.meta_path = config.get("paths", {}).get("meta_path", "src/data/faiss_meta.pkl")
-        self.index_type = config.get("index", {}).get("index_type", "flat")
-        self.k_default = config.get("index", {}).get("k", 5)
+        self.meta_path = config.get("paths", {}).get("meta_path", "src/data/faiss_meta.arrow")
+        self.index_cfg = config.get("index", {})
+        self.index_type = self.index_cfg.get("index_type", "flat")
+        self.precision = self.index_cfg.get("precision", "float32")
+        self.k_default = self.index_cfg.get("k", 5)
+        self.checkpoint_every = self.index_cfg.get("checkpoint_every")
+        self.train_sample_size = self.index_cfg.get("train_sample_size", 50000)
+        # query-time knobs for the approximate backends (see set_search_params)
+        self.nprobe = self.index_cfg.get("nprobe", 16)
+        self.ef_search = self.index_cfg.get("ef_search", 64)
+        # filtered search on approximate backends (see _filtered_search)
+        self.exact_scan_max = self.index_cfg.get("exact_scan_max", 20000)
+        self.min_selectivity = self.index_cfg.get("min_selectivity", 0.02)
+        self.max_fetch_rounds = self.index_cfg.get("max_fetch_rounds", 4)
+        # open the saved index memory-mapped and read-only (see _load)
+        self.mmap = self.index_cfg.get("mmap", False)
+        self._mmapped = False
+        # hybrid retrieval: BM25 over the metadata text, fused with the dense scores
+        self.lexical_cfg = config.get("lexical", {})
+        self.lexical_weight = self.lexical_cfg.get("weight", 0.3)
+        self.lexical_candidates = self.lexical_cfg.get("candidates", 100)
+        self.lexical_field = self.lexical_cfg.get("text_field", "text")
+        self.bm25_path = config.get("paths", {}).get(
+            "bm25_path", os.path.join(os.path.dirname(self.index_path), "bm25.npz"))
+        # vectors added to an index that is not trained yet (see _train_buffer)
+        self.train_buffer_path = self.index_path + ".untrained.npz"
+        self.lexical: Optional[BM25Index] = None
         os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
 
         self.index: Optional[faiss.Index] = None
-        self.metadata: Dict[int, Any] = {}
+        self.metadata = MetadataStore()
         self.next_id = 0
+        # Bulk-ingest state: while active, inserts are only flushed to disk at
+        # checkpoints and when the bulk_ingest() block exits.
+        self._bulk_depth = 0
+        self._pending_rows = 0
+        self._checkpoint_every: Optional[int] = None
+        # Per-source id bitmaps (bit i set <=> id i belongs to that source), packed
+        # little-endian as expected by faiss.IDSelectorBitmap and kept up to date on insert.
+        self._source_bitmaps: Dict[str, np.ndarray] = {}
+        # Same layout for the filterable attributes: one bitmap per filter key
+        # ("Senior", "São Paulo", "nivel_ingles", ...) with the ids whose value is 1.
+        self._filter_bitmaps: Dict[str, np.ndarray] = {}
+        # IVF and int8 indexes need training before the first add: vectors are held
+        # here until train_sample_size rows, or until a save finds min_train_size of
+        # them (or train() is called). Until then they are saved next to the index
+        # and are not searchable.
+        self._train_buffer: List[Any] = []
+        # float32 copies of the first precision_sample_size vectors added to a reduced
+        # precision index, to measure what the quantization costs (see precision_report)
+        self.quantized = self.precision != "float32" and self.index_type != "ivf_pq"
+        self.precision_sample_size = self.index_cfg.get("precision_sample_size", 10000)
+        self._precision_sample: List[np.ndarray] = []
 
         self._load()
+        # only the filterable columns are decoded to build the bitmaps
+        self._index_metadata(*self.metadata.columns(FILTER_COLUMNS))
 
-    def _init_index(self, dim: int):
-        # Use IndexFlatIP so you can use normalized embeddings for cosine-like similarity
-        if self.index_type == "flat":
-            self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
-        else:
-            # fallback to flat
-            self.index = faiss.IndexFlatIP(dim)
+    def _init_index(self, dim: int, train_vectors: Optional[np.ndarray] = None):
+        self.index = build_index(self.index_cfg, dim, train_vectors)
+        self._mmapped = False
+
+    def _ensure_writable(self):
+        """A memory-mapped index is read-only: load a private in-memory copy before modifying it."""
+        if self._mmapped:
+            self.index = faiss.read_index(self.index_path)
+            self._mmapped = False
+
+    def _buffered_rows(self) -> int:
+        return sum(len(ids) for _, ids in self._train_buffer)
+
+    def _train_pending(self):
+        """Train a new IVF index on a sample of the buffered vectors, then add all of them."""
+        if not self._train_buffer:
+            return
+        emb = np.concatenate([e for e, _ in self._train_buffer])
+        ids = np.concatenate([i for _, i in self._train_buffer])
+        self._train_buffer = []
+        sample = emb
+        if len(emb) > self.train_sample_size:
+            rng = np.random.default_rng(0)
+            sample = emb[rng.choice(len(emb), self.train_sample_size, replace=False)]
+        self._init_index(emb.shape[1], sample)
+        self.index.add_with_ids(emb, ids)
+
+    def train(self):
+        """
+        Train the index now on the vectors buffered so far, however few (build_index
+        reduces nlist to fit them), and save it. Raises ValueError when they are too
+        few to train the backend at all (ivf_pq).
+        """
+        if self.index is not None or not self._train_buffer:
+            return
+        self._train_pending()
+        self._after_insert(0)
+
+    def _base_index(self):
+        """The index behind the IndexIDMap wrapper, downcast to its concrete type."""
+        if isinstance(self.index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+            return faiss.downcast_index(self.index.index)
+        return self.index
+
+    def set_search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+        """Override the query-time recall/latency trade-off (IVF nprobe, HNSW efSearch)."""
+        if nprobe is not None:
+            self.nprobe = nprobe
+        if ef_search is not None:
+            self.ef_search = ef_search
 
     def _load(self):
         if os.path.exists(self.index_path):
+            self.index = None
+            # faiss builds without IO_FLAG_MMAP_IFC (older releases) fall back to a normal read
+            if self.mmap and hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+                # vectors/codes stay in the page cache, shared by every process that maps the file
+                try:
+                    self.index = faiss.read_index(self.index_path, faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+                    self._mmapped = True
+                except Exception:
+                    self.index = None
+            if self.index is None:
+                try:
+                    self.index = faiss.read_index(self.index_path)
+                except Exception:
+                    self.index = None
+        try:
+            # also migrates a legacy faiss_meta.pkl found next to meta_path
+            self.metadata = MetadataStore(self.meta_path)
+        except Exception:
+            self.metadata = MetadataStore()
+        self.metadata.path = self.meta_path
+        self.next_id = self.metadata.max_id() + 1
+        if self.index is None and os.path.exists(self.train_buffer_path):
+            with np.load(self.train_buffer_path) as data:
+                self._train_buffer = [(data["embeddings"], data["ids"])]
+        if self.lexical_cfg.get("enabled", False):
+            self._load_lexical()
+
+    def _new_lexical(self, path: Optional[str] = None) -> BM25Index:
+        return BM25Index(path, k1=self.lexical_cfg.get("k1", 1.2), b=self.lexical_cfg.get("b", 0.75),
+                         max_df=self.lexical_cfg.get("max_df"))
+
+    def _load_lexical(self):
+        """
+        Open the saved BM25 index; when it is missing or older than the metadata (e.g. the
+        index was built with lexical disabled) rebuild it from the stored texts and write
+        it back, so later loads (every API worker) find it fresh. The BM25 weights are
+        computed here, not on the first query.
+        """
+        stale = not os.path.exists(self.bm25_path) or (
+            os.path.exists(self.meta_path) and os.path.getmtime(self.bm25_path) < os.path.getmtime(self.meta_path))
+        try:
+            self.lexical = self._new_lexical(None if stale else self.bm25_path)
+        except Exception:
+            self.lexical, stale = self._new_lexical(), True
+        if stale and len(self.metadata):
+            ids, columns = self.metadata.columns([self.lexical_field])
+            self.lexical.add(ids, columns[self.lexical_field])
             try:
-                self.index = faiss.read_index(self.index_path)
-            except Exception:
-                self.index = None
-        if os.path.exists(self.meta_path):
-            try:
-                with open(self.meta_path, "rb") as f:
-                    data = pickle.load(f)
-                    self.metadata = data.get("metadata", {})
-                    self.next_id = max(self.metadata.keys()) + 1 if self.metadata else 0
-            except Exception:
-                self.metadata = {}
-                self.next_id = 0
+                self.lexical.save(self.bm25_path)
+            except OSError:
+                pass  # read-only deployment: keep the rebuilt index in memory
+        self.lexical.refresh()
 
     def _save(self):
+        """
+        Persist index and metadata. Both files are written to a temporary path
+        first and then renamed, so readers never observe a half-written artifact.
+        """
+        if self._buffered_rows() >= min_train_size(self.index_cfg):
+            self._train_pending()
         if self.index is not None:
-            faiss.write_index(self.index, self.index_path)
-        with open(self.meta_path, "wb") as f:
-            pickle.dump({"metadata": self.metadata}, f)
+            tmp_index_path = self.index_path + ".tmp"
+            faiss.write_index(self.index, tmp_index_path)
+            os.replace(tmp_index_path, self.index_path)
+        if self.index is None and self._train_buffer:
+            tmp_buffer_path = self.train_buffer_path + ".tmp"
+            with open(tmp_buffer_path, "wb") as f:
+                np.savez(f, embeddings=np.concatenate([e for e, _ in self._train_buffer]),
+                         ids=np.concatenate([i for _, i in self._train_buffer]))
+            os.replace(tmp_buffer_path, self.train_buffer_path)
+        elif os.path.exists(self.train_buffer_path):
+            os.remove(self.train_buffer_path)
+        self.metadata.save(self.meta_path)
+        # written after the metadata, so an older file means a stale BM25 index (see _load_lexical)
+        if self.lexical is not None:
+            self.lexical.save(self.bm25_path)
+            self.lexical.refresh()
+        self._pending_rows = 0
 
-    def add_embedding(self, embedding: np.ndarray, metadata: Optional[Dict] = None):
+    @contextmanager
+    def bulk_ingest(self, checkpoint_every: Optional[int] = None):
         """
-        embedding: 1D numpy array (float32) or 2D (n, dim). If 1D, adds single vector.
-        metadata: optional dict to associate with this vector.
-        Returns assigned id(s).
+        Defer persistence while adding many vectors.
+
+        Inside the block, add_embedding/add_embeddings only update the in-memory
+        index; everything is flushed once when the block exits, plus every
+        `checkpoint_every` rows if given (defaults to index.checkpoint_every in
+        the config, None = flush only at the end).
+
+        Usage:
+            with indexer.bulk_ingest(checkpoint_every=50_000):
+                indexer.add_embeddings(matrix, metadatas)
+        """
+        if self._bulk_depth == 0:
+            self._checkpoint_every = checkpoint_every or self.checkpoint_every
+        self._bulk_depth += 1
+        try:
+            yield self
+        finally:
+            self._bulk_depth -= 1
+            if self._bulk_depth == 0:
+                self._checkpoint_every = None
+                if self._pending_rows:
+                    self._save()
+
+    @staticmethod
+    def _set_bits(bitmaps: Dict[Any, np.ndarray], key: Any, ids: List[int]):
+        """Set `ids` in bitmaps[key] (packed little-endian, as expected by faiss.IDSelectorBitmap)."""
+        id_arr = np.asarray(ids, dtype=np.int64)
+        bitmap = bitmaps.get(key, np.zeros(0, dtype=np.uint8))
+        needed = int(id_arr.max()) // 8 + 1
+        if needed > len(bitmap):
+            # grow geometrically so bulk inserts stay amortised O(1) per id
+            grown = np.zeros(max(needed, 2 * len(bitmap)), dtype=np.uint8)
+            grown[:len(bitmap)] = bitmap
+            bitmap = grown
+        np.bitwise_or.at(bitmap, id_arr >> 3, (1 << (id_arr & 7)).astype(np.uint8))
+        bitmaps[key] = bitmap
+
+    def _index_metadata(self, ids, columns: Dict[str, Sequence[Any]]):
+        """
+        Record `ids` in the source bitmaps and in the bitmaps of every filter key they
+        satisfy. `columns` maps each of FILTER_COLUMNS to its values, aligned with `ids`.
+        """
+        by_source: Dict[str, List[int]] = {}
+        by_filter: Dict[str, List[int]] = {}
+        ids = [int(i) for i in ids]
+        for i, source in zip(ids, columns["source"]):
+            by_source.setdefault(source, []).append(i)
+        for column, values in CATEGORICAL_FILTERS.items():
+            column_values = columns[column]
+            if column == "cidade":
+                column_values = [v if v is not None else local for v, local in zip(column_values, columns["local"])]
+            for i, value in zip(ids, column_values):
+                if value in values:
+                    by_filter.setdefault(value, []).append(i)
+        for column in PRESENCE_FILTERS:
+            for i, value in zip(ids, columns[column]):
+                if _has_value(value):
+                    by_filter.setdefault(column, []).append(i)
+        for source, source_ids in by_source.items():
+            self._set_bits(self._source_bitmaps, source, source_ids)
+        for key, key_ids in by_filter.items():
+            self._set_bits(self._filter_bitmaps, key, key_ids)
+
+    def _filter_bitmap(self, filters: Dict[str, Any], bitmap: np.ndarray) -> np.ndarray:
+        """
+        AND the filter bitmaps into `bitmap`: {key: 1} keeps ids with the attribute,
+        {key: 0} ids without it. Keys that are not filterable attributes match nothing.
+        """
+        mask = bitmap.copy()
+        for key, value in filters.items():
+            column = self._filter_bitmaps.get(key, np.zeros(0, dtype=np.uint8))[:len(mask)]
+            column = np.pad(column, (0, len(mask) - len(column)))
+            if value == 1:
+                mask &= column
+            elif value == 0:
+                mask &= ~column
+            else:
+                mask[:] = 0
+        return mask
+
+    def _search(self, emb: np.ndarray, k: int, bitmap: Optional[np.ndarray] = None, nprobe: Optional[int] = None):
         """
-        if embedding.ndim == 1:
-            emb = embedding.reshape(1, -1)
+        index.search restricted to the ids set in `bitmap` (all ids if None), using the
+        configured nprobe/efSearch for approximate backends. Never mutates the index.
+        """
+        kwargs = {}
+        if bitmap is not None:
+            kwargs["sel"] = faiss.IDSelectorBitmap(len(bitmap) * 8, faiss.swig_ptr(bitmap))
+        base = self._base_index()
+        if isinstance(base, faiss.IndexIVF):
+            params = faiss.SearchParametersIVF(nprobe=min(nprobe or self.nprobe, base.nlist), **kwargs)
+        elif isinstance(base, faiss.IndexHNSW):
+            params = faiss.SearchParametersHNSW(efSearch=max(self.ef_search, k), **kwargs)
+        elif kwargs:
+            params = faiss.SearchParameters(**kwargs)
         else:
-            emb = embedding
+            return self.index.search(emb, k)
+        return self.index.search(emb, k, params=params)
+
+    @track_faiss_search()
+    def _filtered_search(self, emb: np.ndarray, k: int, bitmap: np.ndarray, search_k: Optional[int] = None):
+        """
+        Top-k search among the ids set in `bitmap` that returns min(k, matching ids)
+        hits for every query row, never falling back to unselected ids.
+
+        Flat indexes are exact, so one selector search is enough. Approximate
+        backends can miss matches when the selector prunes most of what they visit:
+        small or selective subsets (<= exact_scan_max ids or < min_selectivity of
+        the index) are scanned exactly, otherwise the candidate pool starts at
+        max(k, search_k) and doubles, together with nprobe/efSearch, for up to
+        max_fetch_rounds before falling back to the exact scan.
+        """
+        n_match = int(np.unpackbits(bitmap).sum())
+        if n_match == 0:
+            empty = np.empty((emb.shape[0], 0))
+            return empty, empty.astype(np.int64)
+        base = self._base_index()
+        if isinstance(base, faiss.IndexFlatCodes):
+            # flat storage (float32 or scalar-quantized) is scanned exhaustively
+            return self._search(emb, k, bitmap)
+        if n_match <= self.exact_scan_max or n_match < self.min_selectivity * self.index.ntotal:
+            return self._exact_search(emb, k, bitmap)
+
+        needed = min(k, n_match)
+        fetch, nprobe = max(k, search_k or 0), self.nprobe
+        for _ in range(self.max_fetch_rounds):
+            D, I = self._search(emb, fetch, bitmap, nprobe=nprobe)
+            if ((I >= 0).sum(axis=1) >= needed).all():
+                return D[:, :k], I[:, :k]
+            fetch, nprobe = fetch * 2, nprobe * 2
+        return self._exact_search(emb, k, bitmap)
+
+    def _exact_search(self, emb: np.ndarray, k: int, bitmap: np.ndarray):
+        """Exhaustive top-k over the ids set in `bitmap` only."""
+        base = self._base_index()
+        if isinstance(base, faiss.IndexIVF):
+            # visiting every list with the selector is an exact scan of the subset
+            return self._search(emb, k, bitmap, nprobe=base.nlist)
+        ids = np.flatnonzero(np.unpackbits(bitmap, bitorder="little"))
+        vecs = self.index.reconstruct_batch(ids)
+        scores = emb @ vecs.T
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(top_scores, order, axis=1), ids[np.take_along_axis(top, order, axis=1)]
+
+    def _after_insert(self, n: int):
+        if self._bulk_depth == 0:
+            self._save()
+            return
+        self._pending_rows += n
+        if self._checkpoint_every and self._pending_rows >= self._checkpoint_every:
+            self._save()
 
-        emb = emb.astype(np.float32)
+    def add_embeddings(self, embeddings: np.ndarray, metadatas: Optional[Sequence[Optional[Dict]]] = None,
+                       ids: Optional[Sequence[int]] = None) -> np.ndarray:
+        """
+        Add an (n, dim) matrix in one FAISS call.
+        metadatas: optional list with one dict per row (same length as embeddings).
+        ids: explicit ids for the rows (must not be in the index); default = the next free ids.
+        Returns the assigned ids as an int64 array.
+        """
+        emb = np.ascontiguousarray(np.atleast_2d(embeddings), dtype=np.float32)
         n, dim = emb.shape
+        if metadatas is not None and len(metadatas) != n:
+            raise ValueError(f"Got {len(metadatas)} metadata entries for {n} embeddings")
 
-        if self.index is None:
+        if self.index is None and not needs_training(self.index_cfg):
             self._init_index(dim)
+        self._ensure_writable()
+        sampled = sum(len(sample) for sample in self._precision_sample)
+        if self.quantized and sampled < self.precision_sample_size:
+            self._precision_sample.append(emb[:self.precision_sample_size - sampled].copy())
 
-        # Assign ids and add metadata
-        ids = []
-        for i in range(n):
-            assigned_id = self.next_id
-            self.metadata[assigned_id] = metadata if metadata is not None else {}
-            ids.append(assigned_id)
-            self.next_id += 1
+        if ids is None:
+            id_arr = np.arange(self.next_id, self.next_id + n, dtype=np.int64)
+        else:
+            id_arr = np.asarray(ids, dtype=np.int64)
+        metadatas = [m if m is not None else {} for m in metadatas] if metadatas is not None else [{} for _ in range(n)]
+        self.metadata.add(id_arr.tolist(), metadatas)
+        self.next_id = max(self.next_id, int(id_arr.max()) + 1) if n else self.next_id
+        self._index_metadata(id_arr, {column: [m.get(column) for m in metadatas] for column in FILTER_COLUMNS})
+        if self.lexical is not None:
+            self.lexical.add(id_arr, [m.get(self.lexical_field) for m in metadatas])
 
-        # FAISS IndexFlat does not support supplying explicit ids; appends in order.
-        id_arr = np.array(ids, dtype=np.int64)
+        if self.index is None:
+            # untrained IVF/int8: buffer until we have enough vectors to train on (see _save)
+            self._train_buffer.append((emb, id_arr))
+            if self._buffered_rows() >= max(self.train_sample_size, min_train_size(self.index_cfg)):
+                self._train_pending()
         # if the FAISS index supports add_with_ids (e.g., IndexIDMap/IndexIDMap2)
-        if hasattr(self.index, "add_with_ids"):
+        elif hasattr(self.index, "add_with_ids"):
             self.index.add_with_ids(emb, id_arr)
         else:
-            # fallback for plain IndexFlat*
+            # fallback for plain IndexFlat* (appends in order, so ids stay positional)
             self.index.add(emb)
-        self._save()
+        self._after_insert(n)
+        return id_arr
+
+    def _removes_vectors(self) -> bool:
+        """
+        True if vectors can be deleted from the index. IndexIDMap2.remove_ids is only
+        correct over flat indexes (any precision): HNSW does not implement it and on IVF
+        it breaks the id mapping, so those backends keep deleted vectors as unreachable tombstones.
+        """
+        return self.index is not None and isinstance(self._base_index(), faiss.IndexFlatCodes)
+
+    def _clear_bits(self, ids: np.ndarray):
+        """Unset `ids` in every source/filter bitmap, so no search can return them."""
+        for bitmaps in (self._source_bitmaps, self._filter_bitmaps):
+            for bitmap in bitmaps.values():
+                inside = ids[ids >> 3 < len(bitmap)]
+                np.bitwise_and.at(bitmap, inside >> 3, ~(1 << (inside & 7)).astype(np.uint8))
+
+    def _remove(self, id_arr: np.ndarray):
+        self._clear_bits(id_arr)
+        self.metadata.remove(id_arr.tolist())
+        if self.lexical is not None:
+            self.lexical.remove(id_arr)
+        if self._removes_vectors():
+            self._ensure_writable()
+            self.index.remove_ids(id_arr)
+
+    def remove_ids(self, ids: Sequence[int]) -> int:
+        """
+        Delete the vectors and metadata of `ids`. On backends that cannot delete
+        vectors (see _removes_vectors) the vectors stay in the index, but with their
+        bits cleared no search returns them; rebuild the index to reclaim the space.
+        Returns the number of ids removed.
+        """
+        id_arr = np.asarray(ids, dtype=np.int64)
+        if not len(id_arr):
+            return 0
+        self._remove(id_arr)
+        self._after_insert(len(id_arr))
+        return len(id_arr)
+
+    def update_embeddings(self, ids: Sequence[int], embeddings: np.ndarray,
+                          metadatas: Optional[Sequence[Optional[Dict]]] = None) -> np.ndarray:
+        """
+        Replace the vectors (and metadata) of existing `ids`, which keep their ids on
+        every backend and do not grow the index: flat indexes delete and re-add the
+        rows, the other backends overwrite the stored vectors (see _replace_vectors).
+        Returns the ids now holding the rows.
+        """
+        id_arr = np.asarray(ids, dtype=np.int64)
+        if self._removes_vectors():
+            self._remove(id_arr)
+            return self.add_embeddings(embeddings, metadatas, ids=id_arr)
+        emb = np.ascontiguousarray(np.atleast_2d(embeddings), dtype=np.float32)
+        if not len(id_arr):
+            return id_arr
+        self._replace_vectors(id_arr, emb)
+        self.update_metadata(id_arr, metadatas if metadatas is not None else [{} for _ in id_arr])
+        return id_arr
+
+    def _replace_vectors(self, id_arr: np.ndarray, emb: np.ndarray):
+        """
+        Overwrite the stored vectors of `id_arr` without changing their ids.
+        IVF indexes move them to their new lists (update_vectors, through a direct map
+        built on first use); HNSW re-encodes them into the graph storage, keeping the
+        node's links, which were built for the old vector. Ids still waiting in the
+        training buffer are replaced there, ids not in the index are added.
+        """
+        pending = np.zeros(len(id_arr), dtype=bool)
+        for n, (buffered_emb, buffered_ids) in enumerate(self._train_buffer):
+            pos = _positions_of(buffered_ids, id_arr)
+            if (pos >= 0).any():
+                # copied: the buffer may hold the caller's array
+                buffered_emb = buffered_emb.copy()
+                buffered_emb[pos[pos >= 0]] = emb[pos >= 0]
+                self._train_buffer[n] = (buffered_emb, buffered_ids)
+                pending |= pos >= 0
+        if self.index is None:
+            if not pending.all():
+                self._train_buffer.append((emb[~pending].copy(), id_arr[~pending]))
+            return
+        self._ensure_writable()
+        internal = _positions_of(faiss.vector_to_array(self.index.id_map), id_arr)
+        internal[pending] = -1
+        found = internal >= 0
+        base = self._base_index()
+        if found.any() and isinstance(base, faiss.IndexIVF):
+            if base.direct_map.type == faiss.DirectMap.NoMap:
+                base.make_direct_map()
+            base.update_vectors(internal[found], np.ascontiguousarray(emb[found]))
+        elif found.any():
+            storage = faiss.downcast_index(base.storage) if isinstance(base, faiss.IndexHNSW) else base
+            codes = faiss.rev_swig_ptr(storage.codes.data(), storage.ntotal * storage.code_size)
+            codes = codes.reshape(storage.ntotal, storage.code_size)
+            codes[internal[found]] = storage.sa_encode(np.ascontiguousarray(emb[found]))
+        missing = ~found & ~pending
+        if missing.any():
+            self.index.add_with_ids(np.ascontiguousarray(emb[missing]), id_arr[missing])
+
+    def update_metadata(self, ids: Sequence[int], metadatas: Sequence[Dict]):
+        """Replace the metadata of existing `ids` (and their filter bits) without touching the vectors."""
+        id_arr = np.asarray(ids, dtype=np.int64)
+        if not len(id_arr):
+            return
+        metadatas = list(metadatas)
+        self._clear_bits(id_arr)
+        self.metadata.add(id_arr.tolist(), metadatas)
+        self._index_metadata(id_arr, {column: [m.get(column) for m in metadatas] for column in FILTER_COLUMNS})
+        if self.lexical is not None:
+            self.lexical.add(id_arr, [m.get(self.lexical_field) for m in metadatas])
+        self._after_insert(len(id_arr))
+
+    def reset(self):
+        """Drop every vector and all metadata (the files are overwritten on the next save)."""
+        self.index = None
+        self._mmapped = False
+        self.metadata = MetadataStore()
+        self.metadata.path = self.meta_path
+        self.next_id = 0
+        self._source_bitmaps = {}
+        self._filter_bitmaps = {}
+        self._train_buffer = []
+        self._precision_sample = []
+        if self.lexical is not None:
+            self.lexical = self._new_lexical()
+
+    def add_embedding(self, embedding: np.ndarray, metadata: Optional[Union[Dict, Sequence[Dict]]] = None):
+        """
+        embedding: 1D numpy array (float32) or 2D (n, dim). If 1D, adds single vector.
+        metadata: optional dict to associate with this vector. For a 2D input either
+            a list with one dict per row, or a single dict shared by every row.
+        Returns assigned id(s).
+        """
+        emb = embedding.reshape(1, -1) if embedding.ndim == 1 else embedding
+        n = emb.shape[0]
+        if metadata is None:
+            metadatas = None
+        elif isinstance(metadata, dict):
+            metadatas = [metadata] + [dict(metadata) for _ in range(n - 1)]
+        else:
+            metadatas = list(metadata)
+        ids = self.add_embeddings(emb, metadatas).tolist()
         return ids if len(ids) > 1 else ids[0]
 
-    
+    def count(self, source: Optional[str] = "applicants") -> int:
+        """Live vectors of `source` (all sources for None); tombstoned ids are not counted."""
+        bitmaps = self._source_bitmaps.values() if source is None else [self._source_bitmaps.get(source)]
+        return sum(int(np.unpackbits(bitmap).sum()) for bitmap in bitmaps if bitmap is not None)
 
-    def query_embedding(self, embedding: np.ndarray, k: Optional[int] = None, filters: Optional[Dict] = None) -> List[Dict]:
+    @property
+    def nbytes(self) -> int:
         """
-        Returns list of dicts: [{id, score, metadata}, ...]
-        Filters can be applied to metadata: e.g., {"column_name": "value"}.
+        Approximate bytes held by the index: vector codes, id map, HNSW links or
+        IVF centroids, plus the source/filter bitmaps. Shared page cache when mmapped.
         """
-        if k is None:
-            k = self.k_default
-        if self.index is None or self.index.ntotal == 0:
-            return []
+        nbytes = sum(b.nbytes for b in self._source_bitmaps.values())
+        nbytes += sum(b.nbytes for b in self._filter_bitmaps.values())
+        if self.index is None:
+            return nbytes
+        base, n = self._base_index(), self.index.ntotal
+        if base is not self.index:
+            nbytes += n * 8  # id map
+        if isinstance(base, faiss.IndexHNSW):
+            nbytes += base.hnsw.neighbors.size() * 4 + n * faiss.downcast_index(base.storage).code_size
+        elif isinstance(base, faiss.IndexIVF):
+            nbytes += n * (base.code_size + 8) + base.quantizer.ntotal * base.d * 4
+        else:
+            nbytes += n * base.code_size
+        return nbytes
 
-        emb = embedding.astype(np.float32).reshape(1, -1)
-        # Filter embeddings to only include those with metadata "source" equal to "applicants"
-        valid_ids = [idx for idx, meta in self.metadata.items() if meta.get("source") == "applicants"]
-        if not valid_ids:
-            return []
+    def precision_report(self, k: int = 10, n_queries: int = 200) -> Optional[Dict[str, Any]]:
+        """
+        Memory saved by index.precision and its recall change against float32 (None
+        when the vectors are stored in float32 or none were added by this instance).
+        Vector bytes are those of the whole index; recall@k and latency come from
+        src.index_evaluation.precision_report over the float32 sample of the added vectors.
+        """
+        if not self.quantized or not self._precision_sample or self.index is None:
+            return None
+        from src.index_evaluation import precision_report  # imports this module
+        report = precision_report(np.concatenate(self._precision_sample), self.index_cfg, k=k, n_queries=n_queries)
+        if report is None:
+            return None
+        base = self._base_index()
+        storage = faiss.downcast_index(base.storage) if isinstance(base, faiss.IndexHNSW) else base
+        n, dim = self.index.ntotal, self.index.d
+        vector_bytes, float32_bytes = n * storage.code_size, n * dim * 4
+        return {
+            "precision": self.precision,
+            "vectors": n,
+            "vector_bytes": vector_bytes,
+            "float32_vector_bytes": float32_bytes,
+            "memory_saved_bytes": float32_bytes - vector_bytes,
+            "compression": round(float32_bytes / max(vector_bytes, 1), 2),
+            **{key: value for key, value in report.items() if key != "precision"},
+        }
 
-        # Create a mask for valid indices
-        valid_indices = np.array(valid_ids, dtype=np.int64)
-        self.index.remove_ids(np.setdiff1d(np.array(list(self.metadata.keys()), dtype=np.int64), valid_indices))
+    def query_embedding(self, embedding: np.ndarray, k: Optional[int] = None, filters: Optional[Dict] = None,
+                        source: Optional[str] = "applicants", search_k: Optional[int] = None,
+                        text: Optional[str] = None) -> List[Dict]:
+        """
+        Returns list of dicts: [{id, score, metadata}, ...]
+        Filters can be applied to metadata: e.g., {"column_name": "value"}. Every
+        returned hit satisfies them; fewer than k hits means fewer than k matches.
+        source: only search vectors whose metadata "source" matches (None = all).
+        search_k: initial candidate pool for filtered search on approximate backends.
+        text: the query text, for hybrid dense + BM25 scoring (see query_embeddings).
+        """
+        emb = np.asarray(embedding).reshape(1, -1)
+        texts = [text] if text is not None else None
+        return self.query_embeddings(emb, k=k, filters=[filters], source=source, search_k=search_k, texts=texts)[0]
+
+    def _live_bitmap(self, source: Optional[str]) -> Optional[np.ndarray]:
+        """Bitmap of the live ids of `source` (None = every source), None if it has no ids."""
+        # Restrict the search to one source through an id selector instead of
+        # removing the other vectors from the live index.
+        if source is not None:
+            return self._source_bitmaps.get(source)
+        # every live id, i.e. the union of the sources (removed ids are in none)
+        bitmap = np.zeros(max((len(b) for b in self._source_bitmaps.values()), default=0), dtype=np.uint8)
+        for source_bitmap in self._source_bitmaps.values():
+            bitmap[:len(source_bitmap)] |= source_bitmap
+        return bitmap
 
-        D, I = self.index.search(emb, 100)  # D: scores, I: indices (position-based)
+    def _lexical_search(self, texts: Sequence[str], k: int, bitmap: np.ndarray):
+        """BM25 top-k (scores, ids) of each text among the ids set in `bitmap`."""
+        with track_stage("lexical_search"):
+            mask = np.unpackbits(bitmap, bitorder="little").astype(bool)
+            return self.lexical.top_k(texts, k, mask)
 
+    def query_lexical(self, texts: Sequence[str], k: Optional[int] = None,
+                      filters: Optional[Sequence[Optional[Dict]]] = None,
+                      source: Optional[str] = "applicants") -> List[List[Dict]]:
+        """
+        BM25-only candidate generation: the same hits as query_embeddings, scored by
+        the lexical index alone (no embedding needed). Requires lexical.enabled.
+        """
+        if self.lexical is None:
+            raise ValueError("lexical search is disabled (set lexical.enabled in the index config)")
+        k = self.k_default if k is None else k
+        filters = list(filters) if filters is not None else [None] * len(texts)
+        bitmap = self._live_bitmap(source)
+        if bitmap is None:
+            return [[] for _ in texts]
         results = []
-        for score, idx in zip(D[0].tolist(), I[0].tolist()):
-         
-            if idx < 0:
+        for text, row_filters in zip(texts, filters):
+            row_bitmap = self._filter_bitmap(row_filters, bitmap) if row_filters else bitmap
+            scores, ids = self._lexical_search([text], k, row_bitmap)[0]
+            results.append(self._format_hits(scores, ids))
+        return results
+
+    def query_embeddings(self, embeddings: np.ndarray, k: Union[None, int, Sequence[int]] = None,
+                         filters: Optional[Sequence[Optional[Dict]]] = None, source: Optional[str] = "applicants",
+                         search_k: Optional[int] = None, texts: Optional[Sequence[str]] = None) -> List[List[Dict]]:
+        """
+        Multi-query version of query_embedding for an (m, dim) matrix.
+        k and filters may be given per row; rows sharing the same filters are
+        answered by a single index.search over the 2D query matrix.
+
+        texts (one per row) turn on hybrid scoring when lexical.enabled: the best
+        max(k, lexical.candidates) ids of the dense search and of the BM25 index are
+        merged by fuse_scores, and hits also carry "dense_score" and "lexical_score".
+        Returns one result list per row, in input order.
+        """
+        emb = np.ascontiguousarray(np.atleast_2d(embeddings), dtype=np.float32)
+        m = emb.shape[0]
+        ks = [k] * m if k is None or isinstance(k, int) else list(k)
+        ks = [self.k_default if row_k is None else row_k for row_k in ks]
+        filters = list(filters) if filters is not None else [None] * m
+        if self.index is None or self.index.ntotal == 0:
+            return [[] for _ in range(m)]
+        bitmap = self._live_bitmap(source)
+        if bitmap is None:
+            return [[] for _ in range(m)]
+        hybrid = self.lexical is not None and texts is not None
+
+        groups: Dict[Any, List[int]] = {}
+        for row, row_filters in enumerate(filters):
+            groups.setdefault(tuple(sorted((row_filters or {}).items())), []).append(row)
+
+        results: List[List[Dict]] = [[] for _ in range(m)]
+        for key, rows in groups.items():
+            # Filters are pushed down into the same selector, so FAISS only ranks
+            # candidates that satisfy them.
+            group_bitmap = self._filter_bitmap(dict(key), bitmap) if key else bitmap
+            pool = max(ks[row] for row in rows)
+            if hybrid:
+                pool = max(pool, self.lexical_candidates)
+            D, I = self._filtered_search(emb[rows], pool, group_bitmap, search_k)
+            if not hybrid:
+                for pos, row in enumerate(rows):
+                    results[row] = self._format_hits(D[pos][:ks[row]], I[pos][:ks[row]])
                 continue
-            metadata = self.metadata.get(idx, {})
-            # Simplify metadata columns
-            metadata = transform_metadata(metadata)
-
-            # Apply filters if provided
-            if filters:
-                match = all(metadata.get(key) == value for key, value in filters.items())
-                if not match:
-                    continue
-                results.append({"id": int(idx), "score": float(score), "metadata": metadata})
-
-        if not results and len(results) == 0:  # If no results after filtering
-            for score, idx in zip(D[0].tolist(), I[0].tolist()):
-
-                D, I = self.index.search(emb, k)  # Re-run search without filters
-                for score, idx in zip(D[0].tolist(), I[0].tolist()):
-                    if idx < 0:
-                        continue
-                    metadata = self.metadata.get(idx, {})
-                    results.append({"id": int(idx), "score": float(score), "metadata": metadata})
-                
-        return results[:k]
+            lexical = self._lexical_search([texts[row] for row in rows], pool, group_bitmap)
+            for pos, row in enumerate(rows):
+                scores, ids, dense, bm25 = fuse_scores(D[pos], I[pos], *lexical[pos], self.lexical_weight, pool, ks[row])
+                hits = self._format_hits(scores, ids)
+                for hit, dense_score, bm25_score in zip(hits, dense.tolist(), bm25.tolist()):
+                    hit.update(dense_score=dense_score, lexical_score=bm25_score)
+                results[row] = hits
+        return results
 
-def transform_metadata(metadata):
-    def _has_value(v):
-        if v is None:
-            return False
-        # sequences/collections/strings: consider non-empty -> True
-        if isinstance(v, (str, list, tuple, set, dict)):
-            return len(v) > 0
-        # numbers/booleans/other truthy values
-        try:
-            return bool(v)
-        except Exception:
-            return False
+    def _format_hits(self, scores: np.ndarray, ids: np.ndarray) -> List[Dict]:
+        hits = [(idx, score) for score, idx in zip(scores.tolist(), ids.tolist()) if idx >= 0]
+        with track_stage("metadata"):
+            metadatas = self.metadata.get_many([idx for idx, _ in hits])
+        return [
+            {"id": int(idx), "score": float(score), "metadata": meta if meta is not None else {}}
+            for (idx, score), meta in zip(hits, metadatas)
+        ]
+
+
+def _positions_of(haystack: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """Position of each of `ids` in the unsorted array `haystack`, -1 where absent."""
+    order = np.argsort(haystack, kind="stable")
+    pos = np.searchsorted(haystack, ids, sorter=order)
+    pos = np.minimum(pos, max(len(haystack) - 1, 0))
+    found = haystack[order[pos]] == ids if len(haystack) else np.zeros(len(ids), dtype=bool)
+    return np.where(found, order[pos], -1)
 
+
+def _has_value(v):
+    if v is None:
+        return False
+    # sequences/collections/strings: consider non-empty -> True
+    if isinstance(v, (str, list, tuple, set, dict)):
+        return len(v) > 0
+    # numbers/booleans/other truthy values
+    try:
+        return bool(v)
+    except Exception:
+        return False
+
+def transform_metadata(metadata):
     if "nivel_ingles" in metadata:
         metadata["nivel_ingles"] = 1 if _has_value(metadata["nivel_ingles"]) else 0
     if "nivel_espanhol" in metadata:
@@ -199,12 +885,101 @@ def transform_metadata(metadata):
         metadata.update(dummy_cidade)
     return metadata
 
-def add_entity_embeddings_to_faiss(df, emb_mgr, indexer):
-    for i, row in df.iterrows():
-        text = row['text']
-        vec = emb_mgr.generate_embedding(text)
-        metadata = row.to_dict()  # Convert all columns of the row to a dictionary
-        metadata.update({"source": "applicants", "idx": i})  # Add additional metadata
-        assigned_id = indexer.add_embedding(vec, metadata=metadata)
+def add_entity_embeddings_to_faiss(df, emb_mgr, indexer, chunk_size: Optional[int] = None, num_workers: Optional[int] = None) -> float:
+    """
+    Embed df['text'] in chunks and bulk-add them to the index, one metadata dict per row.
+    chunk_size / num_workers default to the embedding_model section of models_config.yaml.
+    Returns the overall throughput in texts per second.
+    """
+    chunk_size = chunk_size or emb_mgr.chunk_size
+    texts = df['text'].tolist()
+    total = len(texts)
+    done = 0
+    start_time = time.perf_counter()
+    with indexer.bulk_ingest(), emb_mgr.worker_pool(num_workers):
+        for start, vecs in zip(range(0, total, chunk_size), emb_mgr.iter_embeddings(texts, chunk_size)):
+            chunk = df.iloc[start:start + chunk_size]
+            metadatas = chunk.to_dict("records")  # Convert all columns of each row to a dictionary
+            for metadata, i in zip(metadatas, chunk.index):
+                metadata.update({"source": "applicants", "idx": i})  # Add additional metadata
+            indexer.add_embeddings(vecs, metadatas)
+            done += len(chunk)
+            elapsed = time.perf_counter() - start_time
+            print(f"Embedded {done}/{total} texts ({done / elapsed:.1f} texts/s)")
+    elapsed = time.perf_counter() - start_time
+    return done / elapsed if elapsed > 0 else 0.0
+
+
+def _content_hash(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def sync_entity_embeddings(df, emb_mgr, indexer, id_column: str = "applicants_id", source: str = "applicants",
+                           chunk_size: Optional[int] = None, num_workers: Optional[int] = None) -> Dict[str, int]:
+    """
+    Incrementally bring the `source` vectors of the index in line with df (one row per
+    entity, keyed by `id_column`), embedding only what changed.
+
+    Each row's metadata stores a text_hash of its 'text' and a row_hash of the whole
+    record. Rows whose id is not indexed yet are embedded and added; rows whose text
+    changed are re-embedded and replaced under the same FAISS id (see
+    FAISSIndexer.update_embeddings); rows where only other columns changed
+    get their metadata updated; entities missing from df (and duplicate vectors of one
+    entity) are removed. Returns the number of rows in each case.
+    """
+    chunk_size = chunk_size or emb_mgr.chunk_size
+    metadatas = df.to_dict("records")
+    for metadata, i in zip(metadatas, df.index):
+        metadata.update({"source": source, "idx": i, "text_hash": _content_hash(metadata["text"])})
+        metadata["row_hash"] = _content_hash(json.dumps(metadata, sort_keys=True, default=str))
+
+    ids, columns = indexer.metadata.columns(["source", id_column, "text_hash", "row_hash"])
+    indexed: Dict[Any, Any] = {}
+    duplicates = []
+    for faiss_id, row_source, key, text_hash, row_hash in zip(
+            ids.tolist(), columns["source"], columns[id_column], columns["text_hash"], columns["row_hash"]):
+        if row_source != source:
+            continue
+        if key in indexed:
+            duplicates.append(faiss_id)
+        else:
+            indexed[key] = (faiss_id, text_hash, row_hash)
+
+    new, changed, metadata_only = [], [], []
+    for pos, metadata in enumerate(metadatas):
+        found = indexed.get(metadata.get(id_column))
+        if found is None:
+            new.append(pos)
+        elif found[1] != metadata["text_hash"]:
+            changed.append(pos)
+        elif found[2] != metadata["row_hash"]:
+            metadata_only.append(pos)
+    keys = {metadata.get(id_column) for metadata in metadatas}
+    removed = [faiss_id for key, (faiss_id, _, _) in indexed.items() if key not in keys] + duplicates
+
+    def faiss_ids(positions):
+        return [indexed[metadatas[pos].get(id_column)][0] for pos in positions]
 
+    to_embed = new + changed
+    start_time = time.perf_counter()
+    with indexer.bulk_ingest():
+        indexer.remove_ids(removed)
+        indexer.update_metadata(faiss_ids(metadata_only), [metadatas[pos] for pos in metadata_only])
+        if to_embed:
+            with emb_mgr.worker_pool(num_workers):
+                texts = [metadatas[pos]["text"] for pos in to_embed]
+                for start, vecs in zip(range(0, len(to_embed), chunk_size), emb_mgr.iter_embeddings(texts, chunk_size)):
+                    block = to_embed[start:start + chunk_size]
+                    is_new = np.arange(start, start + len(block)) < len(new)
+                    added = [pos for pos, flag in zip(block, is_new) if flag]
+                    updated = [pos for pos, flag in zip(block, is_new) if not flag]
+                    if added:
+                        indexer.add_embeddings(vecs[is_new], [metadatas[pos] for pos in added])
+                    if updated:
+                        indexer.update_embeddings(faiss_ids(updated), vecs[~is_new], [metadatas[pos] for pos in updated])
+                    done = start + len(block)
+                    elapsed = time.perf_counter() - start_time
+                    print(f"Embedded {done}/{len(to_embed)} new or changed texts ({done / elapsed:.1f} texts/s)")
 
+    return {"added": len(new), "updated": len(changed), "metadata_updated": len(metadata_only),
+            "removed": len(removed), "unchanged": len(metadatas) - len(to_embed) - len(metadata_only)}
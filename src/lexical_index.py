@@ -0,0 +1,231 @@
+import os
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.utils import lazy_import
+
+sparse = lazy_import("scipy.sparse")
+
+# lowercase ascii words; "+" and "#" are kept so c++, c# and abap4 stay distinct terms
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+
+def tokenize(text: Any) -> List[str]:
+    """Lowercased, accent-stripped word tokens of `text` (empty for None)."""
+    if text is None:
+        return []
+    text = unicodedata.normalize("NFKD", str(text).lower()).encode("ascii", "ignore").decode("ascii")
+    return TOKEN_RE.findall(text)
+
+
+class BM25Index:
+    """
+    Okapi BM25 over the applicant texts, as a sparse (FAISS id) x (term) matrix.
+
+    Raw term frequencies are kept in a CSR matrix whose row i belongs to FAISS id i,
+    so documents can be added, replaced or removed alongside the vectors. The BM25
+    weights (idf times saturated, length-normalized tf) are derived from it after
+    each change as a CSC matrix: the scores of a batch of queries are one sparse
+    product with their term indicator matrix. Terms found in more than `max_df` of
+    the documents carry almost no signal and are dropped from the weights.
+
+    Rows added or removed since the last rebuild are staged and merged in one pass
+    by refresh(), so bulk ingestion stays linear. FAISSIndexer refreshes after each
+    load and save, keeping the rebuild off the query path; top_k only rebuilds when
+    changes are still staged (e.g. inside bulk_ingest). All access goes through a
+    lock, so queries from several threads see one consistent rebuild.
+    """
+    def __init__(self, path: Optional[str] = None, k1: float = 1.2, b: float = 0.75,
+                 max_df: Optional[float] = None):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.max_df = max_df
+        self.vocabulary: Dict[str, int] = {}
+        self._tf = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self._weights = None
+        self._blocks: List[Any] = []
+        self._staged: Dict[int, Tuple[int, int]] = {}  # id -> (block, row) of its newest text
+        self._cleared: set = set()  # ids whose current row must be dropped
+        self._lock = threading.RLock()
+        if path is not None and os.path.exists(path):
+            self._load(path)
+
+    def _load(self, path: str):
+        with np.load(path) as data:
+            terms = data["vocabulary"].tobytes().decode("utf-8")
+            self.vocabulary = {term: i for i, term in enumerate(terms.split("\n"))} if terms else {}
+            self._tf = sparse.csr_matrix((data["data"], data["indices"], data["indptr"]),
+                                         shape=tuple(data["shape"]))
+
+    def save(self, path: Optional[str] = None):
+        """Write the term frequencies and vocabulary to one .npz (temp file, then renamed)."""
+        path = path or self.path
+        with self._lock:
+            self._merge()
+            tf = self._tf
+            terms = "\n".join(sorted(self.vocabulary, key=self.vocabulary.get)).encode("utf-8")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, data=tf.data, indices=tf.indices, indptr=tf.indptr,
+                     shape=np.array(tf.shape), vocabulary=np.frombuffer(terms, dtype=np.uint8))
+        os.replace(tmp_path, path)
+        self.path = path
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._merge()
+        return int((np.diff(self._tf.indptr) > 0).sum())
+
+    def _encode(self, texts: Sequence[Any], grow: bool = True):
+        """Term-count (or, with grow=False, known-term indicator) matrix of `texts`."""
+        rows, cols = [], []
+        for row, text in enumerate(texts):
+            for token in tokenize(text):
+                col = self.vocabulary.setdefault(token, len(self.vocabulary)) if grow else self.vocabulary.get(token)
+                if col is not None:
+                    rows.append(row)
+                    cols.append(col)
+        data = np.ones(len(cols), dtype=np.float32)
+        matrix = sparse.csr_matrix((data, (rows, cols)), shape=(len(texts), len(self.vocabulary)))
+        matrix.sum_duplicates()
+        if not grow:
+            matrix.data[:] = 1.0
+        return matrix
+
+    def add(self, ids: Sequence[int], texts: Sequence[Any]):
+        """Index the texts of `ids`, replacing whatever those ids held before."""
+        ids = [int(i) for i in ids]
+        if not ids:
+            return
+        with self._lock:
+            block = len(self._blocks)
+            self._blocks.append(self._encode(texts))
+            for row, i in enumerate(ids):
+                self._staged[i] = (block, row)
+                self._cleared.add(i)
+            self._weights = None
+
+    def remove(self, ids: Sequence[int]):
+        with self._lock:
+            for i in ids:
+                self._staged.pop(int(i), None)
+                self._cleared.add(int(i))
+            self._weights = None
+
+    def refresh(self):
+        """Merge the staged changes and compute the BM25 weights now instead of on the next query."""
+        with self._lock:
+            self._bm25_weights()
+
+    @staticmethod
+    def _resized(matrix, n_rows: int, n_cols: int):
+        """Copy of a CSR matrix grown (never shrunk) to n_rows x n_cols."""
+        indptr = np.pad(matrix.indptr, (0, n_rows - matrix.shape[0]), mode="edge")
+        return sparse.csr_matrix((matrix.data, matrix.indices, indptr), shape=(n_rows, n_cols))
+
+    def _merge(self):
+        """Apply the staged additions and removals to the term-frequency matrix (lock held)."""
+        if not self._cleared:
+            return
+        n_terms = len(self.vocabulary)
+        staged_ids = np.fromiter(self._staged, dtype=np.int64, count=len(self._staged))
+        n_rows = max(self._tf.shape[0], int(staged_ids.max()) + 1 if len(staged_ids) else 0)
+        tf = self._resized(self._tf, n_rows, n_terms)
+
+        cleared = np.fromiter(self._cleared, dtype=np.int64, count=len(self._cleared))
+        keep = np.ones(n_rows, dtype=np.float32)
+        keep[cleared[cleared < n_rows]] = 0.0
+        tf = sparse.diags(keep).dot(tf).tocsr()
+        if len(staged_ids):
+            blocks = [self._resized(b, b.shape[0], n_terms) for b in self._blocks]
+            offsets = np.cumsum([0] + [b.shape[0] for b in blocks])
+            positions = np.array([offsets[block] + row for block, row in self._staged.values()], dtype=np.int64)
+            rows = sparse.vstack(blocks, format="csr")[positions].tocoo()
+            tf = tf + sparse.csr_matrix((rows.data, (staged_ids[rows.row], rows.col)), shape=(n_rows, n_terms))
+        tf.eliminate_zeros()
+        self._tf = tf.tocsr().astype(np.float32)
+        self._blocks, self._staged, self._cleared = [], {}, set()
+
+    def _bm25_weights(self):
+        """CSC matrix of BM25 weights, rebuilt if anything changed since the last call (lock held)."""
+        if self._weights is not None:
+            return self._weights
+        self._merge()
+        tf = self._tf
+        n_rows, n_terms = tf.shape
+        lengths = np.asarray(tf.sum(axis=1)).ravel()
+        n_docs = max(int((lengths > 0).sum()), 1)
+        avg_length = lengths[lengths > 0].mean() if (lengths > 0).any() else 1.0
+        df = np.bincount(tf.indices, minlength=n_terms)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        if self.max_df is not None:
+            idf[df > self.max_df * n_docs] = 0.0
+
+        rows = np.repeat(np.arange(n_rows), np.diff(tf.indptr))
+        norm = self.k1 * (1.0 - self.b + self.b * lengths / avg_length)
+        data = idf[tf.indices] * tf.data * (self.k1 + 1.0) / (tf.data + norm[rows])
+        weights = sparse.csr_matrix((data.astype(np.float32), tf.indices, tf.indptr), shape=tf.shape)
+        weights.eliminate_zeros()
+        self._weights = weights.tocsc()
+        return self._weights
+
+    def top_k(self, texts: Sequence[str], k: int,
+              mask: Optional[np.ndarray] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Best `k` ids (and BM25 scores, descending) of each query text, among the
+        ids where `mask` (bool per id) is True. Ids matching no query term are never returned.
+        """
+        empty = (np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64))
+        with self._lock:
+            weights = self._bm25_weights()
+            if weights.shape[0] == 0 or k <= 0:
+                return [empty for _ in texts]
+            queries = self._encode(texts, grow=False)
+        queries = self._resized(queries, queries.shape[0], weights.shape[1])
+        scores = weights.dot(queries.T).tocsc()  # (ids x queries), only ids sharing a term
+
+        results = []
+        for col in range(len(texts)):
+            start, end = scores.indptr[col], scores.indptr[col + 1]
+            ids, values = scores.indices[start:end].astype(np.int64), scores.data[start:end]
+            if mask is not None:
+                inside = ids < len(mask)
+                inside[inside] = mask[ids[inside]]
+                ids, values = ids[inside], values[inside]
+            if len(ids) > k:
+                top = np.argpartition(-values, k - 1)[:k]
+                ids, values = ids[top], values[top]
+            order = np.argsort(-values, kind="stable")
+            results.append((values[order].astype(np.float32), ids[order]))
+        return results
+
+
+def fuse_scores(dense_scores: np.ndarray, dense_ids: np.ndarray, lexical_scores: np.ndarray,
+                lexical_ids: np.ndarray, weight: float, pool: int, k: int):
+    """
+    Blend the dense and BM25 results of one query into its top `k`:
+    score = (1 - weight) * dense score + weight * BM25 score / best BM25 score.
+
+    An id missing from one list scored at most that list's lowest score when the list
+    was cut at `pool` entries, and nothing otherwise; that bound stands in for it.
+    Returns (scores, ids, dense scores, BM25 scores), best first. Ids < 0 are ignored.
+    """
+    found = dense_ids >= 0
+    dense_scores, dense_ids = dense_scores[found], dense_ids[found]
+    dense_floor = dense_scores.min() if len(dense_ids) >= pool else 0.0
+    lexical_floor = lexical_scores.min() if len(lexical_ids) >= pool else 0.0
+    best_lexical = lexical_scores.max() if len(lexical_ids) and lexical_scores.max() > 0 else 1.0
+
+    ids = np.union1d(dense_ids, lexical_ids).astype(np.int64)
+    dense = np.full(len(ids), dense_floor, dtype=np.float32)
+    dense[np.searchsorted(ids, dense_ids)] = dense_scores
+    lexical = np.full(len(ids), lexical_floor, dtype=np.float32)
+    lexical[np.searchsorted(ids, lexical_ids)] = lexical_scores
+    fused = (1.0 - weight) * dense + weight * lexical / best_lexical
+    top = np.argsort(-fused, kind="stable")[:k]
+    return fused[top], ids[top], dense[top], lexical[top]
@@ -0,0 +1,261 @@
+import os
+import pickle
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import pyarrow as pa
+
+# column holding the FAISS id of each row; metadata keys are stored next to it
+ID_COLUMN = "faiss_id"
+ARROW_MAGIC = b"ARROW1"
+
+
+class MetadataStore:
+    """
+    Per-vector metadata keyed by FAISS id, stored column-wise in an uncompressed
+    Arrow IPC file.
+
+    The file is memory-mapped read-only, so the long text columns are never copied
+    into the Python heap: workers share the page cache and a row is only decoded
+    when it is returned as a hit (get / get_many). Callers that need whole columns
+    (e.g. to build the filter bitmaps) read just those through columns().
+
+    Rows added (or removed) since the last save() are kept as plain dicts (or ids)
+    and merged into the file on the next save(). Null values are omitted from the
+    returned dicts, so a row only has the keys it was added with. The largest id
+    ever stored is kept in the file, so ids of removed rows are never handed out again.
+
+    A legacy pickle ({"metadata": {id: dict}}) found at `path`, or next to it with
+    a .pkl suffix, is converted on load and rewritten as Arrow on the next save().
+    """
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._table: Optional[pa.Table] = None
+        self._ids = np.zeros(0, dtype=np.int64)  # sorted FAISS ids of the rows in _table
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._removed: Set[int] = set()  # ids in _table deleted since the last save
+        self._max_id = -1
+        if path is not None:
+            self._load()
+
+    def _load(self):
+        legacy_path = os.path.splitext(self.path)[0] + ".pkl"
+        if os.path.exists(self.path) and self._is_arrow(self.path):
+            self._open(self.path)
+        elif os.path.exists(self.path):
+            self._load_pickle(self.path)
+        elif legacy_path != self.path and os.path.exists(legacy_path):
+            self._load_pickle(legacy_path)
+
+    @staticmethod
+    def _is_arrow(path: str) -> bool:
+        with open(path, "rb") as f:
+            return f.read(len(ARROW_MAGIC)) == ARROW_MAGIC
+
+    def _open(self, path: str):
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        self._table = table
+        self._ids = table.column(ID_COLUMN).to_numpy()
+        stored_max = (table.schema.metadata or {}).get(b"max_id")
+        self._max_id = max(self._max_id, int(stored_max) if stored_max is not None else -1,
+                           int(self._ids[-1]) if len(self._ids) else -1)
+
+    def _load_pickle(self, path: str):
+        with open(path, "rb") as f:
+            metadata = pickle.load(f).get("metadata", {})
+        self.add(list(metadata.keys()), list(metadata.values()))
+
+    def add(self, ids: Iterable[int], metadatas: Iterable[Optional[Dict[str, Any]]]):
+        """Stage one metadata dict per id; visible immediately, persisted by save()."""
+        for i, meta in zip(ids, metadatas):
+            i = int(i)
+            self._pending[i] = meta if meta is not None else {}
+            self._removed.discard(i)
+            self._max_id = max(self._max_id, i)
+
+    def remove(self, ids: Iterable[int]):
+        """Delete the rows of `ids` (unknown ids are ignored); persisted by save()."""
+        ids = np.fromiter((int(i) for i in ids), dtype=np.int64)
+        for i in ids.tolist():
+            self._pending.pop(i, None)
+        stored = self._positions(ids) >= 0
+        self._removed.update(ids[stored].tolist())
+
+    def save(self, path: Optional[str] = None):
+        """Merge staged rows into the Arrow file (written to a temp file, then renamed) and re-map it."""
+        path = path or self.path
+        table = self._merged_table()
+        table = table.replace_schema_metadata({"max_id": str(self.max_id())})
+        tmp_path = path + ".tmp"
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, path)
+        self.path = path
+        self._pending = {}
+        self._removed = set()
+        self._open(path)
+
+    def _merged_table(self) -> pa.Table:
+        pending_ids = np.array(sorted(self._pending), dtype=np.int64)
+        tables = []
+        table = None
+        if self._table is not None:
+            table = self._table
+            dropped = self._dropped()
+            if dropped is not None:
+                table = table.filter(pa.array(~dropped))
+        if len(pending_ids):
+            rows = [self._pending[i] for i in pending_ids.tolist()]
+            # union of the keys: from_pylist would only use those of the first row
+            names = dict.fromkeys(key for row in rows for key in row)
+            columns = {name: _to_arrow([row.get(name) for row in rows]) for name in names}
+            if table is not None:
+                table, columns = _unify_types(table, columns)
+            columns[ID_COLUMN] = pa.array(pending_ids)
+            tables.append(pa.Table.from_pydict(columns))
+        if table is not None:
+            tables.insert(0, table)
+        if not tables:
+            return pa.table({ID_COLUMN: pa.array([], type=pa.int64())})
+        table = pa.concat_tables(tables, promote_options="permissive")
+        if len(pending_ids) and len(self._ids) and pending_ids[0] <= self._ids[-1]:
+            table = table.sort_by(ID_COLUMN)
+        return table
+
+    def _dropped(self) -> Optional[np.ndarray]:
+        """Mask of the rows of _table that are removed or replaced by a staged row (None = none)."""
+        gone = np.fromiter([*self._removed, *self._pending], dtype=np.int64)
+        if not len(gone) or not (self._positions(gone) >= 0).any():
+            return None
+        return np.isin(self._ids, gone)
+
+    def _positions(self, ids: np.ndarray) -> np.ndarray:
+        """Row position in _table of each id, -1 if absent."""
+        pos = np.searchsorted(self._ids, ids)
+        pos = np.minimum(pos, max(len(self._ids) - 1, 0))
+        found = self._ids[pos] == ids if len(self._ids) else np.zeros(len(ids), dtype=bool)
+        return np.where(found, pos, -1)
+
+    @staticmethod
+    def _clean(row: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in row.items() if key != ID_COLUMN and value is not None}
+
+    def get_many(self, ids: Sequence[int]) -> List[Optional[Dict[str, Any]]]:
+        """Metadata dict of each id (None for unknown ids), decoding all stored rows in one take."""
+        result: List[Optional[Dict[str, Any]]] = [self._pending.get(int(i)) for i in ids]
+        missing = [n for n, row in enumerate(result) if row is None]
+        if missing and self._table is not None:
+            missing_ids = np.asarray([ids[n] for n in missing], dtype=np.int64)
+            pos = self._positions(missing_ids)
+            hit = pos >= 0
+            if self._removed:
+                hit &= ~np.isin(missing_ids, list(self._removed))
+            rows = self._table.take(pa.array(pos[hit])).to_pylist()
+            for n, row in zip(np.asarray(missing)[hit], rows):
+                result[n] = self._clean(row)
+        return result
+
+    def get(self, i: int, default: Any = None) -> Any:
+        row = self.get_many([i])[0]
+        return default if row is None else row
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        row = self.get_many([i])[0]
+        if row is None:
+            raise KeyError(i)
+        return row
+
+    def __contains__(self, i: int) -> bool:
+        return self.get_many([i])[0] is not None
+
+    def __len__(self) -> int:
+        dropped = self._dropped()
+        n_dropped = int(dropped.sum()) if dropped is not None else 0
+        return len(self._ids) - n_dropped + len(self._pending)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of the stored (memory-mapped) columns; rows staged since the last save are not counted."""
+        return self._table.nbytes if self._table is not None else 0
+
+    def max_id(self) -> int:
+        """Largest id ever stored (including removed ones), -1 when empty."""
+        return self._max_id
+
+    def columns(self, names: Sequence[str]) -> Tuple[np.ndarray, Dict[str, List[Any]]]:
+        """
+        Ids of every row plus the values of the requested columns, aligned with
+        them (None where a row has no value). Only these columns are decoded.
+        """
+        ids = [self._ids]
+        values: Dict[str, List[Any]] = {name: [] for name in names}
+        if self._table is not None:
+            present = set(self._table.column_names)
+            for name in names:
+                values[name] = (self._table.column(name).to_pylist() if name in present
+                                else [None] * len(self._ids))
+            dropped = self._dropped()
+            if dropped is not None:
+                keep = ~dropped
+                ids = [self._ids[keep]]
+                values = {name: [v for v, k in zip(column, keep) if k] for name, column in values.items()}
+        if self._pending:
+            ids.append(np.fromiter(self._pending, dtype=np.int64))
+            for name in names:
+                values[name].extend(meta.get(name) for meta in self._pending.values())
+        return np.concatenate(ids), values
+
+
+def _as_string(array: Any) -> Any:
+    """`array` (Array or ChunkedArray) as strings, via str() when Arrow has no cast for its type."""
+    try:
+        return array.cast(pa.string())
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return pa.array([None if value is None else str(value) for value in array.to_pylist()], type=pa.string())
+
+
+def _to_arrow(values: List[Any]) -> pa.Array:
+    """
+    Arrow array of one column of staged rows. NaN/NaT (as found in DataFrame
+    records) become nulls; values of mixed types that Arrow cannot put in one
+    column are stored as strings, as the pickle store would have kept them.
+    """
+    try:
+        return pa.array(values, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if _is_null(value) else str(value) for value in values], type=pa.string())
+
+
+def _is_null(value: Any) -> bool:
+    """None, NaN, NaT or pd.NA."""
+    if value is None:
+        return True
+    try:
+        return bool(value != value)
+    except TypeError:  # pd.NA
+        return True
+    except ValueError:  # arrays
+        return False
+
+
+def _unify_types(table: pa.Table, columns: Dict[str, pa.Array]) -> Tuple[pa.Table, Dict[str, pa.Array]]:
+    """
+    Make the staged columns match the stored ones: new values are cast to the stored
+    type, and when that fails (e.g. text arriving in an int column) both sides become strings.
+    """
+    for name, array in columns.items():
+        if name not in table.column_names:
+            continue
+        stored_type = table.schema.field(name).type
+        if array.type == stored_type or pa.types.is_null(array.type):
+            continue
+        if pa.types.is_null(stored_type):
+            table = table.set_column(table.schema.get_field_index(name), name, table.column(name).cast(array.type))
+            continue
+        try:
+            columns[name] = array.cast(stored_type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError):
+            columns[name] = _as_string(array)
+            if not pa.types.is_string(stored_type):
+                table = table.set_column(table.schema.get_field_index(name), name, _as_string(table.column(name)))
+    return table, columns
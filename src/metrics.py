@@ -3,7 +3,14 @@ Módulo de métricas para monitoramento do sistema de job matching
 Fornece métricas específicas para integração com Grafana/Prometheus
 """
 
-from prometheus_client import Counter, Histogram, Gauge, Info
+from prometheus_client import CollectorRegistry, Counter, Histogram, Gauge, Info, REGISTRY, multiprocess
+from starlette.exceptions import HTTPException
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional
+import inspect
+import os
+import threading
 import time
 from functools import wraps
 
@@ -64,10 +71,41 @@ FAISS_SEARCH_DURATION = Histogram(
     buckets=[0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0]
 )
 
+# Tempo de cada etapa do pipeline de matching (ver track_stage)
+STAGE_DURATION = Histogram(
+    'job_matching_stage_duration_seconds',
+    'Tempo de cada etapa do pipeline de matching em segundos',
+    ['stage'],  # filter_extraction, encoding, faiss_search, lexical_search, metadata, applicant_lookup, rerank, serialization
+    buckets=[0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
+)
+
 # Tamanho da base de dados ativa
 ACTIVE_CANDIDATES_COUNT = Gauge(
     'job_matching_active_candidates',
-    'Número total de candidatos na base ativa'
+    'Número total de candidatos na base ativa',
+    multiprocess_mode='livemax'  # com vários workers: todos veem o mesmo índice
+)
+
+# Micro-batching do /predict: requisições aguardando e tamanho dos lotes
+BATCH_QUEUE_DEPTH = Gauge(
+    'job_matching_batch_queue_depth',
+    'Requisições aguardando na fila de micro-batching',
+    ['batcher'],
+    multiprocess_mode='livesum'
+)
+
+BATCH_SIZE = Histogram(
+    'job_matching_batch_size',
+    'Número de requisições agrupadas em cada lote',
+    ['batcher'],
+    buckets=[1, 2, 4, 8, 16, 32, 64, 128]
+)
+
+# Rerank com cross-encoder: vagas reordenadas ou mantidas na ordem do FAISS (orçamento estourado)
+RERANK_OUTCOMES = Counter(
+    'job_matching_rerank_total',
+    'Vagas passadas pelo rerank, por resultado',
+    ['outcome']  # reranked, budget_exceeded
 )
 
 # Cache hits/misses (se implementado)
@@ -85,14 +123,16 @@ CACHE_OPERATIONS = Counter(
 MEMORY_USAGE = Gauge(
     'job_matching_memory_usage_bytes',
     'Uso de memória da aplicação em bytes',
-    ['component']  # faiss_index, embeddings, cache
+    ['component'],  # application (RSS do processo), faiss_index, metadata, embedding_cache
+    multiprocess_mode='liveall'  # uma série por worker (label pid)
 )
 
 # Status de saúde dos componentes
 COMPONENT_HEALTH = Gauge(
     'job_matching_component_health',
     'Status de saúde dos componentes (1=healthy, 0=unhealthy)',
-    ['component']  # faiss, embeddings, database
+    ['component'],  # faiss, embeddings, database
+    multiprocess_mode='livemin'
 )
 
 # =============================================================================
@@ -119,60 +159,136 @@ TIME_TO_MATCH = Histogram(
 # =============================================================================
 
 def track_endpoint_metrics(endpoint_name: str):
-    """Decorator para trackear automaticamente métricas de endpoints"""
+    """
+    Decorator para trackear automaticamente métricas de endpoints (sync ou async).
+    Respostas em streaming (com body_iterator, ex. StreamingResponse) só são
+    registradas quando o corpo termina de ser enviado, não quando o endpoint retorna.
+    """
+    def record(start_time, status_code):
+        duration = time.time() - start_time
+        REQUESTS_TOTAL.labels(
+            endpoint=endpoint_name,
+            method="POST",
+            status_code=status_code
+        ).inc()
+        REQUEST_DURATION.labels(
+            endpoint=endpoint_name,
+            method="POST"
+        ).observe(duration)
+
+    async def timed_body(body, start_time, status_code):
+        # o corpo é gerado depois do return do endpoint: mede até o último chunk
+        try:
+            async for chunk in body:
+                yield chunk
+        except Exception:
+            status_code = "500"
+            raise
+        finally:
+            record(start_time, status_code)
+
+    def finish(result, start_time):
+        """Adia o registro de respostas em streaming; devolve True se já foi tratado"""
+        if hasattr(result, "body_iterator"):
+            result.body_iterator = timed_body(result.body_iterator, start_time, str(result.status_code))
+            return True
+        return False
+
     def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start_time = time.time()
+                status_code = "200"
+                streaming = False
+                try:
+                    result = await func(*args, **kwargs)
+                    status_code = str(getattr(result, "status_code", 200))
+                    streaming = finish(result, start_time)
+                    return result
+                except HTTPException as exc:
+                    # erros esperados (ex. 503 enquanto os componentes carregam) mantêm o próprio status
+                    status_code = str(exc.status_code)
+                    raise
+                except Exception:
+                    status_code = "500"
+                    raise
+                finally:
+                    if not streaming:
+                        record(start_time, status_code)
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
             start_time = time.time()
             status_code = "200"
+            streaming = False
             
             try:
                 result = func(*args, **kwargs)
+                status_code = str(getattr(result, "status_code", 200))
+                streaming = finish(result, start_time)
                 return result
+            except HTTPException as exc:
+                status_code = str(exc.status_code)
+                raise
             except Exception as e:
                 status_code = "500"
                 raise
             finally:
-                duration = time.time() - start_time
-                REQUESTS_TOTAL.labels(
-                    endpoint=endpoint_name,
-                    method="POST",
-                    status_code=status_code
-                ).inc()
-                REQUEST_DURATION.labels(
-                    endpoint=endpoint_name,
-                    method="POST"
-                ).observe(duration)
+                if not streaming:
+                    record(start_time, status_code)
         
         return wrapper
     return decorator
 
+# etapas que também alimentam um histograma próprio
+_STAGE_HISTOGRAMS = {"faiss_search": FAISS_SEARCH_DURATION}
+
+# trace da requisição corrente ({etapa: segundos}), ativo só dentro de stage_trace()
+_CURRENT_TRACE: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_trace", default=None)
+
+
+@contextmanager
+def stage_trace() -> Iterator[Dict[str, float]]:
+    """Coleta num dict {etapa: segundos} as etapas executadas no bloco (mesma thread/contexto)"""
+    trace: Dict[str, float] = {}
+    token = _CURRENT_TRACE.set(trace)
+    try:
+        yield trace
+    finally:
+        _CURRENT_TRACE.reset(token)
+
+
+@contextmanager
+def track_stage(stage: str):
+    """Mede uma etapa do pipeline em STAGE_DURATION e no trace ativo, se houver"""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start_time
+        STAGE_DURATION.labels(stage=stage).observe(duration)
+        if stage in _STAGE_HISTOGRAMS:
+            _STAGE_HISTOGRAMS[stage].observe(duration)
+        trace = _CURRENT_TRACE.get()
+        if trace is not None:
+            trace[stage] = trace.get(stage, 0.0) + duration
+
+
+def format_server_timing(trace: Dict[str, float]) -> str:
+    """Trace no formato do header Server-Timing (durações em ms)"""
+    return ", ".join(f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in trace.items())
+
+
 def track_faiss_search():
-    """Decorator para trackear métricas de busca FAISS"""
+    """Decorator para trackear a duração de buscas FAISS (etapa faiss_search)"""
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            start_time = time.time()
-            
-            try:
-                result = func(*args, **kwargs)
-                
-                # Trackear número de candidatos encontrados
-                if isinstance(result, list):
-                    CANDIDATES_FOUND.labels(search_type="faiss").observe(len(result))
-                    
-                    # Trackear distribuição de scores
-                    for candidate in result:
-                        if 'score' in candidate:
-                            score = candidate['score']
-                            score_range = f"{int(score * 10) / 10:.1f}-{int(score * 10 + 1) / 10:.1f}"
-                            CANDIDATE_SCORES.labels(score_range=score_range).observe(score)
-                
-                return result
-            finally:
-                duration = time.time() - start_time
-                FAISS_SEARCH_DURATION.observe(duration)
-        
+            with track_stage("faiss_search"):
+                return func(*args, **kwargs)
+
         return wrapper
     return decorator
 
@@ -180,19 +296,152 @@ def track_faiss_search():
 # FUNÇÕES AUXILIARES
 # =============================================================================
 
-def update_system_metrics():
-    """Atualiza métricas de sistema (para ser chamada periodicamente)"""
-    import os
-    
-    # Simular uso de memória básico sem psutil
+def read_rss_bytes() -> Optional[int]:
+    """Memória residente (RSS) do processo, lida de /proc/self/statm; None fora do Linux"""
     try:
-        # No Windows, usar informações básicas do OS
-        memory_kb = os.popen('tasklist /fi "imagename eq python.exe" /fo csv').read()
-        # Definir um valor padrão se não conseguir obter informação real
-        MEMORY_USAGE.labels(component="application").set(100 * 1024 * 1024)  # 100MB default
-    except:
-        # Fallback para valor fixo
-        MEMORY_USAGE.labels(component="application").set(50 * 1024 * 1024)  # 50MB default
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def update_system_metrics(indexer=None, emb_mgr=None):
+    """
+    Atualiza RSS do processo, bytes por componente (MEMORY_USAGE) e candidatos ativos.
+    Só lê /proc e atributos em memória: nada de subprocessos.
+    """
+    rss = read_rss_bytes()
+    if rss is not None:
+        MEMORY_USAGE.labels(component="application").set(rss)
+    if indexer is not None:
+        MEMORY_USAGE.labels(component="faiss_index").set(indexer.nbytes)
+        MEMORY_USAGE.labels(component="metadata").set(indexer.metadata.nbytes)
+        ACTIVE_CANDIDATES_COUNT.set(indexer.count("applicants"))
+    cache = getattr(emb_mgr, "cache", None)
+    if cache is not None:
+        MEMORY_USAGE.labels(component="embedding_cache").set(cache.nbytes)
+
+
+class SystemMetricsSampler:
+    """Thread em background que chama `update` a cada `interval` segundos, fora do caminho do scrape"""
+    def __init__(self, update: Callable[[], None], interval: float = 15.0):
+        self.update = update
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="metrics-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.update()
+            except Exception as exc:
+                print(f"Falha ao atualizar métricas de sistema: {exc}")
+            self._stop.wait(self.interval)
+
+_multiprocess_registry: Optional[CollectorRegistry] = None
+
+
+def metrics_registry() -> CollectorRegistry:
+    """
+    Registry exposto no /metrics. Com PROMETHEUS_MULTIPROC_DIR definido (vários workers
+    uvicorn, ver app/serve.py), agrega os arquivos de métricas de todos os processos.
+    """
+    global _multiprocess_registry
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+    if _multiprocess_registry is None:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        _multiprocess_registry = registry
+    return _multiprocess_registry
+
+
+def _families(*metrics) -> Dict[str, Any]:
+    """Famílias de métricas pelo nome, lidas direto dos coletores (ou dos arquivos multiprocesso)"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        names = {metric._name for metric in metrics}
+        return {family.name: family for family in metrics_registry().collect() if family.name in names}
+    return {family.name: family for metric in metrics for family in metric.collect()}
+
+
+def _sum_samples(family, suffix: str = "", group_by: Optional[str] = None):
+    """Soma dos samples `<nome><suffix>`, no total ou agrupada por um label"""
+    totals: Dict[str, float] = {}
+    if family is not None:
+        for sample in family.samples:
+            if sample.name == family.name + suffix:
+                key = sample.labels.get(group_by, "") if group_by else ""
+                totals[key] = totals.get(key, 0.0) + sample.value
+    return totals if group_by else totals.get("", 0.0)
+
+
+def _mean(family, group_by: Optional[str] = None):
+    """Média de um histograma (_sum / _count), no total ou por label"""
+    sums, counts = _sum_samples(family, "_sum", group_by), _sum_samples(family, "_count", group_by)
+    if group_by is None:
+        return sums / counts if counts else None
+    return {key: sums[key] / counts[key] for key in counts if counts[key]}
+
+
+def build_metrics_summary() -> Dict[str, Any]:
+    """Resumo das métricas principais calculado a partir dos coletores"""
+    families = _families(REQUESTS_TOTAL, REQUEST_DURATION, STAGE_DURATION, CANDIDATES_FOUND,
+                         ACTIVE_CANDIDATES_COUNT, MEMORY_USAGE)
+    requests = families.get(REQUESTS_TOTAL._name)
+    candidates = families.get(CANDIDATES_FOUND._name)
+    searches = _sum_samples(candidates, "_count")
+    return {
+        "timestamp": time.time(),
+        "application": {
+            "status": "running",
+            "version": "1.0.0"
+        },
+        "requests": {
+            "total_requests": _sum_samples(requests, "_total"),
+            "by_endpoint": _sum_samples(requests, "_total", group_by="endpoint"),
+            "by_status_code": _sum_samples(requests, "_total", group_by="status_code"),
+        },
+        "performance": {
+            "avg_duration_seconds": _mean(families.get(REQUEST_DURATION._name)),
+            "avg_stage_seconds": _mean(families.get(STAGE_DURATION._name), group_by="stage"),
+        },
+        "business": {
+            "searches": searches,
+            "candidates_found": _sum_samples(candidates, "_sum"),
+            "avg_candidates_per_search": _sum_samples(candidates, "_sum") / searches if searches else None,
+            "active_candidates": _sum_samples(families.get(ACTIVE_CANDIDATES_COUNT._name)),
+        },
+        "system": {
+            "memory_usage_bytes": _sum_samples(families.get(MEMORY_USAGE._name), group_by="component"),
+        },
+    }
+
+
+_summary_cache: Dict[str, Any] = {"expires": 0.0, "summary": None}
+_summary_lock = threading.Lock()
+
+
+def metrics_summary(ttl_seconds: float = 5.0) -> Dict[str, Any]:
+    """build_metrics_summary com cache de `ttl_seconds`, para consultas frequentes não recalcularem tudo"""
+    with _summary_lock:
+        now = time.monotonic()
+        if _summary_cache["summary"] is None or now >= _summary_cache["expires"]:
+            _summary_cache["summary"] = build_metrics_summary()
+            _summary_cache["expires"] = now + ttl_seconds
+        return _summary_cache["summary"]
 
 def classify_job_area(job_description: str) -> str:
     """Classifica a área do trabalho baseado na descrição"""
@@ -237,7 +486,7 @@ APPLICATION_INFO = Info(
 # Configurar informações da aplicação
 APPLICATION_INFO.info({
     'version': '1.0.0',
-    'faiss_index_type': 'HNSW',
+    'faiss_index_type': 'flat',  # sobrescrito em app/main.py com o index_type configurado
     'embedding_model': 'all-MiniLM-L6-v2',
     'database_type': 'parquet'
 })
\ No newline at end of file
@@ -1,29 +1,39 @@
 import pandas as pd
-from src.utils import load_json, save_to_parquet
+from src.utils import load_json, save_to_parquet, stream_json_to_parquet
 
-def ingest_data(file_config) -> None:
+def ingest_data(file_config, streaming: bool = False, chunk_size: int = 10000) -> None:
     """
     Ingest data from a JSON file and convert it to a pandas DataFrame.
 
     :param file_path: Path to the JSON file
     :param id_column_name: Name of the ID column in the DataFrame
+    :param streaming: Read and write the file in chunks of chunk_size records (bounded memory)
     :return: pandas DataFrame containing the ingested data
     """
-    df = load_json(file_config)
     name = f"{file_config['path'].split('/')[-1].replace('.json', '')}"
+    if streaming:
+        stream_json_to_parquet(file_config, name, chunk_size)
+        return
+    df = load_json(file_config)
     save_to_parquet(df, name)
     return 
 
-def preprocessing(datasource_config) -> None:
+def preprocessing(datasource_config, streaming: bool = False, chunk_size: int = 10000) -> None:
     """
     Run the ingestion pipeline to convert JSON data to Parquet format for predefined datasources.
 
     :param input_paths: Dictionary mapping datasource names to their respective file paths
+    :param streaming: Stream each file record by record into parquet row groups
+        (peak memory independent of the file size) instead of loading it whole
+    :param chunk_size: Records per row group in streaming mode
     """
 
     for entity, entity_config in datasource_config.items():
         print(f"Ingesting data for entity: {entity}")
         print(f"Path: {entity_config['path']}")
-        ingest_data(entity_config)
+        if streaming:
+            ingest_data(entity_config, streaming=True, chunk_size=chunk_size)
+        else:
+            ingest_data(entity_config)
 
 
@@ -1,4 +1,4 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterator, List, Any, Optional, Sequence, Union
 import re
 import numpy as np
 import pandas as pd
@@ -10,14 +10,21 @@ sys.path.insert(0, workspace_root)
 from src.feature_engineering import extract_filters_from_text
 from src.embedding_manager import EmbeddingManager
 from src.indexer import FAISSIndexer
+from src.applicant_store import ApplicantStore, get_applicant_store
+from src.reranker import CrossEncoderReranker
+from src.metrics import track_stage
 
 def retrieve_top_applicants(emb_mgr: EmbeddingManager,
                             indexer:FAISSIndexer, 
                             query_text:str, 
-                            k_top_applicants:int = 5)->List[Dict[str,Any]]:
-    filters = extract_filters_from_text(query_text)
-    qvec = emb_mgr.generate_embedding(query_text)
-    results = indexer.query_embedding(qvec, filters=filters, k=k_top_applicants)
+                            k_top_applicants:int = 5,
+                            search_k: Optional[int] = None)->List[Dict[str,Any]]:
+    with track_stage("filter_extraction"):
+        filters = extract_filters_from_text(query_text)
+    with track_stage("encoding"):
+        qvec = emb_mgr.generate_embedding(query_text)
+    results = indexer.query_embedding(qvec, filters=filters, k=k_top_applicants, search_k=search_k,
+                                      text=query_text)
     return results
 
 
@@ -28,48 +35,67 @@ def find_top_applicants_with_filters(
     emb_mgr: EmbeddingManager,
     filters: Optional[Dict[str, bool]] = None,
     top_n: int = 5,
-    search_k: int = 100
+    search_k: int = 100,
+    applicant_store: Optional[ApplicantStore] = None,
+    reranker: Optional[CrossEncoderReranker] = None
 ) -> List[Dict[str, Any]]:
     """
     Retrieve candidate ids from FAISS by querying with the job_description embedding,
     then apply column-level include/exclude filters against applicants_df and return
     the top_n matches.
 
-    - search_k: number of neighbors to fetch from FAISS (fetch more and then filter down).
+    - search_k: initial number of neighbors FAISS fetches for filtered queries on
+      approximate indexes (grown automatically until top_n filtered hits are found).
     - filters: dict with keys like "col:val" and boolean flag True=include, False=exclude.
+    - applicant_store: resident applicants table (defaults to the shared store, loaded once).
+    - reranker: optional cross-encoder stage; the first reranker.candidates hits are
+      retrieved and reordered by it before keeping top_n.
     """
-    applicants_df = pd.read_parquet("data/processed/applicants.parquet")
+    applicant_store = applicant_store or get_applicant_store()
+    applicant_store.refresh()
 
-    if applicants_df is None or len(applicants_df) == 0:
+    if len(applicant_store) == 0:
         return []
+    k = max(top_n, reranker.candidates) if reranker is not None else top_n
     raw_results = retrieve_top_applicants(
         emb_mgr=emb_mgr,
         indexer=faiss_indexer,
         query_text=job_description,
-        k_top_applicants=top_n)
+        k_top_applicants=k,
+        search_k=search_k)
 
-    # apply filtering and collect candidates
+    candidates = build_candidates(raw_results, applicant_store, k)
+    if reranker is not None:
+        candidates = reranker.rerank(job_description, candidates)
+    return candidates[:top_n]
+
+
+def build_candidates(raw_results: List[Dict[str, Any]], applicant_store: ApplicantStore, top_n: int) -> List[Dict[str, Any]]:
+    """Join FAISS hits with their applicants rows and return the top_n by score."""
+    with track_stage("applicant_lookup"):
+        return _build_candidates(raw_results, applicant_store, top_n)
+
+
+def _build_candidates(raw_results: List[Dict[str, Any]], applicant_store: ApplicantStore, top_n: int) -> List[Dict[str, Any]]:
     candidates = []
     for r in raw_results:
         meta = r.get("metadata", {})
 
-        # meta should include 'idx' pointing to row in applicants_df
+        # meta should include 'idx' pointing to row in the applicants table; the
+        # applicants_id is preferred since positions shift when the table is rebuilt
         idx = meta.get("idx")
         if idx is None:
             continue
-        try:
-            row = applicants_df.loc[idx]
-        except Exception:
-            # fallback to iloc if loc fails (e.g., index is simple range)
-            try:
-                row = applicants_df.iloc[idx]
-            except Exception:
-                continue
+        row = applicant_store.get_by_id(meta["applicants_id"]) if "applicants_id" in meta else None
+        if row is None:
+            row = applicant_store.get(idx)
+        if row is None:
+            continue
 
         candidates.append({
             "applicant_idx": int(idx),
             "applicant_id": row.get("applicants_id", None),
-            "nome": row.get("nome", None) if "nome" in row.index else None,
+            "nome": row.get("nome", None),
             "score": float(r.get("score", 0.0)),
             "metadata": meta
         })
@@ -79,6 +105,58 @@ def find_top_applicants_with_filters(
     return candidates
 
 
+def iter_top_applicants_batch(
+    job_descriptions: Sequence[str],
+    faiss_indexer: FAISSIndexer,
+    emb_mgr: EmbeddingManager,
+    top_n: Union[int, Sequence[int]] = 5,
+    filters: Optional[Sequence[Optional[Dict[str, int]]]] = None,
+    search_k: int = 100,
+    applicant_store: Optional[ApplicantStore] = None,
+    chunk_size: int = 64,
+    reranker: Optional[CrossEncoderReranker] = None
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Batch version of find_top_applicants_with_filters, yielding one candidate list
+    per job description, in order.
+
+    Job descriptions are processed `chunk_size` at a time: one batched encode and
+    one multi-query FAISS search per chunk, so results for the first chunk are
+    available before later ones are encoded.
+
+    - top_n: one value for all jobs or one per job.
+    - filters: optional per-job metadata filters ({"Senior": 1, ...}); None (or a
+      None entry) extracts them from the job text as the single-query path does.
+    - reranker: optional cross-encoder stage, run once per chunk (its time budget
+      covers the whole chunk).
+    """
+    applicant_store = applicant_store or get_applicant_store()
+    applicant_store.refresh()
+    n = len(job_descriptions)
+    top_ns = [top_n] * n if isinstance(top_n, int) else list(top_n)
+    filters = list(filters) if filters is not None else [None] * n
+
+    for start in range(0, n, chunk_size):
+        texts = list(job_descriptions[start:start + chunk_size])
+        with track_stage("filter_extraction"):
+            chunk_filters = [
+                f if f is not None else extract_filters_from_text(text)
+                for text, f in zip(texts, filters[start:start + chunk_size])
+            ]
+        chunk_top_ns = top_ns[start:start + chunk_size]
+        chunk_ks = [max(k, reranker.candidates) for k in chunk_top_ns] if reranker is not None else chunk_top_ns
+        with track_stage("encoding"):
+            qvecs = emb_mgr.generate_embedding(texts)
+        raw_results = faiss_indexer.query_embeddings(qvecs, k=chunk_ks, filters=chunk_filters,
+                                                     search_k=search_k, texts=texts)
+        candidate_lists = [build_candidates(rows, applicant_store, k) if len(applicant_store) else []
+                           for rows, k in zip(raw_results, chunk_ks)]
+        if reranker is not None:
+            candidate_lists = reranker.rerank_many(texts, candidate_lists)
+        for candidates, row_top_n in zip(candidate_lists, chunk_top_ns):
+            yield candidates[:row_top_n]
+
+
 class RecruiterBot:
     """
     Lightweight recruiter bot that keeps a running job_description and filters,
@@ -90,11 +168,13 @@ class RecruiterBot:
       bot = RecruiterBot(applicants_df, emb_mgr, indexer)
       reply = bot.chat("Looking for a senior engineer in São Paulo with advanced English")
     """
-    def __init__(self, emb_mgr: EmbeddingManager, faiss_indexer: FAISSIndexer):
+    def __init__(self, emb_mgr: EmbeddingManager, faiss_indexer: FAISSIndexer,
+                 reranker: Optional[CrossEncoderReranker] = None):
         self.job_description = ""
         self.filters: Dict[str, bool] = {}
         self.emb_mgr = emb_mgr
         self.faiss_indexer = faiss_indexer
+        self.reranker = reranker
 
     def chat(self, message: str, top_n: int = 5) -> str:
         """Update state and return a short textual reply with top matches."""
@@ -108,7 +188,8 @@ class RecruiterBot:
             emb_mgr=self.emb_mgr,
             filters=self.filters,
             top_n=top_n,
-            search_k=200
+            search_k=200,
+            reranker=self.reranker
         )
 
         if not matches:
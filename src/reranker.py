@@ -0,0 +1,137 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import yaml
+
+from src.embedding_cache import normalize_text
+from src.metrics import RERANK_OUTCOMES, track_stage
+
+
+class CrossEncoderReranker:
+    """
+    Second retrieval stage: rescores the first FAISS candidates of a job with a
+    local cross-encoder (sentence_transformers.CrossEncoder) reading the job text
+    and the candidate text together, and reorders them by that score.
+
+    Configured by the `reranker` section of models_config.yaml. Only the first
+    `candidates` hits of each job are rescored, `batch_size` pairs per model call,
+    within `time_budget_ms` per rerank_many call: a batch is not started when it is
+    not expected to finish in time (judged from a running average of past batch
+    times, so a model slower than the budget is not called at all), and jobs left
+    with unscored pairs keep their first-stage order. Scores are kept in an LRU
+    cache keyed by (job hash, candidate id, candidate text hash), so repeated
+    queries only pay for new pairs.
+    `model` replaces the CrossEncoder (anything with predict(pairs, batch_size=...)).
+    """
+    def __init__(self, config_path: str = "src/models_config.yaml", model: Optional[Any] = None):
+        with open(config_path, 'r') as file:
+            config = yaml.safe_load(file)
+        reranker_config = config.get('reranker') or {}
+        self.model_name = reranker_config.get('name', "cross-encoder/ms-marco-MiniLM-L-6-v2")
+        self.batch_size = reranker_config.get('batch_size', 16)
+        self.candidates = reranker_config.get('candidates', 30)
+        self.time_budget = reranker_config.get('time_budget_ms', 150) / 1000.0
+        self.text_field = reranker_config.get('text_field', "text")
+        self.max_entries = reranker_config.get('cache_entries', 20000)
+        if model is None:
+            # imported here: sentence_transformers pulls in torch, which is slow to import
+            from sentence_transformers import CrossEncoder
+            model = CrossEncoder(self.model_name, device=reranker_config.get('device', 'cpu'),
+                                 max_length=reranker_config.get('max_length', 256))
+        self.model = model
+        self._cache: "OrderedDict[Tuple[str, Any, Any], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        # running average of the seconds one model call takes; None until the first batch
+        self._batch_seconds: Optional[float] = None
+
+    def _job_key(self, job_description: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{normalize_text(job_description)}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _candidate_key(candidate: Dict[str, Any]) -> Tuple[Any, Any]:
+        meta = candidate.get("metadata", {})
+        return candidate.get("applicant_id", candidate.get("applicant_idx")), meta.get("text_hash")
+
+    def _cached(self, key) -> Optional[float]:
+        with self._lock:
+            score = self._cache.get(key)
+            if score is not None:
+                self._cache.move_to_end(key)
+            return score
+
+    def _store(self, keys: Sequence, scores: Sequence[float]):
+        with self._lock:
+            for key, score in zip(keys, scores):
+                self._cache[key] = score
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _record_batch_time(self, seconds: float):
+        with self._lock:
+            if self._batch_seconds is None:
+                self._batch_seconds = seconds
+            else:
+                self._batch_seconds = 0.8 * self._batch_seconds + 0.2 * seconds
+
+    def rerank(self, job_description: str, candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return self.rerank_many([job_description], [candidates])[0]
+
+    def rerank_many(self, job_descriptions: Sequence[str],
+                    candidate_lists: Sequence[List[Dict[str, Any]]]) -> List[List[Dict[str, Any]]]:
+        """
+        Reorder each candidate list (first-stage order, best first) by cross-encoder
+        score. Reranked candidates gain "rerank_score"; hits past the cap follow them
+        in their original order. Lists that could not be fully scored within the
+        budget are returned unchanged.
+        """
+        with track_stage("rerank"):
+            return self._rerank_many(job_descriptions, candidate_lists)
+
+    def _rerank_many(self, job_descriptions, candidate_lists):
+        deadline = time.perf_counter() + self.time_budget
+        scores: List[List[Optional[float]]] = []
+        pending: List[Tuple[int, int, Tuple, Tuple[str, str]]] = []  # (job, rank, cache key, pair)
+        for job, (description, candidates) in enumerate(zip(job_descriptions, candidate_lists)):
+            job_key = self._job_key(description)
+            job_scores: List[Optional[float]] = []
+            for rank, candidate in enumerate(candidates[:self.candidates]):
+                key = (job_key, *self._candidate_key(candidate))
+                job_scores.append(self._cached(key))
+                if job_scores[-1] is None:
+                    text = candidate.get("metadata", {}).get(self.text_field) or ""
+                    pending.append((job, rank, key, (description, str(text))))
+            scores.append(job_scores)
+
+        # pairs are in job order, so jobs are completed one after the other
+        slowest = 0.0
+        for start in range(0, len(pending), self.batch_size):
+            if time.perf_counter() + max(self._batch_seconds or 0.0, slowest) > deadline:
+                break
+            started = time.perf_counter()
+            batch = pending[start:start + self.batch_size]
+            batch_scores = np.asarray(self.model.predict([pair for *_, pair in batch], batch_size=self.batch_size),
+                                      dtype=np.float32).ravel().tolist()
+            elapsed = time.perf_counter() - started
+            slowest = max(slowest, elapsed)
+            self._record_batch_time(elapsed)
+            self._store([key for _, _, key, _ in batch], batch_scores)
+            for (job, rank, _, _), score in zip(batch, batch_scores):
+                scores[job][rank] = score
+
+        results = []
+        for candidates, job_scores in zip(candidate_lists, scores):
+            if not job_scores or any(score is None for score in job_scores):
+                if job_scores:
+                    RERANK_OUTCOMES.labels(outcome="budget_exceeded").inc()
+                results.append(candidates)
+                continue
+            RERANK_OUTCOMES.labels(outcome="reranked").inc()
+            head = [{**candidate, "rerank_score": score} for candidate, score in zip(candidates, job_scores)]
+            head.sort(key=lambda candidate: candidate["rerank_score"], reverse=True)
+            results.append(head + candidates[len(head):])
+        return results
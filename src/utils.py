@@ -1,8 +1,34 @@
+import importlib.util
 import json
+import sys
 import pandas as pd
-from typing import Any, Dict
+from types import ModuleType
+from typing import Any, Dict, Iterator, List, Tuple
 import yaml
 import os
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Return module `name`, deferring its actual import until an attribute is first accessed.
+    Keeps heavy dependencies (faiss, torch, ...) off the import path of the API process.
+
+    :param name: Fully qualified module name
+    :return: The (possibly not yet executed) module
+    :raises ModuleNotFoundError: If the module is not installed
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'")
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
 def load_yaml(file_path: str) -> Dict[str, Any]:
 
     """
@@ -40,6 +66,20 @@ def load_parquet(file_path: str) -> pd.DataFrame:
         raise ValueError(f"Error reading Parquet file at {file_path}: {e}")
     
     
+def flatten_record(id_column_name: str, item_id: str, item_info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Flatten one top-level JSON record into a row: the id plus every field, with the
+    fields of nested sections (dicts) lifted to the top level.
+    """
+    row = {id_column_name: item_id}
+    for key, value in item_info.items():
+        if isinstance(value, dict):
+            row.update(value)
+        else:
+            row[key] = value
+    return row
+
+
 def load_json(file_info: Dict[str, str]) -> pd.DataFrame:
     """
     Load two JSON files and convert them to a pandas DataFrame.
@@ -47,33 +87,148 @@ def load_json(file_info: Dict[str, str]) -> pd.DataFrame:
     :param file_info: Dictionary with two keys: 'id' for the ID column name and 'file_path' for the JSON file path
     :return: Combined pandas DataFrame
     """
-    rows = []
     id_column_name = file_info['id']
     json_file_path = file_info['path']
 
     with open(json_file_path, "r", encoding="utf-8") as f:
         data = json.load(f)
 
-    for item_id, item_info in data.items():
-        row = {id_column_name: item_id}
-        # Flatten nested information
-        for key, value in item_info.items():
-            if isinstance(value, dict):
-                row.update(value)
-            else:
-                row[key] = value
-        rows.append(row)
-
+    rows = [flatten_record(id_column_name, item_id, item_info) for item_id, item_info in data.items()]
     df = pd.DataFrame(rows)
     return df
 
-def save_to_parquet(df: pd.DataFrame, file_name: str) -> None:
-    """Save a pandas DataFrame to a Parquet file."""
+
+def iter_json_items(json_file_path: str, read_size: int = 1 << 20) -> Iterator[Tuple[str, Any]]:
+    """
+    Yield the (key, value) pairs of a top-level JSON object one at a time.
+
+    The file is read in blocks of `read_size` characters and each value is decoded
+    with JSONDecoder.raw_decode as soon as it is complete, so memory holds one block
+    plus the current value instead of the whole document.
+
+    :param json_file_path: Path to the JSON file
+    :param read_size: Number of characters read per block
+    :raises ValueError: If the file is not a JSON object
+    """
+    decoder = json.JSONDecoder()
+    with open(json_file_path, "r", encoding="utf-8") as f:
+        buf, pos, eof = "", 0, False
+
+        def read_more() -> bool:
+            nonlocal buf, pos, eof
+            chunk = f.read(read_size)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+            return not eof
+
+        def skip_whitespace():
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n":
+                    pos += 1
+                if pos < len(buf) or not read_more():
+                    return
+
+        def expect(char: str):
+            nonlocal pos
+            skip_whitespace()
+            if buf[pos:pos + 1] != char:
+                raise ValueError(f"Invalid JSON object in {json_file_path}: expected '{char}'")
+            pos += 1
+
+        def decode() -> Any:
+            nonlocal pos
+            skip_whitespace()
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if not read_more():
+                        raise
+                    continue
+                if end == len(buf) and not eof:
+                    # a number or literal ending at the block edge may continue in the next block
+                    read_more()
+                    continue
+                pos = end
+                return value
+
+        expect("{")
+        skip_whitespace()
+        if buf[pos:pos + 1] == "}":
+            return
+        while True:
+            key = decode()
+            expect(":")
+            yield key, decode()
+            skip_whitespace()
+            if buf[pos:pos + 1] == "}":
+                return
+            expect(",")
+
+
+def iter_json_rows(file_info: Dict[str, str], chunk_size: int = 10000) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Stream a JSON datasource as lists of at most `chunk_size` flattened rows.
+
+    :param file_info: Dictionary with 'id' (ID column name) and 'path' (JSON file path)
+    :param chunk_size: Maximum number of rows per list
+    """
+    rows = []
+    for item_id, item_info in iter_json_items(file_info['path']):
+        rows.append(flatten_record(file_info['id'], item_id, item_info))
+        if len(rows) >= chunk_size:
+            yield rows
+            rows = []
+    if rows:
+        yield rows
+
+
+def _processed_path(file_name: str) -> str:
     prefix_path = "data/processed/"
     if not os.path.exists(prefix_path):
         os.makedirs(prefix_path)
     output_file_path = f"{file_name}.parquet"
-    df.to_parquet(prefix_path+output_file_path, index=False)
+    return prefix_path + output_file_path
+
+
+def save_to_parquet(df: pd.DataFrame, file_name: str) -> None:
+    """Save a pandas DataFrame to a Parquet file."""
+    df.to_parquet(_processed_path(file_name), index=False)
+
+
+def stream_json_to_parquet(file_info: Dict[str, str], file_name: str, chunk_size: int = 10000) -> int:
+    """
+    Convert a JSON datasource to data/processed/<file_name>.parquet without loading it whole.
+
+    A first pass only infers the schema (columns in first-seen order, types unified
+    across chunks); the second pass writes every chunk of `chunk_size` rows as its own
+    row group through a ParquetWriter. Peak memory is bounded by the chunk size.
+
+    :param file_info: Dictionary with 'id' (ID column name) and 'path' (JSON file path)
+    :param file_name: Output name, without extension
+    :param chunk_size: Rows per chunk / row group
+    :return: Number of rows written
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schemas = [pa.schema(pa.array(rows).type) for rows in iter_json_rows(file_info, chunk_size)]
+    if not schemas:
+        save_to_parquet(pd.DataFrame(), file_name)
+        return 0
+    schema = pa.unify_schemas(schemas, promote_options="permissive")
+
+    output_path = _processed_path(file_name)
+    tmp_path = f"{output_path}.tmp"
+    total = 0
+    with pq.ParquetWriter(tmp_path, schema) as writer:
+        for rows in iter_json_rows(file_info, chunk_size):
+            table = pa.Table.from_struct_array(pa.array(rows, type=pa.struct(schema)))
+            writer.write_table(table, row_group_size=len(rows))
+            total += len(rows)
+    os.replace(tmp_path, output_path)
+    return total
 
 
 class DatasourceConfig:
@@ -0,0 +1,47 @@
+import zlib
+from contextlib import contextmanager
+
+import numpy as np
+import pytest
+
+
+class FakeEmbeddingManager:
+    """
+    Deterministic unit vectors per text, encoded in chunks like EmbeddingManager.
+    A text ending in a number N points (almost) along axis N % dim, so "job N" and
+    "applicant N" match; any other text gets a random vector seeded by its content.
+    Records the size of every chunk (calls) and every text encoded (encoded).
+    """
+    chunk_size = 3
+    num_workers = 1
+
+    def __init__(self, dim=8):
+        self.dim = dim
+        self.calls = []
+        self.encoded = []
+
+    def vector(self, text):
+        last = text.split()[-1] if text.split() else ""
+        if last.isdigit():
+            vec = np.full(self.dim, 0.01, dtype=np.float32)
+            vec[int(last) % self.dim] = 1.0
+        else:
+            vec = np.random.default_rng(zlib.crc32(text.encode("utf-8"))).normal(size=self.dim).astype(np.float32)
+        return vec / np.linalg.norm(vec)
+
+    def iter_embeddings(self, texts, chunk_size=None):
+        chunk_size = chunk_size or self.chunk_size
+        for start in range(0, len(texts), chunk_size):
+            chunk = texts[start:start + chunk_size]
+            self.calls.append(len(chunk))
+            self.encoded.extend(chunk)
+            yield np.stack([self.vector(t) for t in chunk])
+
+    @contextmanager
+    def worker_pool(self, num_workers=None):
+        yield self
+
+
+@pytest.fixture
+def fake_emb_mgr():
+    return FakeEmbeddingManager()
@@ -0,0 +1,124 @@
+import json
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from app import main
+from benchmarks.bench_matching import fake_embedding_manager
+from src.applicant_store import ApplicantStore
+from src.indexer import FAISSIndexer
+
+APPLICANTS = [
+    ("31000", "Alice", "Senior", "Recife", "desenvolvedor python django"),
+    ("31001", "Bob", "Junior", "Recife", "desenvolvedor java spring"),
+    ("31002", "Carol", "Senior", "Manaus", "analista de dados python sql"),
+    ("31003", "Dave", "Pleno", "Recife", "consultor sap fi"),
+]
+
+
+@pytest.fixture
+def state(monkeypatch):
+    """A fresh ServiceState that loads nothing at startup (components are set by the test)."""
+    service = main.ServiceState()
+    monkeypatch.setattr(service, "start_loading", lambda: None)
+    monkeypatch.setattr(main, "state", service)
+    return service
+
+
+@pytest.fixture
+def client(state):
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def loaded(state, tmp_path):
+    """Mark every component healthy, backed by a small index and applicants table."""
+    emb_mgr = fake_embedding_manager(dim=16)
+    indexer = FAISSIndexer({"index": {"index_type": "flat", "k": 5}, "paths": {
+        "index_path": str(tmp_path / "faiss.index"), "meta_path": str(tmp_path / "faiss_meta.arrow")}})
+    indexer.add_embeddings(
+        emb_mgr.generate_embedding([text for *_, text in APPLICANTS], use_cache=False),
+        [{"source": "applicants", "idx": i, "applicants_id": applicant_id, "nome": nome,
+          "nivel_profissional": level, "local": city, "text": text}
+         for i, (applicant_id, nome, level, city, text) in enumerate(APPLICANTS)])
+    path = tmp_path / "applicants.parquet"
+    pd.DataFrame({"applicants_id": [a[0] for a in APPLICANTS], "nome": [a[1] for a in APPLICANTS]}).to_parquet(
+        path, index=False)
+    state.indexer, state.emb_mgr, state.applicant_store = indexer, emb_mgr, ApplicantStore(str(path))
+    state.status = {component: "healthy" for component in state.status}
+    return state
+
+
+def test_health_reports_each_component_while_loading(client, state):
+    response = client.get("/health")
+    assert response.status_code == 503
+    body = response.json()
+    assert body["status"] == "starting"
+    assert set(body["components"].values()) == {"loading"}
+
+    state.status["faiss"] = "failed: missing index"
+    body = client.get("/health").json()
+    assert body["status"] == "unhealthy" and body["components"]["faiss"] == "failed: missing index"
+
+
+def _requests(status_code):
+    return REGISTRY.get_sample_value("job_matching_requests_total",
+                                     {"endpoint": "predict", "method": "POST", "status_code": status_code}) or 0.0
+
+
+def test_predict_is_unavailable_until_components_are_ready(client):
+    before_503, before_500 = _requests("503"), _requests("500")
+    response = client.post("/predict", json={"job_description": "desenvolvedor python"})
+    assert response.status_code == 503
+    assert response.json()["detail"]["status"] == "starting"
+    # counted with its own status, not as a server error
+    assert _requests("503") == before_503 + 1
+    assert _requests("500") == before_500
+
+
+def test_health_and_predict_succeed_once_loaded(client, loaded):
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.json()["status"] == "healthy"
+
+    response = client.post("/predict", json={"job_description": "desenvolvedor python django", "top_n": 2})
+    assert response.status_code == 200
+    assert [c["nome"] for c in response.json()][0] == "Alice"
+
+
+def _ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_predict_batch_streams_one_line_per_item_in_request_order(client, loaded):
+    items = [
+        {"job_description": "consultor sap fi", "top_n": 1},
+        {"job_description": "desenvolvedor python", "top_n": 3, "filters": {"Senior": 1}},
+        {"job_description": "desenvolvedor java spring em Recife", "top_n": 2},
+    ]
+    response = client.post("/predict/batch", json={"items": items})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.text.endswith("\n")
+
+    lines = _ndjson(response)
+    assert [line["index"] for line in lines] == [0, 1, 2]
+    assert [len(line["candidates"]) for line in lines] == [1, 2, 2]
+    assert lines[0]["candidates"][0]["nome"] == "Dave"
+    # explicit filters: only the two Senior applicants qualify, whatever top_n asks for
+    assert {c["nome"] for c in lines[1]["candidates"]} == {"Alice", "Carol"}
+    # filters extracted from the text ("Recife") when the item has none
+    assert lines[2]["candidates"][0]["nome"] == "Bob"
+    assert all(c["metadata"]["local"] == "Recife" for c in lines[2]["candidates"])
+
+
+def test_predict_batch_rejects_an_empty_item_list(client, loaded):
+    assert client.post("/predict/batch", json={"items": []}).status_code == 422
+
+
+def test_predict_batch_is_unavailable_until_components_are_ready(client):
+    response = client.post("/predict/batch", json={"items": [{"job_description": "desenvolvedor python"}]})
+    assert response.status_code == 503
+    assert response.json()["detail"]["components"]["faiss"] == "loading"
@@ -0,0 +1,46 @@
+import os
+import pandas as pd
+import pytest
+from src.applicant_store import ApplicantStore
+
+
+@pytest.fixture
+def applicants_path(tmp_path):
+    path = tmp_path / "applicants.parquet"
+    pd.DataFrame({
+        "applicants_id": ["31000", "31001", "31002"],
+        "nome": ["Alice", "Bob", "Carol"],
+        "cv_pt": ["long cv"] * 3,
+    }).to_parquet(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_lookup_by_position_and_id(applicants_path, use_mmap):
+    store = ApplicantStore(applicants_path, use_mmap=use_mmap)
+    assert len(store) == 3
+    assert store.get(1) == {"applicants_id": "31001", "nome": "Bob"}
+    assert store.get(3) is None
+    assert store.get(None) is None
+    assert store.get_by_id("31002")["nome"] == "Carol"
+    assert os.path.exists(applicants_path + ".arrow") == use_mmap
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+@pytest.mark.parametrize("index", [[10, 20, 30], pd.RangeIndex(5, 8)])
+def test_lookup_by_row_label_of_a_custom_index(tmp_path, index, use_mmap):
+    path = str(tmp_path / "applicants.parquet")
+    pd.DataFrame({"applicants_id": ["1", "2", "3"], "nome": ["Alice", "Bob", "Carol"]}, index=index).to_parquet(path)
+    store = ApplicantStore(path, use_mmap=use_mmap)
+    assert store.get(index[1]) == {"applicants_id": "2", "nome": "Bob"}
+    assert store.get(0) is None
+
+
+def test_reloads_when_file_changes(applicants_path):
+    store = ApplicantStore(applicants_path, check_interval=0)
+    pd.DataFrame({"applicants_id": ["1"], "nome": ["Dave"]}).to_parquet(applicants_path, index=False)
+    stat = os.stat(applicants_path)
+    os.utime(applicants_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    store.refresh()
+    assert len(store) == 1
+    assert store.get(0)["nome"] == "Dave"
@@ -0,0 +1,34 @@
+import asyncio
+import pytest
+from src.batching import MicroBatcher
+
+
+def test_concurrent_submits_are_coalesced():
+    batches = []
+
+    def process(items):
+        batches.append(list(items))
+        return [item * 10 for item in items]
+
+    async def run():
+        batcher = MicroBatcher(process, max_batch_size=4, max_wait_ms=50)
+        results = await asyncio.gather(*[batcher.submit(i) for i in range(6)])
+        await batcher.stop()
+        return results
+
+    assert asyncio.run(run()) == [0, 10, 20, 30, 40, 50]
+    assert [len(b) for b in batches] == [4, 2]
+
+
+def test_batch_errors_reach_every_caller():
+    def process(items):
+        raise RuntimeError("model unavailable")
+
+    async def run():
+        batcher = MicroBatcher(process, max_batch_size=8, max_wait_ms=10)
+        results = await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+        await batcher.stop()
+        return results
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
@@ -0,0 +1,46 @@
+import argparse
+
+import numpy as np
+from benchmarks.bench_matching import BENCHMARKS, compare, fake_embedding_manager, index_config, run_size
+
+
+def test_fake_embedder_is_deterministic_and_normalized():
+    emb_mgr = fake_embedding_manager(dim=16)
+    first = emb_mgr.generate_embedding(["python senior", "java junior"], use_cache=False)
+    second = emb_mgr.generate_embedding(["python senior", "java junior"], use_cache=False)
+    np.testing.assert_array_equal(first, second)
+    np.testing.assert_allclose(np.linalg.norm(first, axis=1), 1.0, rtol=1e-5)
+
+
+def test_run_size_reports_every_benchmark():
+    args = argparse.Namespace(benchmarks=list(BENCHMARKS), index_type="flat", lexical="config", dim=16,
+                              k=3, queries=5, encode_texts=50, seed=0)
+    base_cfg = {"index": {"index_type": "flat", "k": 3}}
+    results = run_size(300, base_cfg, args, fake_embedding_manager(dim=16))
+
+    assert {row["benchmark"] for row in results} == set(BENCHMARKS)
+    assert [row["case"] for row in results if row["benchmark"] == "query"] == [
+        "unfiltered", "filter_level", "filter_level_city_english"]
+    ingest = next(row for row in results if row["benchmark"] == "ingest")
+    assert ingest["vectors"] == 300 and ingest["vectors_per_s"] > 0
+    assert all(row["calls"] == 5 for row in results if "calls" in row)
+
+    report = {"results": results}
+    changes = compare(report, report)
+    assert changes and all(change["change"] == 0 for change in changes)
+
+
+def test_index_config_keeps_the_lexical_section(tmp_path):
+    base_cfg = {"index": {"index_type": "flat"}, "lexical": {"enabled": False, "weight": 0.4}}
+    assert index_config(base_cfg, str(tmp_path), None)["lexical"] == {"enabled": False, "weight": 0.4}
+    assert index_config(base_cfg, str(tmp_path), "hnsw", lexical=True)["lexical"] == {"enabled": True, "weight": 0.4}
+    assert base_cfg["lexical"]["enabled"] is False
+
+
+def test_run_size_benchmarks_hybrid_search():
+    args = argparse.Namespace(benchmarks=["ingest", "query"], index_type="flat", lexical="on", dim=16, k=3,
+                              queries=5, encode_texts=50, seed=0)
+    results = run_size(300, {"index": {"index_type": "flat", "k": 3}}, args, fake_embedding_manager(dim=16))
+    ingest = next(row for row in results if row["benchmark"] == "ingest")
+    assert ingest["bm25_bytes"] > 0
+    assert all(row["calls"] == 5 for row in results if row["benchmark"] == "query")
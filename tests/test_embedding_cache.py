@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from src.embedding_cache import EmbeddingCache
+from src.metrics import CACHE_OPERATIONS
+
+
+def _count(operation):
+    return CACHE_OPERATIONS.labels(operation=operation)._value.get()
+
+
+def test_hit_miss_and_normalized_key():
+    cache = EmbeddingCache("model-a", max_entries=10)
+    misses, hits = _count("miss"), _count("hit")
+    assert cache.get("Senior Python dev") is None
+    cache.put("Senior Python dev", np.ones(3))
+    np.testing.assert_array_equal(cache.get("  Senior   Python dev\n"), np.ones(3, dtype=np.float32))
+    assert _count("miss") == misses + 1
+    assert _count("hit") == hits + 1
+    assert EmbeddingCache("model-b").key("x") != cache.key("x")
+
+
+def test_lru_eviction():
+    cache = EmbeddingCache("model", max_entries=2)
+    cache.put("a", np.zeros(2))
+    cache.put("b", np.zeros(2))
+    cache.get("a")
+    cache.put("c", np.zeros(2))
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+
+
+def test_ttl_expiry(mocker):
+    clock = mocker.patch("src.embedding_cache.time.time", return_value=1000.0)
+    cache = EmbeddingCache("model", ttl_seconds=60)
+    cache.put("a", np.zeros(2))
+    clock.return_value = 1059.0
+    assert cache.get("a") is not None
+    clock.return_value = 1061.0
+    assert cache.get("a") is None
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    EmbeddingCache("model", disk_path=str(tmp_path)).put("query", np.arange(4))
+    restarted = EmbeddingCache("model", disk_path=str(tmp_path))
+    np.testing.assert_array_equal(restarted.get("query"), np.arange(4, dtype=np.float32))
+    assert len(restarted) == 1
+
+
+def test_disk_tier_is_bounded_lru(tmp_path):
+    cache = EmbeddingCache("model", max_entries=1, disk_path=str(tmp_path), disk_max_entries=2)
+    evictions = _count("evict")
+    cache.put("a", np.zeros(2))
+    cache.put("b", np.ones(2))
+    assert cache.get("a") is not None  # read back from disk, now the most recent
+    cache.put("c", np.ones(2))
+    assert len(list(tmp_path.rglob("*.npy"))) == 2
+    assert cache.get("b") is None
+    assert _count("evict") > evictions
+
+    restarted = EmbeddingCache("model", max_entries=1, disk_path=str(tmp_path), disk_max_entries=1)
+    # trimmed to the cap on start, keeping the newest file
+    assert [path.stem for path in tmp_path.rglob("*.npy")] == [cache.key("c")]
+    assert restarted.get("a") is None
+
+
+def test_disk_file_removed_by_another_worker_is_a_miss(tmp_path, mocker):
+    EmbeddingCache("model", disk_path=str(tmp_path)).put("query", np.arange(4))
+    restarted = EmbeddingCache("model", disk_path=str(tmp_path))
+    mocker.patch("src.embedding_cache.np.load", side_effect=FileNotFoundError)
+    misses = _count("miss")
+    assert restarted.get("query") is None
+    assert _count("miss") == misses + 1
@@ -1,6 +1,8 @@
 import pytest
 import numpy as np
-from src.embedding_manager import EmbeddingManager
+from benchmarks.bench_matching import FakeEmbeddingModel
+from src.embedding_cache import EmbeddingCache
+from src.embedding_manager import EmbeddingManager, calculate_pairwise_similarity
 
 @pytest.fixture
 def embedding_manager():
@@ -24,4 +26,41 @@ def test_generate_embedding_list_of_texts(embedding_manager):
 def test_generate_embedding_invalid_input(embedding_manager):
     invalid_input = 12345  # Not a string or list of strings
     with pytest.raises(TypeError):
-        embedding_manager.generate_embedding(invalid_input)
\ No newline at end of file
+        embedding_manager.generate_embedding(invalid_input)
+
+def test_calculate_pairwise_similarity_deduplicates_texts(fake_emb_mgr):
+    fake = fake_emb_mgr
+    jobs = ["job a", "job a", "job b"]
+    applicants = ["cv 1", "job a", "cv 1"]
+    sims = calculate_pairwise_similarity(jobs, applicants, emb_mgr=fake)
+    assert fake.encoded == ["job a", "job b", "cv 1"]
+    assert sims.shape == (3,)
+    v = {text: fake.vector(text) for text in fake.encoded}
+    np.testing.assert_allclose(sims, [v["job a"] @ v["cv 1"], 1.0, v["job b"] @ v["cv 1"]], rtol=1e-5)
+
+
+def test_calculate_pairwise_similarity_requires_aligned_lists(fake_emb_mgr):
+    with pytest.raises(ValueError):
+        calculate_pairwise_similarity(["a"], ["b", "c"], emb_mgr=fake_emb_mgr)
+
+
+def test_generate_embedding_serves_hits_and_encodes_misses_in_one_call(mocker):
+    emb_mgr = EmbeddingManager(model=FakeEmbeddingModel(dim=16))
+    emb_mgr.cache = EmbeddingCache(emb_mgr.model.model_name, max_entries=10)
+    encode = mocker.spy(emb_mgr.model, "encode")
+    expected = {t: emb_mgr.generate_embedding(t, use_cache=False) for t in ["sap fi", "java", "python", "sql"]}
+    encode.reset_mock()
+
+    np.testing.assert_array_equal(emb_mgr.generate_embedding("java"), expected["java"])
+    np.testing.assert_array_equal(emb_mgr.generate_embedding("java"), expected["java"])
+    assert encode.call_count == 1
+
+    texts = ["python", "java", "sap fi", "python", "sql"]
+    vecs = emb_mgr.generate_embedding(texts)
+    # "java" is cached; the misses are encoded together in a single call
+    assert encode.call_count == 2
+    assert encode.call_args.args[0] == ["python", "sap fi", "python", "sql"]
+    np.testing.assert_allclose(vecs, np.stack([expected[t] for t in texts]), rtol=1e-6)
+
+    assert emb_mgr.generate_embedding(texts[::-1]).tolist() == vecs[::-1].tolist()
+    assert encode.call_count == 2
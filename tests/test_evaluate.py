@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.evaluate import (calculate_ranking_metrics, find_top_applicants, ranking_metrics,
+                          relevance_matrix, retrieve_rankings)
+from src.indexer import FAISSIndexer
+
+
+@pytest.fixture
+def indexer(tmp_path):
+    config = {
+        "index": {"index_type": "flat", "k": 3},
+        "paths": {
+            "index_path": str(tmp_path / "faiss.index"),
+            "meta_path": str(tmp_path / "faiss_meta.arrow"),
+        },
+    }
+    return FAISSIndexer(config)
+
+
+def test_ranking_metrics_matches_hand_computed_values():
+    rel = np.array([[0, 1, 0], [1, 0, 0], [0, 0, 0], [0, 0, 0]], dtype=bool)
+    metrics = ranking_metrics(rel, np.array([2, 1, 1, 0]), ks=(1, 3))
+
+    np.testing.assert_allclose(metrics["recall@1"][:3], [0.0, 1.0, 0.0])
+    np.testing.assert_allclose(metrics["recall@3"][:3], [0.5, 1.0, 0.0])
+    np.testing.assert_allclose(metrics["mrr"][:3], [0.5, 1.0, 0.0])
+    gain = 1 / np.log2(3)
+    np.testing.assert_allclose(metrics["ndcg@3"][:3], [gain / (1 + gain), 1.0, 0.0])
+    # a job without positives is left out instead of counting as a miss
+    assert all(np.isnan(values[3]) for values in metrics.values())
+
+
+def test_ranking_metrics_treats_missing_ranks_as_misses():
+    metrics = ranking_metrics(np.array([[True]]), np.array([3]), ks=(5,))
+    assert metrics["recall@5"][0] == pytest.approx(1 / 3)
+    assert metrics["ndcg@5"][0] == pytest.approx(1 / (1 + 1 / np.log2(3) + 1 / np.log2(4)))
+
+
+def test_relevance_matrix_matches_ids_per_job():
+    labels = pd.DataFrame({
+        "prospects_id": ["10", "10", "10", "20", "30"],
+        "applicant_id": ["1", "2", "3", "1", "9"],
+        "hired": [1, 0, 1, 0, 1],
+    })
+    ranked = np.array([["3", "1", None], ["1", "2", None]], dtype=object)
+    rel, n_relevant = relevance_matrix(ranked, ["10", "20"], labels, "hired")
+    assert rel.tolist() == [[True, True, False], [False, False, False]]
+    # job 30 is not evaluated, so its positive is ignored
+    assert n_relevant.tolist() == [2, 0]
+
+
+def test_find_top_applicants_searches_all_jobs_at_once(indexer, fake_emb_mgr, mocker):
+    emb_mgr = fake_emb_mgr
+    texts = [f"applicant {i}" for i in range(6)]
+    indexer.add_embeddings(np.stack([emb_mgr.vector(t) for t in texts]),
+                           [{"source": "applicants", "applicants_id": i} for i in range(6)])
+    search = mocker.spy(indexer, "query_embeddings")
+
+    jobs = pd.DataFrame({"prospects_id": ["a", "b"], "text": ["job 2", "job 4"], "num_applicants": [1, 3]})
+    jobs, ranked = find_top_applicants(jobs, emb_mgr, indexer, ks=(2,))
+
+    assert emb_mgr.calls == [2]
+    assert search.call_count == 1
+    assert ranked.shape == (2, 3)
+    assert jobs["top_applicants_ids"].tolist()[0] == ["2"]
+    assert jobs["top_applicants_ids"].tolist()[1][0] == "4"
+    assert len(jobs["top_applicants_scores"].tolist()[1]) == 3
+
+    labels = pd.DataFrame({
+        "prospects_id": ["a", "a", "b"],
+        "applicant_id": ["2", "5", "0"],
+        "relevant": [1, 1, 1],
+        "hired": [1, 0, 0],
+    })
+    jobs = calculate_ranking_metrics(jobs, ranked, labels, ks=(2,))
+    assert jobs["hired_recall@2"].tolist()[0] == 1.0
+    assert jobs["hired_mrr"].tolist()[0] == 1.0
+    assert np.isnan(jobs["hired_mrr"].tolist()[1])
+    assert jobs["relevant_recall@2"].tolist()[0] == 0.5
+
+
+def test_retrieve_rankings_pads_rows_with_fewer_hits(indexer, fake_emb_mgr):
+    emb_mgr = fake_emb_mgr
+    indexer.add_embeddings(np.stack([emb_mgr.vector("applicant 1")]), [{"source": "applicants", "applicants_id": 1}])
+    ids, scores = retrieve_rankings(["job 1"], emb_mgr, indexer, 3)
+    assert ids.tolist() == [["1", None, None]]
+    assert np.isnan(scores[0, 1:]).all()
+
+
+def test_retrieve_rankings_applies_the_filters_found_in_each_text(indexer, fake_emb_mgr, mocker):
+    emb_mgr = fake_emb_mgr
+    texts = [f"applicant {i}" for i in range(4)]
+    indexer.add_embeddings(np.stack([emb_mgr.vector(t) for t in texts]),
+                           [{"source": "applicants", "applicants_id": i, "cidade": "Recife" if i % 2 else "Manaus"}
+                            for i in range(4)])
+    search = mocker.spy(indexer, "query_embeddings")
+    ids, _ = retrieve_rankings(["job em Recife 0", "job qualquer 0"], emb_mgr, indexer, 4)
+    assert search.call_args.kwargs["filters"] == [{"Recife": 1}, {}]
+    assert sorted(i for i in ids[0] if i is not None) == ["1", "3"]
+    assert sorted(ids[1]) == ["0", "1", "2", "3"]
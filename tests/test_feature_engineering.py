@@ -18,6 +18,29 @@ def test_combine_columns():
     ]
     assert result['text'].tolist() == expected_text
 
+def test_combine_columns_formats_cells_like_the_row_wise_version():
+    df = pd.DataFrame({
+        'anos': [3, None, 5],
+        'salario': [1500.5, 2000.0, None],
+    })
+    result = combine_columns(df, ['anos', 'salario'])
+    # the rows of an all-numeric selection are float, so ints print as "3.0"
+    assert result['text'].tolist() == ['anos: 3.0 salario: 1500.5', 'salario: 2000.0', 'anos: 5.0']
+
+
+def test_combine_columns_in_chunks():
+    df = pd.DataFrame({
+        'col1': ['a', None, 'c', 'd', None],
+        'col2': ['e', 'f', None, 'h', None],
+    })
+    chunks = list(combine_columns(df, ['col1', 'col2'], chunk_size=2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert [text for chunk in chunks for text in chunk['text']] == \
+        combine_columns(df.copy(), ['col1', 'col2'])['text'].tolist()
+    assert chunks[2].index.tolist() == [4]
+    assert chunks[2]['text'].tolist() == ['']
+
+
 def test_filter_columns():
     data = {
         'col1': [1, 2, 3],
@@ -0,0 +1,49 @@
+import json
+
+import numpy as np
+import pytest
+import yaml
+from src.index_evaluation import load_index_vectors, main
+from src.indexer import FAISSIndexer
+
+
+def _random_vectors(n, dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    vecs = rng.normal(size=(n, dim)).astype(np.float32)
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def saved_index(tmp_path):
+    def build(index_type):
+        config = {
+            "index": {"index_type": index_type, "nlist": 4, "pq_m": 4},
+            "paths": {"index_path": str(tmp_path / "faiss.index"), "meta_path": str(tmp_path / "faiss_meta.arrow")},
+        }
+        vecs = _random_vectors(300)
+        indexer = FAISSIndexer(config)
+        with indexer.bulk_ingest():
+            indexer.add_embeddings(vecs, [{"source": "applicants" if i < 290 else "vagas"} for i in range(300)])
+            indexer.remove_ids([0, 1])
+        config_path = tmp_path / "index_config.yaml"
+        config_path.write_text(yaml.safe_dump(config))
+        return config, str(config_path), vecs
+    return build
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw", "ivf_flat"])
+def test_load_index_vectors_skips_removed_and_other_sources(saved_index, index_type):
+    config, _, vecs = saved_index(index_type)
+    loaded = load_index_vectors(config["paths"]["index_path"], config["paths"]["meta_path"])
+    np.testing.assert_allclose(loaded, vecs[2:290], atol=1e-6)
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw", "ivf_flat"])
+def test_report_runs_on_an_index_written_by_the_indexer(saved_index, index_type, tmp_path, capsys):
+    _, config_path, _ = saved_index(index_type)
+    output = tmp_path / "report.json"
+    main(["--config", config_path, "--queries", "20", "--k", "5", "--output", str(output)])
+    report = json.loads(output.read_text())
+    assert report[0]["index_type"] == "flat" and report[0]["recall@5"] == 1.0
+    assert all(0.0 <= row["recall@5"] <= 1.0 for row in report)
+    assert "recall@5" in capsys.readouterr().out
@@ -0,0 +1,332 @@
+import os
+import faiss
+import numpy as np
+import pandas as pd
+import pytest
+from src.indexer import FAISSIndexer, add_entity_embeddings_to_faiss, sync_entity_embeddings
+
+
+@pytest.fixture
+def index_config(tmp_path):
+    return {
+        "index": {"index_type": "flat", "k": 3},
+        "paths": {
+            "index_path": str(tmp_path / "faiss.index"),
+            "meta_path": str(tmp_path / "faiss_meta.arrow"),
+        },
+    }
+
+
+def _random_vectors(n, dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    vecs = rng.normal(size=(n, dim)).astype(np.float32)
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+def test_add_embeddings_keeps_per_row_metadata(index_config):
+    indexer = FAISSIndexer(index_config)
+    metadatas = [{"source": "applicants", "idx": i} for i in range(4)]
+    ids = indexer.add_embeddings(_random_vectors(4), metadatas)
+    assert ids.tolist() == [0, 1, 2, 3]
+    assert [indexer.metadata[i]["idx"] for i in range(4)] == [0, 1, 2, 3]
+    assert indexer.index.ntotal == 4
+
+
+def test_bulk_ingest_flushes_once_at_exit(index_config, mocker):
+    indexer = FAISSIndexer(index_config)
+    save = mocker.spy(indexer, "_save")
+    vecs = _random_vectors(10)
+    with indexer.bulk_ingest():
+        for i in range(10):
+            indexer.add_embedding(vecs[i], metadata={"source": "applicants", "idx": i})
+        assert save.call_count == 0
+        assert not os.path.exists(index_config["paths"]["index_path"])
+    assert save.call_count == 1
+
+    reloaded = FAISSIndexer(index_config)
+    assert reloaded.index.ntotal == 10
+    assert reloaded.next_id == 10
+    assert reloaded.metadata[7]["idx"] == 7
+
+
+def test_bulk_ingest_checkpoints(index_config, mocker):
+    indexer = FAISSIndexer(index_config)
+    save = mocker.spy(indexer, "_save")
+    with indexer.bulk_ingest(checkpoint_every=4):
+        for _ in range(10):
+            indexer.add_embedding(_random_vectors(1)[0])
+    # checkpoints after rows 4 and 8, final flush for the remaining 2
+    assert save.call_count == 3
+
+
+def test_add_entity_embeddings_to_faiss_encodes_in_chunks(index_config, fake_emb_mgr):
+    df = pd.DataFrame({"applicants_id": ["10", "11", "12", "13", "14"], "text": list("abcde")})
+    indexer = FAISSIndexer(index_config)
+    emb_mgr = fake_emb_mgr
+    throughput = add_entity_embeddings_to_faiss(df, emb_mgr, indexer)
+    assert emb_mgr.calls == [3, 2]
+    assert throughput > 0
+    assert indexer.index.ntotal == 5
+    assert indexer.metadata[4] == {"applicants_id": "14", "text": "e", "source": "applicants", "idx": 4}
+
+
+def test_query_embedding_filters_source_without_mutating_index(index_config):
+    indexer = FAISSIndexer(index_config)
+    vecs = _random_vectors(6)
+    sources = ["applicants", "vagas"] * 3
+    indexer.add_embeddings(vecs, [{"source": src, "idx": i} for i, src in enumerate(sources)])
+
+    for _ in range(2):
+        results = indexer.query_embedding(vecs[1], k=3)
+        assert {r["id"] for r in results} == {0, 2, 4}
+        assert indexer.index.ntotal == 6
+
+    results = indexer.query_embedding(vecs[1], k=1, source="vagas")
+    assert results[0]["id"] == 1
+    assert indexer.query_embedding(vecs[1], k=3, source="unknown") == []
+
+
+@pytest.mark.parametrize("index_type", ["ivf_flat", "ivf_pq", "hnsw"])
+def test_ann_backends_train_and_search(index_config, index_type):
+    index_config["index"].update({
+        "index_type": index_type, "nlist": 4, "nprobe": 4, "pq_m": 8, "pq_nbits": 8, "ef_search": 32,
+    })
+    indexer = FAISSIndexer(index_config)
+    vecs = _random_vectors(300, dim=16)
+    with indexer.bulk_ingest():
+        for start in range(0, 300, 100):
+            indexer.add_embeddings(vecs[start:start + 100], [{"source": "applicants"}] * 100)
+        # IVF vectors stay buffered until the block ends and the index can be trained
+        assert (indexer.index is None) == (index_type != "hnsw")
+    assert indexer.index.ntotal == 300
+
+    results = indexer.query_embedding(vecs[42], k=3)
+    assert results[0]["id"] == 42
+
+    reloaded = FAISSIndexer(index_config)
+    assert type(reloaded._base_index()) is type(indexer._base_index())
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat", "hnsw"])
+def test_mmap_index_is_read_only_until_written(index_config, index_type):
+    index_config["index"].update({"index_type": index_type, "nlist": 2, "nprobe": 2, "mmap": True})
+    vecs = _random_vectors(200, dim=16)
+    FAISSIndexer(index_config).add_embeddings(vecs[:100], [{"source": "applicants"}] * 100)
+
+    reader = FAISSIndexer(index_config)
+    assert reader._mmapped
+    assert reader.query_embedding(vecs[7], k=1)[0]["id"] == 7
+
+    # inserting swaps in a private in-memory copy instead of writing into the mapping
+    reader.add_embeddings(vecs[100:], [{"source": "applicants"}] * 100)
+    assert not reader._mmapped
+    assert reader.index.ntotal == 200
+    assert FAISSIndexer(index_config).query_embedding(vecs[150], k=1)[0]["id"] == 150
+
+
+def test_mmap_falls_back_to_a_normal_read_without_the_faiss_flag(index_config, monkeypatch):
+    index_config["index"]["mmap"] = True
+    vecs = _random_vectors(10)
+    FAISSIndexer(index_config).add_embeddings(vecs, [{"source": "applicants"}] * 10)
+    monkeypatch.delattr(faiss, "IO_FLAG_MMAP_IFC")
+    reader = FAISSIndexer(index_config)
+    assert not reader._mmapped
+    assert reader.query_embedding(vecs[3], k=1)[0]["id"] == 3
+
+
+@pytest.mark.parametrize("index_type", ["ivf_flat", "ivf_pq"])
+def test_ivf_waits_for_enough_vectors_outside_bulk_ingest(index_config, index_type):
+    index_config["index"].update({"index_type": index_type, "nlist": 4, "nprobe": 4, "pq_m": 4})
+    vecs = _random_vectors(300)
+    indexer = FAISSIndexer(index_config)
+    for i in range(5):
+        indexer.add_embedding(vecs[i], {"source": "applicants"})
+    # too few to train 4 lists: buffered (and saved) instead of training a 1-list index
+    assert indexer.index is None
+    reloaded = FAISSIndexer(index_config)
+    assert reloaded.query_embedding(vecs[0], k=1) == []
+
+    reloaded.add_embeddings(vecs[5:], [{"source": "applicants"}] * 295)
+    assert faiss.downcast_index(reloaded.index.index).nlist == 4
+    assert FAISSIndexer(index_config).query_embedding(vecs[2], k=1)[0]["id"] == 2
+    assert not os.path.exists(reloaded.train_buffer_path)
+
+
+def test_explicit_train_rejects_too_few_vectors_for_pq(index_config):
+    index_config["index"].update({"index_type": "ivf_pq", "nlist": 4, "pq_m": 4})
+    indexer = FAISSIndexer(index_config)
+    indexer.add_embeddings(_random_vectors(5), [{"source": "applicants"}] * 5)
+    with pytest.raises(ValueError, match="at least 256"):
+        indexer.train()
+
+    index_config["index"]["index_type"] = "ivf_flat"
+    indexer = FAISSIndexer(index_config)
+    indexer.add_embeddings(_random_vectors(5), [{"source": "applicants"}] * 5)
+    indexer.train()
+    assert FAISSIndexer(index_config).query_embedding(_random_vectors(5)[3], k=1)[0]["id"] == 3
+
+
+def test_unknown_index_type_is_rejected(index_config):
+    index_config["index"]["index_type"] = "lsh"
+    with pytest.raises(ValueError):
+        FAISSIndexer(index_config).add_embeddings(_random_vectors(2))
+
+
+def test_query_embedding_pushes_filters_into_search(index_config):
+    indexer = FAISSIndexer(index_config)
+    vecs = _random_vectors(40)
+    levels = ["Junior", "Pleno", "Senior", None]
+    metadatas = [
+        {"source": "applicants", "idx": i, "nivel_profissional": levels[i % 4],
+         "nivel_ingles": "Avançado" if i % 2 else "", "cidade": "Recife" if i < 10 else "Manaus"}
+        for i in range(40)
+    ]
+    indexer.add_embeddings(vecs, metadatas)
+
+    results = indexer.query_embedding(vecs[0], k=5, filters={"Pleno": 1, "nivel_ingles": 1, "Recife": 1})
+    assert sorted(r["id"] for r in results) == [1, 5, 9]
+    results = indexer.query_embedding(vecs[0], k=3, filters={"nivel_ingles": 0, "Manaus": 1})
+    assert len(results) == 3
+    assert all(r["id"] % 2 == 0 and r["id"] >= 10 for r in results)
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat", "hnsw"])
+@pytest.mark.parametrize("exact_scan_max", [0, 10000])
+def test_filtered_search_returns_k_matches_without_fallback(index_config, index_type, exact_scan_max):
+    index_config["index"].update({
+        "index_type": index_type, "nlist": 16, "nprobe": 1, "ef_search": 8,
+        "exact_scan_max": exact_scan_max, "min_selectivity": 0.0,
+    })
+    indexer = FAISSIndexer(index_config)
+    vecs = _random_vectors(2000, dim=16)
+    metadatas = [{"source": "applicants", "nivel_profissional": "Senior" if i % 50 == 0 else "Junior"}
+                 for i in range(2000)]
+    indexer.add_embeddings(vecs, metadatas)
+
+    results = indexer.query_embedding(vecs[1], k=10, filters={"Senior": 1}, search_k=10)
+    assert len(results) == 10
+    assert all(r["id"] % 50 == 0 for r in results)
+    # every match is found, and the ranking is the exact one among them
+    senior = np.arange(0, 2000, 50)
+    expected = senior[np.argsort(-(vecs[senior] @ vecs[1]))[:10]]
+    if index_type == "flat" or exact_scan_max:
+        assert [r["id"] for r in results] == expected.tolist()
+
+    assert indexer.query_embedding(vecs[1], k=10, filters={"Pleno": 1}) == []
+
+
+def test_query_embeddings_matches_single_queries(index_config):
+    indexer = FAISSIndexer(index_config)
+    vecs = _random_vectors(30)
+    indexer.add_embeddings(vecs, [{"source": "applicants", "nivel_profissional": ["Junior", "Senior"][i % 2]}
+                                  for i in range(30)])
+    queries = vecs[:4]
+    ks = [1, 2, 3, 4]
+    filters = [None, {"Senior": 1}, {"Junior": 1}, {"Senior": 1}]
+    batched = indexer.query_embeddings(queries, k=ks, filters=filters)
+    single = [indexer.query_embedding(q, k=k, filters=f) for q, k, f in zip(queries, ks, filters)]
+    assert [[r["id"] for r in rows] for rows in batched] == [[r["id"] for r in rows] for rows in single]
+    assert [len(rows) for rows in batched] == ks
+
+
+def _applicants(rows):
+    return pd.DataFrame(rows, columns=["applicants_id", "local", "text"])
+
+
+def test_sync_embeds_only_the_delta_and_keeps_ids_on_flat(index_config, fake_emb_mgr):
+    emb_mgr = fake_emb_mgr
+    df = _applicants([("1", "Recife", "python"), ("2", "Recife", "java"), ("3", "Manaus", "sql")])
+    stats = sync_entity_embeddings(df, emb_mgr, FAISSIndexer(index_config))
+    assert stats["added"] == 3
+
+    # rerunning on the same data embeds nothing and duplicates nothing
+    indexer = FAISSIndexer(index_config)
+    emb_mgr.encoded = []
+    stats = sync_entity_embeddings(df, emb_mgr, indexer)
+    assert emb_mgr.encoded == []
+    assert stats["unchanged"] == 3
+    assert indexer.index.ntotal == 3
+    ids = {indexer.metadata[i]["applicants_id"]: i for i in range(3)}
+
+    # "2" changes text, "3" only moves city, "1" is gone, "4" is new
+    df = _applicants([("3", "Recife", "sql"), ("2", "Recife", "golang"), ("4", "Manaus", "rust")])
+    stats = sync_entity_embeddings(df, emb_mgr, indexer)
+    assert sorted(emb_mgr.encoded) == ["golang", "rust"]
+    assert stats == {"added": 1, "updated": 1, "metadata_updated": 1, "removed": 1, "unchanged": 0}
+
+    reloaded = FAISSIndexer(index_config)
+    assert reloaded.index.ntotal == 3
+    hit = reloaded.query_embedding(emb_mgr.vector("golang"), k=1)[0]
+    assert hit["id"] == ids["2"]
+    assert hit["metadata"]["text"] == "golang" and hit["metadata"]["idx"] == 1
+    found = {h["metadata"]["applicants_id"] for h in reloaded.query_embedding(emb_mgr.vector("sql"), k=5, source=None)}
+    assert found == {"2", "3", "4"}
+    recife = {h["metadata"]["applicants_id"] for h in reloaded.query_embedding(emb_mgr.vector("sql"), k=5,
+                                                                              filters={"Recife": 1})}
+    assert recife == {"2", "3"}
+
+
+@pytest.mark.parametrize("index_type", ["hnsw", "ivf_flat"])
+def test_sync_keeps_ids_on_approximate_backends(index_config, fake_emb_mgr, index_type):
+    index_config["index"].update({"index_type": index_type, "ef_search": 32, "nlist": 1, "train_sample_size": 2})
+    emb_mgr = fake_emb_mgr
+    indexer = FAISSIndexer(index_config)
+    sync_entity_embeddings(_applicants([("1", "Recife", "python"), ("2", "Recife", "java")]), emb_mgr, indexer)
+    sync_entity_embeddings(_applicants([("2", "Recife", "kotlin")]), emb_mgr, indexer)
+    sync_entity_embeddings(_applicants([("2", "Recife", "scala")]), emb_mgr, indexer)
+
+    reloaded = FAISSIndexer(index_config)
+    # the changed text is stored under its old id; only the removed "1" stays as an unreachable tombstone
+    assert reloaded.index.ntotal == 2
+    hits = reloaded.query_embedding(emb_mgr.vector("scala"), k=5, source=None)
+    assert [(h["id"], h["metadata"]["text"]) for h in hits] == [(1, "scala")]
+    assert hits[0]["score"] == pytest.approx(1.0, abs=1e-5)
+    assert reloaded.next_id == 2
+
+
+def test_sync_cleans_up_an_index_built_by_repeated_full_runs(index_config, fake_emb_mgr):
+    df = _applicants([("1", "Recife", "python"), ("2", "Recife", "java")])
+    indexer = FAISSIndexer(index_config)
+    add_entity_embeddings_to_faiss(df, fake_emb_mgr, indexer)
+    add_entity_embeddings_to_faiss(df, fake_emb_mgr, indexer)
+    assert indexer.index.ntotal == 4
+
+    stats = sync_entity_embeddings(df, fake_emb_mgr, indexer)
+    # legacy rows have no text_hash: re-embedded once, duplicates dropped
+    assert stats["updated"] == 2 and stats["removed"] == 2
+    assert indexer.index.ntotal == 2
+    assert sorted(indexer.metadata[i]["applicants_id"] for i in (0, 1)) == ["1", "2"]
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw", "ivf_flat"])
+@pytest.mark.parametrize("precision,compression", [("float16", 2.0), ("int8", 4.0)])
+def test_reduced_precision_index_reports_memory_and_recall(index_config, index_type, precision, compression):
+    index_config["index"].update(index_type=index_type, precision=precision, nlist=4)
+    vecs = _random_vectors(500, dim=16)
+    indexer = FAISSIndexer(index_config)
+    with indexer.bulk_ingest():
+        indexer.add_embeddings(vecs, [{"source": "applicants", "idx": i} for i in range(500)])
+    assert indexer.query_embedding(vecs[3], k=1)[0]["id"] == 3
+
+    report = indexer.precision_report(k=5, n_queries=50)
+    assert report["compression"] == compression
+    assert report["memory_saved_bytes"] == report["float32_vector_bytes"] - report["vector_bytes"] > 0
+    assert report["sample_index_bytes"] < report["sample_float32_index_bytes"]
+    assert report["recall_change"] == pytest.approx(report["recall@5"] - report["float32_recall@5"], abs=1e-4)
+    assert report["recall@5"] > 0.8
+
+
+def test_reduced_precision_flat_index_deletes_and_maps(index_config):
+    index_config["index"].update(precision="int8", mmap=True)
+    vecs = _random_vectors(50)
+    indexer = FAISSIndexer(index_config)
+    indexer.add_embeddings(vecs, [{"source": "applicants"}] * 50)
+    indexer.remove_ids([0])
+    assert indexer.index.ntotal == 49
+
+    reloaded = FAISSIndexer(index_config)
+    assert reloaded._mmapped
+    assert reloaded.query_embedding(vecs[1], k=1)[0]["id"] == 1
+    # nothing was added by this instance, so there is no float32 sample to compare with
+    assert reloaded.precision_report() is None
+    assert FAISSIndexer({**index_config, "index": {"precision": "float32"}}).precision_report() is None
@@ -0,0 +1,145 @@
+import threading
+
+import numpy as np
+import pytest
+from src.indexer import FAISSIndexer
+from src.lexical_index import BM25Index, fuse_scores, tokenize
+
+TEXTS = [
+    "Consultor SAP FI CO com certificação",
+    "Desenvolvedor Java Spring",
+    "Analista de dados Python",
+    "Consultor SAP MM",
+    "Desenvolvedor C++ e C#",
+]
+
+
+def test_tokenize_strips_accents_and_keeps_language_names():
+    assert tokenize("Certificação em C++, C# e SAP/FI") == ["certificacao", "em", "c++", "c#", "e", "sap", "fi"]
+    assert tokenize(None) == []
+
+
+def test_bm25_ranks_exact_terms_first():
+    index = BM25Index()
+    index.add(range(len(TEXTS)), TEXTS)
+    scores, ids = index.top_k(["consultor sap fi"], k=3)[0]
+    assert ids.tolist() == [0, 3]
+    assert scores[0] > scores[1] > 0
+    # a query sharing no term with any text has no hits
+    assert index.top_k(["kubernetes"], k=3)[0][1].tolist() == []
+
+
+def test_bm25_mask_add_remove_and_replace():
+    index = BM25Index()
+    index.add(range(len(TEXTS)), TEXTS)
+    mask = np.ones(len(TEXTS), dtype=bool)
+    mask[0] = False
+    assert index.top_k(["sap"], k=5, mask=mask)[0][1].tolist() == [3]
+
+    index.remove([3])
+    index.add([0], ["Desenvolvedor Python"])
+    assert index.top_k(["sap"], k=5)[0][1].tolist() == []
+    assert sorted(index.top_k(["python"], k=5)[0][1].tolist()) == [0, 2]
+    index.add([10], ["SAP"])
+    assert index.top_k(["sap"], k=5)[0][1].tolist() == [10]
+    assert len(index) == 5
+
+
+def test_bm25_save_and_load(tmp_path):
+    path = str(tmp_path / "bm25.npz")
+    index = BM25Index()
+    index.add(range(len(TEXTS)), TEXTS)
+    index.save(path)
+    loaded = BM25Index(path)
+    expected, got = index.top_k(["sap java"], k=5)[0], loaded.top_k(["sap java"], k=5)[0]
+    np.testing.assert_allclose(got[0], expected[0])
+    assert got[1].tolist() == expected[1].tolist()
+
+
+def test_fuse_scores_bounds_missing_scores():
+    dense = (np.array([0.9, 0.8]), np.array([1, 2]))
+    lexical = (np.array([4.0, 2.0]), np.array([3, 2]))
+    scores, ids, dense_scores, lexical_scores = fuse_scores(*dense, *lexical, weight=0.5, pool=2, k=3)
+    # both lists are full, so a missing score is bounded by that list's lowest one
+    assert ids.tolist() == [3, 1, 2]
+    np.testing.assert_allclose(dense_scores, [0.8, 0.9, 0.8])
+    np.testing.assert_allclose(lexical_scores, [4.0, 2.0, 2.0])
+    np.testing.assert_allclose(scores, [0.9, 0.7, 0.65], rtol=1e-6)
+
+
+@pytest.fixture
+def hybrid_indexer(tmp_path):
+    config = {
+        "index": {"index_type": "flat", "k": 2},
+        "paths": {"index_path": str(tmp_path / "faiss.index"), "meta_path": str(tmp_path / "faiss_meta.arrow")},
+        "lexical": {"enabled": True, "weight": 0.5, "candidates": 5},
+    }
+    indexer = FAISSIndexer(config)
+    # every vector is equally close to the query: only the text can separate them
+    indexer.add_embeddings(np.ones((len(TEXTS), 4), dtype=np.float32) / 2,
+                           [{"source": "applicants", "text": text, "nivel_ingles": int(i != 3)}
+                            for i, text in enumerate(TEXTS)])
+    return config, indexer
+
+
+def test_query_embeddings_fuses_lexical_scores(hybrid_indexer):
+    config, indexer = hybrid_indexer
+    query = np.ones(4, dtype=np.float32) / 2
+    hits = indexer.query_embedding(query, k=2, text="consultor sap")
+    # the shorter text matching both terms wins
+    assert [hit["id"] for hit in hits] == [3, 0]
+    assert hits[0]["score"] == pytest.approx(0.5 + 0.5)
+    assert hits[0]["dense_score"] == pytest.approx(1.0) and hits[0]["lexical_score"] > 0
+    # without the text only the dense score is used
+    assert "lexical_score" not in indexer.query_embedding(query, k=2)[0]
+    # filters restrict the lexical side too
+    assert [hit["id"] for hit in indexer.query_embedding(query, k=1, text="sap", filters={"nivel_ingles": 1})] == [0]
+
+
+def test_lexical_index_follows_updates_and_persists(hybrid_indexer):
+    config, indexer = hybrid_indexer
+    indexer.remove_ids([0])
+    indexer.update_metadata([1], [{"source": "applicants", "text": "Consultor SAP SD"}])
+    assert sorted(hit["id"] for hit in indexer.query_lexical(["sap"], k=5)[0]) == [1, 3]
+
+    reloaded = FAISSIndexer(config)
+    assert sorted(hit["id"] for hit in reloaded.query_lexical(["sap"], k=5)[0]) == [1, 3]
+
+
+def test_lexical_index_is_rebuilt_from_metadata(tmp_path):
+    config = {
+        "index": {"index_type": "flat"},
+        "paths": {"index_path": str(tmp_path / "faiss.index"), "meta_path": str(tmp_path / "faiss_meta.arrow")},
+    }
+    FAISSIndexer(config).add_embeddings(np.eye(2, dtype=np.float32),
+                                        [{"source": "applicants", "text": text} for text in TEXTS[:2]])
+    indexer = FAISSIndexer({**config, "lexical": {"enabled": True}})
+    assert [hit["id"] for hit in indexer.query_lexical(["java"])[0]] == [1]
+    # the rebuilt index is written once, so the next load reads it instead of rebuilding
+    assert (tmp_path / "bm25.npz").exists()
+    reloaded = FAISSIndexer({**config, "lexical": {"enabled": True}})
+    assert reloaded.lexical._weights is not None
+    assert [hit["id"] for hit in reloaded.query_lexical(["java"])[0]] == [1]
+
+
+def test_bm25_weights_are_computed_off_the_query_path(hybrid_indexer, mocker):
+    config, indexer = hybrid_indexer
+    rebuild = mocker.spy(indexer.lexical, "_merge")
+    indexer.add_embeddings(np.ones((1, 4), dtype=np.float32) / 2, [{"source": "applicants", "text": "SAP SD"}])
+    calls = rebuild.call_count
+    assert indexer.lexical._weights is not None
+    indexer.query_lexical(["sap"], k=5)
+    assert rebuild.call_count == calls
+
+
+def test_bm25_concurrent_queries_share_one_rebuild():
+    index = BM25Index()
+    index.add(range(len(TEXTS)), TEXTS)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(index.top_k(["sap"], k=5)[0][1].tolist()))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 8 and all(sorted(r) == [0, 3] for r in results)
@@ -0,0 +1,105 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from src.indexer import FAISSIndexer
+from src.metadata_store import MetadataStore
+
+
+def test_rows_roundtrip_through_the_arrow_file(tmp_path):
+    path = str(tmp_path / "meta.arrow")
+    store = MetadataStore(path)
+    store.add([0, 1, 2], [{"nome": "Ana", "idx": 0}, {"nome": "Bia", "idx": 1, "local": "Recife"}, None])
+    store.save()
+
+    reloaded = MetadataStore(path)
+    assert len(reloaded) == 3
+    assert reloaded.max_id() == 2
+    assert reloaded[1] == {"nome": "Bia", "idx": 1, "local": "Recife"}
+    # missing keys are not materialized as None
+    assert reloaded[0] == {"nome": "Ana", "idx": 0}
+    assert reloaded[2] == {}
+    assert reloaded.get(5) is None
+    assert reloaded.get_many([2, 7, 0]) == [{}, None, {"nome": "Ana", "idx": 0}]
+
+
+def test_staged_rows_replace_stored_ones(tmp_path):
+    store = MetadataStore(str(tmp_path / "meta.arrow"))
+    store.add([0, 1], [{"nome": "Ana"}, {"nome": "Bia"}])
+    store.save()
+    store.add([1, 2], [{"nome": "Bea"}, {"nome": "Caio"}])
+    assert len(store) == 3
+
+    ids, columns = store.columns(["nome"])
+    assert dict(zip(ids.tolist(), columns["nome"])) == {0: "Ana", 1: "Bea", 2: "Caio"}
+    store.save()
+    assert [store[i]["nome"] for i in range(3)] == ["Ana", "Bea", "Caio"]
+
+
+def test_legacy_pickle_is_migrated(tmp_path):
+    legacy = {i: {"source": "applicants", "idx": i, "nivel_profissional": "Senior" if i % 2 else "Junior"}
+              for i in range(4)}
+    with open(tmp_path / "faiss_meta.pkl", "wb") as f:
+        pickle.dump({"metadata": legacy}, f)
+    config = {
+        "index": {"index_type": "flat", "k": 4},
+        "paths": {"index_path": str(tmp_path / "faiss.index"), "meta_path": str(tmp_path / "faiss_meta.arrow")},
+    }
+
+    indexer = FAISSIndexer(config)
+    assert indexer.next_id == 4
+    assert indexer.metadata[3] == legacy[3]
+    vec = np.ones((1, 8), dtype=np.float32) / np.sqrt(8)
+    indexer.add_embeddings(np.repeat(vec, 5, axis=0), [dict(legacy[i]) for i in range(4)] + [{"source": "applicants"}])
+
+    reloaded = FAISSIndexer(config)
+    assert reloaded.metadata[8] == {"source": "applicants"}
+    hits = reloaded.query_embedding(vec[0], k=10, filters={"Senior": 1})
+    assert sorted(hit["id"] for hit in hits) == [5, 7]
+
+
+def test_removed_rows_disappear_and_their_ids_are_not_reused(tmp_path):
+    path = str(tmp_path / "meta.arrow")
+    store = MetadataStore(path)
+    store.add([0, 1, 2], [{"nome": "Ana"}, {"nome": "Bia"}, {"nome": "Caio"}])
+    store.save()
+    store.remove([2, 9])
+    assert store.get(2) is None
+    assert len(store) == 2
+    assert store.columns(["nome"])[0].tolist() == [0, 1]
+    store.save()
+
+    reloaded = MetadataStore(path)
+    assert len(reloaded) == 2
+    assert reloaded.max_id() == 2
+
+
+def test_dataframe_records_with_missing_values_are_saved(tmp_path):
+    df = pd.DataFrame({
+        "nivel_profissional": [np.nan, "Senior", None],
+        "mixed": [1, "um", np.nan],
+        "idx": [0, 1, 2],
+    })
+    store = MetadataStore(str(tmp_path / "meta.arrow"))
+    store.add([0, 1, 2], df.to_dict("records"))
+    store.save()
+
+    reloaded = MetadataStore(str(tmp_path / "meta.arrow"))
+    assert reloaded[0] == {"mixed": "1", "idx": 0}
+    assert reloaded[1] == {"nivel_profissional": "Senior", "mixed": "um", "idx": 1}
+    assert reloaded[2] == {"idx": 2}
+
+
+def test_column_types_may_change_between_saves(tmp_path):
+    path = str(tmp_path / "meta.arrow")
+    store = MetadataStore(path)
+    store.add([0, 1], [{"code": "A1", "score": 1}, {"code": "B2", "score": 2}])
+    store.save()
+    # int rows in a stored string column are cast to it; text in an int column turns both into strings
+    store.add([2, 3], [{"code": 7, "score": 3}, {"code": None, "score": "n/a"}])
+    store.save()
+
+    reloaded = MetadataStore(path)
+    assert reloaded.get_many([0, 2, 3]) == [{"code": "A1", "score": "1"}, {"code": "7", "score": "3"},
+                                            {"score": "n/a"}]
@@ -0,0 +1,146 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+from prometheus_client import REGISTRY
+from src.embedding_cache import EmbeddingCache
+from src.indexer import FAISSIndexer
+from src.metrics import (REQUESTS_TOTAL, SystemMetricsSampler, build_metrics_summary, format_server_timing,
+                         metrics_summary, read_rss_bytes, stage_trace, track_endpoint_metrics, track_stage,
+                         update_system_metrics)
+
+
+@pytest.fixture
+def indexer(tmp_path):
+    return FAISSIndexer({"index": {"index_type": "flat", "k": 2}, "paths": {
+        "index_path": str(tmp_path / "faiss.index"), "meta_path": str(tmp_path / "faiss_meta.arrow")}})
+
+
+def _count(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_track_stage_observes_histogram_and_active_trace():
+    before = _count("job_matching_stage_duration_seconds_count", stage="encoding")
+    with stage_trace() as trace:
+        with track_stage("encoding"):
+            pass
+        with track_stage("encoding"):
+            pass
+    # outside a trace only the histogram is updated
+    with track_stage("encoding"):
+        pass
+
+    assert _count("job_matching_stage_duration_seconds_count", stage="encoding") == before + 3
+    assert list(trace) == ["encoding"] and trace["encoding"] >= 0
+
+
+def test_indexer_search_feeds_faiss_histogram(indexer):
+    vecs = np.eye(4, dtype=np.float32)
+    indexer.add_embeddings(vecs, [{"source": "applicants", "idx": i} for i in range(4)])
+    before = _count("job_matching_faiss_search_duration_seconds_count")
+
+    with stage_trace() as trace:
+        indexer.query_embedding(vecs[0], k=2)
+
+    assert _count("job_matching_faiss_search_duration_seconds_count") == before + 1
+    assert set(trace) == {"faiss_search", "metadata"}
+
+
+def test_format_server_timing():
+    assert format_server_timing({"encoding": 0.0015, "faiss_search": 0.0002}) == \
+        "encoding;dur=1.500, faiss_search;dur=0.200"
+
+
+def test_update_system_metrics_reports_memory_and_active_candidates(indexer):
+    indexer.add_embeddings(np.eye(4, dtype=np.float32), [{"source": "applicants", "idx": i} for i in range(4)])
+    indexer.add_embeddings(np.eye(4, dtype=np.float32)[:1], [{"source": "jobs", "idx": 0}])
+    indexer.remove_ids([1])
+
+    class EmbeddingManager:
+        cache = EmbeddingCache("model", max_entries=4)
+    EmbeddingManager.cache.put("python", np.ones(8, dtype=np.float32))
+
+    update_system_metrics(indexer, EmbeddingManager())
+
+    memory = "job_matching_memory_usage_bytes"
+    if read_rss_bytes() is not None:
+        assert REGISTRY.get_sample_value(memory, {"component": "application"}) > 1024 * 1024
+    assert REGISTRY.get_sample_value(memory, {"component": "faiss_index"}) == indexer.nbytes > 4 * 4 * 4
+    assert REGISTRY.get_sample_value(memory, {"component": "metadata"}) == indexer.metadata.nbytes > 0
+    assert REGISTRY.get_sample_value(memory, {"component": "embedding_cache"}) == 32
+    # only live applicants: the jobs vector and the removed id are not candidates
+    assert REGISTRY.get_sample_value("job_matching_active_candidates") == 3
+
+
+def test_rss_is_read_from_proc():
+    rss = read_rss_bytes()
+    assert rss is None or rss > 1024 * 1024
+
+
+def test_sampler_runs_in_background_until_stopped():
+    calls = threading.Event()
+    sampler = SystemMetricsSampler(calls.set, interval=60)
+    sampler.start()
+    assert calls.wait(5)
+    sampler.stop()
+    assert sampler._thread is None
+
+
+def test_metrics_summary_is_built_from_collectors_and_cached():
+    first = metrics_summary(ttl_seconds=60)
+    REQUESTS_TOTAL.labels(endpoint="predict", method="POST", status_code="200").inc()
+
+    assert metrics_summary(ttl_seconds=60) is first
+    fresh = build_metrics_summary()
+    assert fresh["requests"]["total_requests"] == first["requests"]["total_requests"] + 1
+    assert fresh["requests"]["by_endpoint"]["predict"] >= 1
+
+
+WORKER = """
+from src.metrics import REQUESTS_TOTAL
+REQUESTS_TOTAL.labels(endpoint="predict", method="POST", status_code="200").inc(2)
+"""
+
+READER = """
+from prometheus_client import generate_latest
+from src.metrics import build_metrics_summary, metrics_registry
+print(build_metrics_summary()["requests"]["total_requests"])
+print(b'job_matching_requests_total{endpoint="predict",method="POST",status_code="200"} 4.0' in generate_latest(metrics_registry()))
+"""
+
+
+def test_multiprocess_metrics_are_aggregated_across_workers(tmp_path):
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", WORKER], env=env, check=True)
+    out = subprocess.run([sys.executable, "-c", READER], env=env, check=True, capture_output=True, text=True)
+    assert out.stdout.split() == ["4.0", "True"]
+
+
+def test_streaming_endpoint_is_timed_until_the_body_is_sent():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from starlette.responses import StreamingResponse
+
+    app = FastAPI()
+
+    @app.post("/stream")
+    @track_endpoint_metrics("test_stream")
+    def stream():
+        def lines():
+            for i in range(3):
+                time.sleep(0.05)
+                yield f"{i}\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    labels = {"endpoint": "test_stream", "method": "POST"}
+    with TestClient(app) as client:
+        assert client.post("/stream").text == "0\n1\n2\n"
+    assert _count("job_matching_request_duration_seconds_count", **labels) == 1
+    assert _count("job_matching_request_duration_seconds_sum", **labels) >= 0.15
+    assert _count("job_matching_requests_total", status_code="200", **labels) == 1
@@ -61,4 +61,47 @@ def test_preprocessing_iterates_entities_and_calls_ingest(monkeypatch):
     # Ensure ingest_data was called twice with the expected configs (order preserved by dict in modern Python)
     assert len(calls) == 2
     assert calls[0] == datasource_config["applicants"]
-    assert calls[1] == datasource_config["jobs"]
\ No newline at end of file
+    assert calls[1] == datasource_config["jobs"]
+
+def _write_raw_json(path):
+    import json
+    data = {
+        "1": {"infos_basicas": {"nome": "Ana", "email": "a@x.com"}, "cargo_atual": {}, "cv_pt": "python sql"},
+        "2": {"infos_basicas": {"nome": "Bruno"}, "cargo_atual": {"cargo": "Dev"}, "cv_pt": "java\n{\"nested\": 1}"},
+        "3": {"infos_basicas": {"nome": "Clara", "email": None}, "cargo_atual": {"cargo": "Analista"}, "cv_pt": ""},
+        "4": {"infos_basicas": {}, "prospects": [{"codigo": "10", "situacao": "Contratado"}], "cv_pt": "ç ã"},
+        "5": {"infos_basicas": {"nome": "Davi"}, "cargo_atual": {}, "cv_pt": "go"},
+    }
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    return data
+
+
+def test_iter_json_items_reads_records_across_block_boundaries(tmp_path):
+    from src.utils import iter_json_items
+    raw = tmp_path / "applicants.json"
+    data = _write_raw_json(raw)
+    for read_size in (1, 7, 1 << 20):
+        assert dict(iter_json_items(str(raw), read_size=read_size)) == data
+
+    numbers = tmp_path / "numbers.json"
+    numbers.write_text('{"a": 12345, "b": [1, 2.5], "c": true}')
+    assert list(iter_json_items(str(numbers), read_size=3)) == [("a", 12345), ("b", [1, 2.5]), ("c", True)]
+
+
+def test_streaming_ingestion_matches_in_memory_ingestion(tmp_path, monkeypatch):
+    raw = tmp_path / "applicants.json"
+    _write_raw_json(raw)
+    monkeypatch.chdir(tmp_path)
+    file_config = {"id": "applicants_id", "path": str(raw)}
+
+    preprocessing.ingest_data(file_config)
+    expected = pd.read_parquet("data/processed/applicants.parquet")
+    preprocessing.preprocessing({"applicants": file_config}, streaming=True, chunk_size=2)
+    streamed = pd.read_parquet("data/processed/applicants.parquet")
+
+    assert list(streamed.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(streamed.drop(columns="prospects"), expected.drop(columns="prospects"))
+    assert streamed["prospects"].iloc[3].tolist() == expected["prospects"].iloc[3].tolist()
+
+    import pyarrow.parquet as pq
+    assert pq.ParquetFile("data/processed/applicants.parquet").num_row_groups == 3
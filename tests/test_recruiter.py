@@ -5,9 +5,17 @@ from typing import Any
 import pandas as pd
 import os
 sys.path.append('../')
-from src.recruiter import RecruiterBot, find_top_applicants_with_filters
+from src.recruiter import RecruiterBot, find_top_applicants_with_filters, iter_top_applicants_batch
+from src.applicant_store import clear_applicant_stores
 import sys
 
+@pytest.fixture(autouse=True)
+def fresh_applicant_store():
+    # the applicants table is cached per process; start each test from a clean store
+    clear_applicant_stores()
+    yield
+    clear_applicant_stores()
+
 @pytest.fixture
 def mock_embedding_manager():
     emb_mgr = MagicMock()
@@ -65,4 +73,20 @@ def test_recruiter_bot_no_matches(mock_embedding_manager: MagicMock, mock_faiss_
 def test_recruiter_bot_empty_message(mock_embedding_manager: MagicMock, mock_faiss_indexer: MagicMock):
     bot = RecruiterBot(mock_embedding_manager, mock_faiss_indexer)
     reply = bot.chat("", top_n=2)
-    assert reply == "Please provide a job description or more details."
\ No newline at end of file
+    assert reply == "Please provide a job description or more details."
+
+def test_iter_top_applicants_batch_encodes_and_searches_per_chunk(mock_embedding_manager: MagicMock, mock_faiss_indexer: MagicMock, mock_applicants_df: Any):
+    mock_faiss_indexer.query_embeddings.side_effect = lambda qvecs, k, filters, search_k, texts: [
+        [{"metadata": {"idx": 1}, "score": 0.8}, {"metadata": {"idx": 0}, "score": 0.9}] for _ in k
+    ]
+    jobs = ["Senior engineer in Recife", "Data analyst", "Junior developer"]
+    results = list(iter_top_applicants_batch(
+        jobs, mock_faiss_indexer, mock_embedding_manager, top_n=[1, 2, 2],
+        filters=[None, {"Pleno": 1}, None], chunk_size=2,
+    ))
+    assert [[c["nome"] for c in r] for r in results] == [["Alice"], ["Alice", "Bob"], ["Alice", "Bob"]]
+    assert mock_embedding_manager.generate_embedding.call_count == 2
+    first_call = mock_faiss_indexer.query_embeddings.call_args_list[0].kwargs
+    assert first_call["k"] == [1, 2]
+    assert first_call["filters"] == [{"Senior": 1, "Recife": 1}, {"Pleno": 1}]
+    assert first_call["texts"] == jobs[:2]
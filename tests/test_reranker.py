@@ -0,0 +1,104 @@
+import time
+
+import pandas as pd
+import pytest
+import yaml
+from unittest.mock import MagicMock
+from src.applicant_store import clear_applicant_stores
+from src.recruiter import find_top_applicants_with_filters
+from src.reranker import CrossEncoderReranker
+
+
+class FakeCrossEncoder:
+    """Scores a pair by how many words of the job appear in the candidate text."""
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+
+    def predict(self, pairs, batch_size=32):
+        self.calls.append(len(pairs))
+        time.sleep(self.delay)
+        return [len(set(job.lower().split()) & set(text.lower().split())) for job, text in pairs]
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    def write(**reranker):
+        path = tmp_path / "models_config.yaml"
+        path.write_text(yaml.safe_dump({"reranker": {"batch_size": 2, "candidates": 3, **reranker}}))
+        return str(path)
+    return write
+
+
+def candidates(*texts):
+    return [{"applicant_id": i, "applicant_idx": i, "score": 1.0 - i / 10, "metadata": {"text": text}}
+            for i, text in enumerate(texts)]
+
+
+def test_rerank_reorders_capped_head_and_keeps_tail(config_path):
+    reranker = CrossEncoderReranker(config_path(), model=FakeCrossEncoder())
+    ranked = reranker.rerank("sap fi consultant", candidates("java", "sap", "sap fi", "sap fi consultant"))
+    # only the first 3 hits are rescored; the 4th keeps its place after them
+    assert [c["applicant_id"] for c in ranked] == [2, 1, 0, 3]
+    assert [c.get("rerank_score") for c in ranked] == [2, 1, 0, None]
+    assert reranker.model.calls == [2, 1]
+
+
+def test_rerank_scores_are_cached_per_job_and_candidate(config_path):
+    model = FakeCrossEncoder()
+    reranker = CrossEncoderReranker(config_path(), model=model)
+    reranker.rerank("sap fi", candidates("java", "sap"))
+    reranker.rerank("  sap fi ", candidates("java", "sap", "sap fi"))
+    # the second job normalizes to the first: only the new candidate is scored
+    assert model.calls == [2, 1]
+
+
+def test_rerank_falls_back_to_first_stage_order_when_budget_runs_out(config_path):
+    model = FakeCrossEncoder(delay=0.05)
+    reranker = CrossEncoderReranker(config_path(time_budget_ms=30), model=model)
+    hits = candidates("java", "sap", "sap fi")
+    assert reranker.rerank("sap fi", hits) == hits
+    # the first batch overran the budget, so the second was never started
+    assert model.calls == [2]
+
+
+def test_rerank_scores_jobs_one_after_the_other_within_the_budget(config_path):
+    model = FakeCrossEncoder(delay=0.05)
+    reranker = CrossEncoderReranker(config_path(time_budget_ms=80), model=model)
+    other = candidates("c", "go", "rust")
+    first, second = reranker.rerank_many(["python", "rust"], [candidates("java", "python"), other])
+    # one batch fits: the first job completes, the second falls back
+    assert [c["applicant_id"] for c in first] == [1, 0]
+    assert second == other
+    assert model.calls == [2]
+
+
+def test_rerank_skips_the_model_when_one_batch_is_expected_to_overrun(config_path):
+    model = FakeCrossEncoder(delay=0.05)
+    reranker = CrossEncoderReranker(config_path(time_budget_ms=30), model=model)
+    reranker.rerank("sap fi", candidates("java", "sap"))
+    assert model.calls == [2]
+
+    # the earlier calls showed a batch takes longer than the whole budget
+    hits = candidates("python", "sap", "sap fi")
+    started = time.perf_counter()
+    assert reranker.rerank("sap fi", hits) == hits
+    assert time.perf_counter() - started < 0.03
+    assert model.calls == [2]
+
+
+def test_find_top_applicants_reranks_a_larger_candidate_pool(config_path, mocker):
+    clear_applicant_stores()
+    mocker.patch("pandas.read_parquet", return_value=pd.DataFrame({"applicants_id": [101, 102], "nome": ["Alice", "Bob"]}))
+    indexer = MagicMock()
+    indexer.query_embedding.return_value = [
+        {"metadata": {"idx": 0, "text": "java"}, "score": 0.95},
+        {"metadata": {"idx": 1, "text": "python dados"}, "score": 0.90},
+    ]
+    emb_mgr = MagicMock()
+    reranker = CrossEncoderReranker(config_path(), model=FakeCrossEncoder())
+    results = find_top_applicants_with_filters("analista de dados python", indexer, emb_mgr, top_n=1,
+                                               reranker=reranker)
+    assert indexer.query_embedding.call_args.kwargs["k"] == 3
+    assert [c["nome"] for c in results] == ["Bob"]
+    clear_applicant_stores()